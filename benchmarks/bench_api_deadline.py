@@ -0,0 +1,83 @@
+"""
+Measure API transcription latency under faults, with and without the local-model fallback.
+
+The fake API server is run with a series of fault scenarios (healthy, slow, flaky, hanging)
+and every utterance is transcribed through the same deadline, retry and hedging logic the app
+uses. The latency percentiles and which path produced each transcription are reported.
+Without faster-whisper installed only the API-only strategy is measured.
+
+Usage: python benchmarks/bench_api_deadline.py [AUDIO_FILES_OR_DIRS ...] [--deadline 3000]
+       [--hedge-after 800] [--model tiny] [--utterances 6]
+"""
+
+import argparse
+import time
+import numpy as np
+
+from common import init_config, load_corpus
+from fake_api_server import start_server
+
+SCENARIOS = [
+    ('healthy', dict(delay=150, jitter=50)),
+    ('slow', dict(delay=2500, jitter=500)),
+    ('flaky', dict(delay=150, error_rate=0.5, error_status=503, seed=1)),
+    ('hanging', dict(hang_rate=0.5, seed=2)),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('audio', nargs='*', help='WAV/FLAC files or directories of them')
+    parser.add_argument('--deadline', type=int, default=3000, help='API deadline in ms')
+    parser.add_argument('--max-retries', type=int, default=2)
+    parser.add_argument('--hedge-after', type=int, default=800, help='Start the local decode after this many ms')
+    parser.add_argument('--model', default='tiny', help='Local model for the fallback')
+    parser.add_argument('--utterances', type=int, default=6)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.audio, synthetic_count=args.utterances, synthetic_duration=4.0)
+    server, base_url = start_server()
+
+    ConfigManager = init_config()
+    for value, *keys in [(base_url, 'api', 'base_url'), (args.deadline, 'api', 'deadline'),
+                         (args.max_retries, 'api', 'max_retries'), (0, 'common', 'cache_size'),
+                         (None, 'common', 'cache_directory'), (args.model, 'local', 'model')]:
+        ConfigManager.set_config_value(value, 'model_options', *keys)
+    ConfigManager.set_config_value(False, 'misc', 'print_to_terminal')
+    from transcription import ApiDeadline, TranscriptionCache
+    TranscriptionCache.initialize()
+
+    strategies = [('api only', False, 0)]
+    try:
+        from model_registry import ModelRegistry
+        ModelRegistry.initialize()
+        local_model = ModelRegistry.load()
+        strategies += [('fallback', True, 0), ('hedged', True, args.hedge_after)]
+    except ImportError as e:
+        local_model = None
+        print(f'Local model unavailable ({e}), measuring the API-only strategy')
+
+    print(f'{"scenario":<10}{"strategy":<10}{"p50 s":>7}{"p95 s":>7}{"max s":>7}  outcomes')
+    for scenario, faults in SCENARIOS:
+        for strategy, local_fallback, hedge_after in strategies:
+            server.set_faults(**faults)
+            ConfigManager.set_config_value(local_fallback, 'model_options', 'api', 'local_fallback')
+            ConfigManager.set_config_value(hedge_after, 'model_options', 'api', 'hedge_after')
+            before = ApiDeadline.stats()
+            latencies = []
+            for _, audio in corpus:
+                start = time.perf_counter()
+                try:
+                    ApiDeadline.transcribe(audio, local_model)
+                except Exception:
+                    pass
+                latencies.append(time.perf_counter() - start)
+            outcomes = {key: count - before.get(key, 0) for key, count in ApiDeadline.stats().items()
+                        if count != before.get(key, 0)}
+            print(f'{scenario:<10}{strategy:<10}{np.percentile(latencies, 50):>7.2f}{np.percentile(latencies, 95):>7.2f}'
+                  f'{max(latencies):>7.2f}  {outcomes}')
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
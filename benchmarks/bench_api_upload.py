@@ -0,0 +1,73 @@
+"""
+Measure the API transcription path against the local fake API server.
+
+Each upload format is timed twice: once creating a new client per request (a fresh connection
+every time, as before the client was pooled) and once reusing the pooled client. The per-request
+breakdown into encode / connect / upload / server time comes from transcribe_api's tracing.
+The transcription cache is disabled so every utterance is uploaded.
+
+Usage: python benchmarks/bench_api_upload.py [AUDIO_FILES_OR_DIRS ...] [--formats wav flac opus]
+       [--base-url URL]   (defaults to a fake server started in-process)
+"""
+
+import argparse
+import statistics
+
+from common import init_config, load_corpus
+from fake_api_server import start_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('audio', nargs='*', help='WAV/FLAC files or directories of them')
+    parser.add_argument('--formats', nargs='+', default=['wav', 'flac', 'opus'], choices=['wav', 'flac', 'opus'])
+    parser.add_argument('--base-url', help='Use this API instead of the fake server')
+    parser.add_argument('--synthetic', type=int, default=8, help='Synthetic utterances to use when no audio is given')
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.audio, synthetic_count=args.synthetic)
+    server, base_url = (None, args.base_url) if args.base_url else start_server()
+
+    ConfigManager = init_config()
+    ConfigManager.set_config_value(base_url, 'model_options', 'api', 'base_url')
+    ConfigManager.set_config_value(0, 'model_options', 'common', 'cache_size')
+    ConfigManager.set_config_value(None, 'model_options', 'common', 'cache_directory')
+    ConfigManager.set_config_value(False, 'misc', 'print_to_terminal')
+    from transcription import ApiClient, TranscriptionCache, transcribe_api
+    TranscriptionCache.initialize()
+
+    print(f'{len(corpus)} utterances against {base_url}')
+    print(f'{"format":<7}{"client":<8}{"KB":>8}{"ratio":>7}{"encode ms":>11}{"connect ms":>12}{"upload ms":>11}'
+          f'{"server ms":>11}{"total ms":>10}{"reused":>8}')
+    for upload_format in args.formats:
+        ConfigManager.set_config_value(upload_format, 'model_options', 'api', 'upload_format')
+        for pooled in (False, True):
+            ApiClient.close()
+            rows = []
+            for _, audio in corpus:
+                if not pooled:
+                    ApiClient.close()
+                try:
+                    transcribe_api(audio)
+                except Exception as e:
+                    print(f'{upload_format:<7}failed: {e}')
+                    break
+                rows.append(ApiClient._instance.last_timings)
+            if not rows:
+                continue
+
+            def mean(key):
+                return statistics.mean(row[key] for row in rows)
+
+            print(f'{upload_format:<7}{"pooled" if pooled else "new":<8}{mean("payload_bytes") / 1024:>8.1f}'
+                  f'{mean("raw_bytes") / mean("payload_bytes"):>7.1f}{mean("encode") * 1000:>11.2f}'
+                  f'{mean("connect") * 1000:>12.2f}{mean("upload") * 1000:>11.2f}{mean("server") * 1000:>11.2f}'
+                  f'{mean("total") * 1000:>10.2f}{sum(row["reused_connection"] for row in rows):>5}/{len(rows)}')
+
+    if server:
+        print(f'Server saw {server.stats["requests"]} requests over {server.stats["connections"]} connections')
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Compare the memory and CPU cost of the recording loop's capture path.
+
+The legacy path reproduces the deque/list based capture that used to live in
+ResultThread._record_audio; the buffer path uses AudioBuffer. Both are fed the same
+synthetic audio in 30 ms callback blocks, without opening a real input stream.
+
+Usage: python benchmarks/bench_audio_capture.py [--duration SECONDS] [--repeat N]
+"""
+
+import argparse
+import time
+import tracemalloc
+from collections import deque
+import numpy as np
+
+from common import synthetic_audio, iter_blocks
+from audio_buffer import AudioBuffer
+
+
+def capture_legacy(blocks, frame_size):
+    """Capture with a deque of samples and a Python list for the whole utterance."""
+    audio_buffer = deque(maxlen=frame_size)
+    recording = []
+    for block in blocks:
+        audio_buffer.extend(block[:, 0])
+        if len(audio_buffer) < frame_size:
+            continue
+        frame = np.array(list(audio_buffer), dtype=np.int16)
+        audio_buffer.clear()
+        recording.extend(frame)
+        frame.tobytes()
+    return np.array(recording, dtype=np.int16)
+
+
+def capture_buffer(blocks, frame_size, capacity):
+    """Capture with slice assignment into a preallocated AudioBuffer."""
+    audio_buffer = AudioBuffer(capacity)
+    frames = 0
+    for block in blocks:
+        audio_buffer.write(block[:, 0])
+        while True:
+            frame = audio_buffer.frame(frames, frame_size)
+            if frame is None:
+                break
+            frames += 1
+            frame.tobytes()
+    return audio_buffer.view(0, frames * frame_size)
+
+
+def measure(func, *args):
+    """Run a capture function and return (cpu seconds, peak traced bytes, result)."""
+    tracemalloc.start()
+    start = time.process_time()
+    result = func(*args)
+    cpu = time.process_time() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=80.0, help='Seconds of synthetic audio')
+    parser.add_argument('--sample-rate', type=int, default=16000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    frame_size = int(args.sample_rate * 0.03)
+    audio = synthetic_audio(args.duration, args.sample_rate)
+    blocks = list(iter_blocks(audio, frame_size))
+    capacity = (len(blocks) + 1) * frame_size
+
+    results = {}
+    for name, func, extra in (('legacy deque/list', capture_legacy, ()),
+                              ('AudioBuffer', capture_buffer, (capacity,))):
+        runs = [measure(func, blocks, frame_size, *extra) for _ in range(args.repeat)]
+        cpu = min(run[0] for run in runs)
+        peak = max(run[1] for run in runs)
+        assert np.array_equal(runs[0][2], audio[:len(runs[0][2])])
+        results[name] = (cpu, peak)
+
+    print(f'{args.duration:.0f} s of audio at {args.sample_rate} Hz, {len(blocks)} frames, best of {args.repeat}')
+    print(f'{"path":<20}{"cpu (s)":>12}{"peak mem (MB)":>16}')
+    for name, (cpu, peak) in results.items():
+        print(f'{name:<20}{cpu:>12.3f}{peak / 2**20:>16.2f}')
+
+    legacy_cpu, legacy_peak = results['legacy deque/list']
+    buffer_cpu, buffer_peak = results['AudioBuffer']
+    print(f'Speedup: {legacy_cpu / max(buffer_cpu, 1e-9):.1f}x CPU, {legacy_peak / max(buffer_peak, 1):.1f}x less peak memory')
+
+
+if __name__ == '__main__':
+    main()
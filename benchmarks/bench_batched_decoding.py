@@ -0,0 +1,68 @@
+"""
+Compare sequential and batched local decoding on CPU.
+
+Each utterance is decoded with transcribe_local one after another, then all utterances are
+decoded together with transcribe_local_batched at each requested batch size.
+
+Usage: python benchmarks/bench_batched_decoding.py [AUDIO_FILES_OR_DIRS ...]
+       [--model base] [--compute-type int8] [--cpu-threads 0] [--batch-sizes 4 8 16]
+"""
+
+import argparse
+import time
+
+from common import init_config, load_corpus
+
+
+def timed(func, *args):
+    """Run a function and return (wall seconds, cpu seconds, result)."""
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    result = func(*args)
+    return time.perf_counter() - wall_start, time.process_time() - cpu_start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('audio', nargs='*', help='WAV/FLAC files or directories of them')
+    parser.add_argument('--model', default='base')
+    parser.add_argument('--compute-type', default='int8')
+    parser.add_argument('--cpu-threads', type=int, default=0, help='0 lets CTranslate2 choose')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[4, 8, 16])
+    parser.add_argument('--synthetic', type=int, default=8, help='Synthetic utterances to use when no audio is given')
+    args = parser.parse_args()
+
+    # Load the audio before init_config changes to the project root, so relative paths work
+    corpus = load_corpus(args.audio, synthetic_count=args.synthetic)
+
+    ConfigManager = init_config()
+    from faster_whisper import WhisperModel
+    from transcription import get_batched_pipeline, transcribe_local, transcribe_local_batched
+
+    audio_list = [audio for _, audio in corpus]
+    audio_seconds = sum(len(audio) for audio in audio_list) / 16000
+
+    model = WhisperModel(args.model, device='cpu', compute_type=args.compute_type, cpu_threads=args.cpu_threads)
+    if get_batched_pipeline(model) is None:
+        return
+
+    # Warm up so model loading and first-call overhead are not measured
+    transcribe_local(audio_list[0][:16000], model)
+
+    rows = []
+    wall, cpu, _ = timed(lambda: [transcribe_local(audio, model) for audio in audio_list])
+    rows.append(('sequential', wall, cpu))
+
+    for batch_size in args.batch_sizes:
+        ConfigManager.set_config_value(batch_size, 'model_options', 'local', 'batch_size')
+        wall, cpu, _ = timed(transcribe_local_batched, audio_list, model)
+        rows.append((f'batched x{batch_size}', wall, cpu))
+
+    print(f'{len(audio_list)} utterances, {audio_seconds:.1f} s of audio, model {args.model} ({args.compute_type})')
+    print(f'{"mode":<16}{"wall (s)":>10}{"cpu (s)":>10}{"RTF":>8}{"speedup":>9}')
+    sequential_wall = rows[0][1]
+    for name, wall, cpu in rows:
+        print(f'{name:<16}{wall:>10.2f}{cpu:>10.2f}{wall / audio_seconds:>8.3f}{sequential_wall / wall:>8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
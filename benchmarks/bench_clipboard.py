@@ -0,0 +1,65 @@
+"""
+Measure the clipboard operations of a paste on each available clipboard backend.
+
+For every backend the clipboard is first filled with some text (and optionally a large binary
+payload to see the effect of the size cap), then each round saves it, sets the dictated text,
+waits until it can be read back (the copy/paste round trip) and restores the original contents.
+This overwrites the system clipboard, which is put back afterwards.
+
+Usage: python benchmarks/bench_clipboard.py [--backends win32 wayland x11 memory] [--rounds 20]
+       [--payload-kb 0] [--max-format-kb 4096]
+"""
+
+import argparse
+import os
+
+from common import SRC_DIR  # noqa: F401, puts src on the path
+from clipboard_manager import CLIPBOARD_BACKENDS, ClipboardManager
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', nargs='+', default=list(CLIPBOARD_BACKENDS), choices=list(CLIPBOARD_BACKENDS))
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--payload-kb', type=int, default=0, help='Size of a binary payload saved alongside the text')
+    parser.add_argument('--max-format-kb', type=int, default=4096, help='0 saves every format')
+    args = parser.parse_args()
+
+    print(f'{"backend":<9}{"save ms":>9}{"set ms":>9}{"round trip ms":>15}{"restore ms":>12}  saved formats')
+    for name in args.backends:
+        try:
+            backend = CLIPBOARD_BACKENDS[name]()
+            manager = ClipboardManager(backend, args.max_format_kb * 1024 or None)
+            original = backend.read(None)[0]
+            initial = {backend.text_format: 'The text the user had copied before dictating.'}
+            if args.payload_kb:
+                # Only the memory backend keeps several formats next to each other, others restore the best one
+                initial['image/png' if name != 'win32' else 8] = os.urandom(args.payload_kb * 1024)
+            backend.write(initial)
+        except Exception as e:
+            print(f'{name:<9}unavailable: {e}')
+            continue
+
+        round_trips = []
+        try:
+            for i in range(args.rounds):
+                manager.save()
+                round_trip = manager.measure_round_trip(f'Dictated text number {i}.')
+                if round_trip is not None:
+                    round_trips.append(round_trip)
+                manager.restore()
+        finally:
+            if original:
+                backend.write(original)
+
+        def mean_ms(operation):
+            stats = manager.timings.get(operation)
+            return stats['total'] / stats['count'] * 1000 if stats else float('nan')
+
+        print(f'{name:<9}{mean_ms("save"):>9.2f}{mean_ms("set_text"):>9.2f}{mean_ms("round_trip"):>15.2f}'
+              f'{mean_ms("restore"):>12.2f}  {manager.get_format_names()}'
+              + ('' if len(round_trips) == args.rounds else f' ({args.rounds - len(round_trips)} round trips timed out)'))
+
+
+if __name__ == '__main__':
+    main()
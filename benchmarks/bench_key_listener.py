@@ -0,0 +1,148 @@
+"""
+Measure how the evdev backend copes with a flood of irrelevant input events.
+
+A flood of mouse movements and keys that are not part of the activation chord is mixed with a
+few presses of the chord keys. With --uinput (needs the evdev package and write access to
+/dev/uinput) a virtual device sends the flood through the kernel while the backend listens, and
+the listener's wakeups and CPU time are reported: with the kernel event mask the flood should
+not wake it at all. Without it, the raw events are written to pipes standing in for devices and
+read by the backend's event reader, compared with decoding every event into an evdev object as
+the previous select() loop did (when evdev is installed).
+
+Usage: python benchmarks/bench_key_listener.py [--events 200000] [--uinput]
+"""
+
+import argparse
+import os
+import time
+
+from common import SRC_DIR  # noqa: F401, puts src on the path
+from key_listener import EvdevBackend, InputEvent, KeyCode
+
+EV_SYN, EV_KEY, EV_REL = 0x00, 0x01, 0x02
+REL_X, REL_Y = 0x00, 0x01
+KEY_LEFTCTRL, KEY_LEFTSHIFT, KEY_SPACE, KEY_A = 29, 42, 57, 30
+CHORD = {KEY_LEFTCTRL: KeyCode.CTRL_LEFT, KEY_LEFTSHIFT: KeyCode.SHIFT_LEFT, KEY_SPACE: KeyCode.SPACE}
+
+
+def flood(events, chord_every=1000):
+    """
+    Generate a flood of (type, code, value) events, with a chord press and release every chord_every events.
+    """
+    generated = []
+    while len(generated) < events:
+        for i in range(chord_every // 4):
+            generated += [(EV_REL, REL_X, 1), (EV_REL, REL_Y, -1), (EV_SYN, 0, 0)]
+            if i % 16 == 0:
+                generated += [(EV_KEY, KEY_A, 1), (EV_KEY, KEY_A, 0)]
+        for value in (1, 0):
+            generated += [(EV_KEY, code, value) for code in CHORD] + [(EV_SYN, 0, 0)]
+    return generated[:events]
+
+
+def bench_pipes(args):
+    """Feed the flood through pipes to the backend's reader, and to evdev objects for comparison."""
+    events = flood(args.events)
+    data = b''.join(EvdevBackend.EVENT.pack(0, 0, *event) for event in events)
+
+    class PipeDevice:
+        def __init__(self, fd):
+            self.fd, self.path = fd, f'pipe:{fd}'
+
+        def close(self):
+            os.close(self.fd)
+
+    handled = []
+    backend = EvdevBackend()
+    backend.code_map = CHORD
+    backend.on_input_event = handled.append
+    read_fd, write_fd = os.pipe2(os.O_NONBLOCK)
+    backend.devices[read_fd] = PipeDevice(read_fd)
+
+    def drain(read_events):
+        start = time.perf_counter()
+        # Whole events only, as a real device never returns part of one
+        chunk_size = EvdevBackend.EVENT.size * 2048
+        for offset in range(0, len(data), chunk_size):
+            os.write(write_fd, data[offset:offset + chunk_size])
+            while True:
+                try:
+                    read_events()
+                except BlockingIOError:
+                    break
+        return time.perf_counter() - start
+
+    def read_raw():
+        before = backend.stats['events_read']
+        backend._read_device_events(read_fd)
+        if backend.stats['events_read'] == before:
+            raise BlockingIOError
+
+    raw_time = drain(read_raw)
+    presses = sum(event_type == InputEvent.KEY_PRESS for _, event_type in handled)
+    print(f'{"raw filter":<16}{raw_time * 1000:>9.1f} ms{raw_time / len(events) * 1e9:>9.0f} ns/event'
+          f'  {len(handled)} key events handled ({presses} presses) of {len(events)}')
+
+    try:
+        import evdev
+    except ImportError:
+        print('evdev not installed, skipping the comparison with evdev objects')
+        return
+
+    legacy_handled = []
+
+    def read_objects():
+        chunk = os.read(read_fd, EvdevBackend.EVENT.size * 64)
+        for sec, usec, event_type, code, value in EvdevBackend.EVENT.iter_unpack(chunk):
+            event = evdev.InputEvent(sec, usec, event_type, code, value)
+            if event.type == evdev.ecodes.EV_KEY:
+                key_event = evdev.categorize(event)
+                key_code = CHORD.get(key_event.scancode)
+                if key_code is not None:
+                    legacy_handled.append(key_code)
+
+    legacy_time = drain(read_objects)
+    print(f'{"evdev objects":<16}{legacy_time * 1000:>9.1f} ms{legacy_time / len(events) * 1e9:>9.0f} ns/event'
+          f'  {len(legacy_handled)} key events handled ({legacy_time / raw_time:.1f}x slower)')
+
+
+def bench_uinput(args):
+    """Send the flood through a virtual uinput device while the backend listens."""
+    from evdev import UInput, ecodes
+
+    capabilities = {ecodes.EV_KEY: list(CHORD) + [KEY_A], ecodes.EV_REL: [REL_X, REL_Y]}
+    handled = []
+    with UInput(capabilities, name='bench-key-listener') as device:
+        time.sleep(0.5)  # Let udev create the node
+        backend = EvdevBackend()
+        backend.on_input_event = handled.append
+        backend.set_relevant_keys(set(CHORD.values()))
+        backend.start()
+        try:
+            time.sleep(0.2)
+            cpu_start, start = time.process_time(), time.perf_counter()
+            for event_type, code, value in flood(args.events):
+                device.write(event_type, code, value)
+            time.sleep(0.5)
+            elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+        finally:
+            backend.stop()
+    stats = backend.stats
+    print(f'{args.events} events sent in {elapsed:.2f}s, {len(handled)} key events handled')
+    print(f'listener: {stats["wakeups"]} wakeups, {stats["events_read"]} events read, '
+          f'{stats["devices_added"]} devices opened, process CPU {cpu:.2f}s (includes sending)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--uinput', action='store_true', help='Use a virtual device through the kernel')
+    args = parser.parse_args()
+    if args.uinput:
+        bench_uinput(args)
+    else:
+        bench_pipes(args)
+
+
+if __name__ == '__main__':
+    main()
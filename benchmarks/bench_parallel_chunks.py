@@ -0,0 +1,78 @@
+"""
+Measure the wall-clock latency of long dictations transcribed in one piece and as parallel chunks.
+
+Each recording is transcribed through transcribe() once per concurrency level, where 1 means in
+one piece. The API path runs against the fake API server, with a server time that grows with the
+upload size like a real decode does. With --local the local model is used instead, loaded with
+as many workers as the concurrency (needs faster-whisper). The cache is disabled.
+
+Usage: python benchmarks/bench_parallel_chunks.py [AUDIO_FILES_OR_DIRS ...] [--concurrency 1 2 4 8]
+       [--chunk-duration 20] [--duration 80] [--ms-per-kb 2] [--local] [--model base]
+"""
+
+import argparse
+import time
+
+from common import init_config, load_corpus
+from fake_api_server import start_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('audio', nargs='*', help='WAV/FLAC files or directories of them')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--chunk-duration', type=int, default=20, help='Target chunk length in seconds')
+    parser.add_argument('--duration', type=float, default=80.0, help='Length of the synthetic recordings')
+    parser.add_argument('--ms-per-kb', type=float, default=2.0, help='Fake server time per KB uploaded')
+    parser.add_argument('--local', action='store_true', help='Use the local model instead of the API')
+    parser.add_argument('--model', default='base', help='Local model to use with --local')
+    parser.add_argument('--synthetic', type=int, default=2, help='Synthetic recordings to use when no audio is given')
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.audio, synthetic_count=args.synthetic, synthetic_duration=args.duration)
+    server = None
+
+    ConfigManager = init_config()
+    ConfigManager.set_config_value(args.chunk_duration, 'model_options', 'common', 'chunk_duration')
+    ConfigManager.set_config_value(0, 'model_options', 'common', 'cache_size')
+    ConfigManager.set_config_value(None, 'model_options', 'common', 'cache_directory')
+    ConfigManager.set_config_value(False, 'misc', 'print_to_terminal')
+    ConfigManager.set_config_value(not args.local, 'model_options', 'use_api')
+    if args.local:
+        ConfigManager.set_config_value(args.model, 'model_options', 'local', 'model')
+    else:
+        server, base_url = start_server(delay_per_kb=args.ms_per_kb)
+        ConfigManager.set_config_value(base_url, 'model_options', 'api', 'base_url')
+        ConfigManager.set_config_value('wav', 'model_options', 'api', 'upload_format')
+    from transcription import TranscriptionCache, transcribe
+    TranscriptionCache.initialize()
+
+    if args.local:
+        from model_registry import ModelRegistry
+        ModelRegistry.initialize()
+
+    print(f'{len(corpus)} recordings, {"local model " + args.model if args.local else "fake API"}')
+    print(f'{"concurrency":<13}{"mean s":>8}{"max s":>8}{"speedup":>9}')
+    baseline = None
+    for concurrency in args.concurrency:
+        if args.local:
+            ConfigManager.set_config_value(concurrency, 'model_options', 'local', 'num_workers')
+            model = ModelRegistry.load()
+        else:
+            ConfigManager.set_config_value(concurrency, 'model_options', 'api', 'max_concurrency')
+            model = None
+        latencies = []
+        for _, audio in corpus:
+            start = time.perf_counter()
+            transcribe(audio, model)
+            latencies.append(time.perf_counter() - start)
+        mean = sum(latencies) / len(latencies)
+        baseline = baseline or mean
+        print(f'{concurrency:<13}{mean:>8.2f}{max(latencies):>8.2f}{baseline / mean:>8.1f}x')
+
+    if server:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Measure how many characters per second the pynput input method types.
+
+The text is typed one character at a time (typing_batch_size 1, the old behaviour) and in
+batches of each requested size. Batches are only sent on Windows, where SendInput injects a batch
+in one call; on other platforms every batch size types one character at a time, so only the
+first row is meaningful there. By default a mock stands in for the keyboard and SendInput: it
+models a target window that consumes key events at a fixed rate, and injecting blocks while more
+events than it can buffer are waiting, so the adaptive pause has something to adapt to.
+With --real the actual pynput controller and SendInput are used; on Linux run it against an X
+virtual framebuffer (e.g. `xvfb-run python benchmarks/bench_typing.py --real`) so the keystrokes
+go nowhere.
+
+Usage: python benchmarks/bench_typing.py [--chars 500] [--batch-sizes 8 32 128]
+       [--delay 0.005] [--target-rate 5000] [--target-buffer 256] [--real]
+"""
+
+import argparse
+import sys
+import time
+
+from common import init_config
+
+SAMPLE_TEXT = ("The quick brown fox jumps over the lazy dog, while the naïve café owner counts 1234 "
+               "receipts. ")
+
+
+class MockController:
+    """
+    A keyboard controller feeding a simulated target that consumes events at a fixed rate.
+
+    :param rate: Events per second the target consumes
+    :param buffer: Events the target can queue before injecting blocks
+    """
+
+    def __init__(self, rate, buffer, event_cost=2e-6):
+        self.rate = rate
+        self.buffer = buffer
+        self.event_cost = event_cost
+        self.events = 0
+        self.blocked = 0.0
+        self._backlog = 0.0
+        self._last = time.perf_counter()
+
+    def _inject(self):
+        now = time.perf_counter()
+        self._backlog = max(self._backlog - (now - self._last) * self.rate, 0.0) + 1
+        self._last = now
+        if self._backlog > self.buffer:
+            wait = (self._backlog - self.buffer) / self.rate
+            self.blocked += wait
+            time.sleep(wait)
+        # Stand-in for the cost of building and sending the event
+        end = time.perf_counter() + self.event_cost
+        while time.perf_counter() < end:
+            pass
+        self.events += 1
+
+    def press(self, key):
+        self._inject()
+
+    def release(self, key):
+        self._inject()
+
+    def send_input(self, inputs):
+        """Stand-in for SendInput, injecting every event and accepting them all."""
+        for _ in inputs:
+            self._inject()
+        return len(inputs)
+
+
+def run(simulator, text, batch_size, controller):
+    """Type text with the given batch size and return (seconds, controller)."""
+    import input_simulation
+    from utils import ConfigManager
+    ConfigManager.set_config_value(batch_size, 'post_processing', 'typing_batch_size')
+    simulator.keyboard = controller
+    if sys.platform == 'win32' and isinstance(controller, MockController):
+        input_simulation._send_input = controller.send_input
+    simulator.typing_delay = None
+    start = time.perf_counter()
+    simulator.typewrite(text)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chars', type=int, default=500, help='Length of the typed text')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[8, 32, 128])
+    parser.add_argument('--delay', type=float, default=0.005, help='writing_key_press_delay in seconds')
+    parser.add_argument('--target-rate', type=float, default=5000, help='Events per second the mocked target consumes')
+    parser.add_argument('--target-buffer', type=int, default=256, help='Events the mocked target can queue')
+    parser.add_argument('--real', action='store_true', help='Use the real pynput controller')
+    args = parser.parse_args()
+
+    ConfigManager = init_config()
+    ConfigManager.set_config_value('pynput', 'post_processing', 'input_method')
+    ConfigManager.set_config_value(args.delay, 'post_processing', 'writing_key_press_delay')
+    from input_simulation import InputSimulator
+    from pynput.keyboard import Controller
+
+    simulator = InputSimulator()
+    text = (SAMPLE_TEXT * (args.chars // len(SAMPLE_TEXT) + 1))[:args.chars]
+    print(f'{len(text)} characters, {args.delay * 1000:g} ms key press delay, '
+          f'{"real pynput controller" if args.real else f"mocked target at {args.target_rate:g} events/s"}')
+    print(f'{"batch size":>10}{"seconds":>10}{"chars/s":>10}{"speedup":>9}{"blocked (s)":>12}{"final pause (ms)":>17}')
+
+    baseline = None
+    for batch_size in [1] + args.batch_sizes:
+        controller = Controller() if args.real else MockController(args.target_rate, args.target_buffer)
+        seconds = run(simulator, text, batch_size, controller)
+        baseline = baseline or seconds
+        blocked = f'{controller.blocked:>12.3f}' if not args.real else f'{"-":>12}'
+        pause = f'{simulator.typing_delay.delay * 1000:>17.2f}' if simulator.typing_delay else f'{"-":>17}'
+        print(f'{batch_size:>10}{seconds:>10.3f}{len(text) / seconds:>10.0f}{baseline / seconds:>8.1f}x{blocked}{pause}')
+
+
+if __name__ == '__main__':
+    main()
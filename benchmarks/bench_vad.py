@@ -0,0 +1,125 @@
+"""
+Compare the speed and accuracy of the voice activity detection backends on labelled audio.
+
+Each backend classifies every clip twice: one 30 ms frame per call, as the recording loop does
+while audio trickles in, and the whole clip in one call, as offline trimming does. Frame-level
+precision and recall are measured against the labels, and the endpoint is found with the same
+silence tracking as the recording loop: a premature cut stops before the labelled speech ends,
+the endpoint delay is how long after the expected stop (speech end + silence duration) it fired.
+
+Labelled recordings are WAV/FLAC files with an Audacity label file next to them
+(<name>.labels.txt, start and end in seconds per line). Without them, synthetic clips are
+generated at several background noise levels.
+
+Usage: python benchmarks/bench_vad.py [AUDIO_FILES_OR_DIRS ...] [--backends webrtc energy silero]
+       [--silence-duration 900] [--clips 10]
+"""
+
+import argparse
+import os
+import time
+import numpy as np
+
+from common import find_audio_files, load_labels, load_wav, synthetic_labelled_audio
+from vad import VAD_BACKENDS, SilenceTracker
+
+SAMPLE_RATE = 16000
+FRAME_SIZE = 480
+
+
+def load_labelled_corpus(paths, clips, noise_levels):
+    """Get (name, audio, sample labels) tuples from labelled files, or synthetic clips if there are none."""
+    corpus = []
+    for path in find_audio_files(paths):
+        labels_path = os.path.splitext(path)[0] + '.labels.txt'
+        if os.path.isfile(labels_path):
+            audio = load_wav(path, SAMPLE_RATE)
+            corpus.append((os.path.basename(path), audio, load_labels(labels_path, len(audio), SAMPLE_RATE)))
+    if not corpus:
+        print('No labelled audio given, using synthetic clips.')
+        for noise_level in noise_levels:
+            for seed in range(clips):
+                audio, labels = synthetic_labelled_audio(6.0, SAMPLE_RATE, seed, noise_level, trailing_silence=2.0)
+                corpus.append((f'synthetic-noise{noise_level}-{seed}', audio, labels))
+    return corpus
+
+
+def frame_labels(labels):
+    """A frame is speech when most of its samples are labelled as speech."""
+    frame_count = len(labels) // FRAME_SIZE
+    return labels[:frame_count * FRAME_SIZE].reshape(frame_count, FRAME_SIZE).mean(axis=1) > 0.5
+
+
+def evaluate(backend_class, corpus, silence_frames):
+    """Run one backend over the corpus and collect timing, accuracy and endpoint statistics."""
+    vad = backend_class(SAMPLE_RATE, FRAME_SIZE)
+    stats = {'frames': 0, 'live_cpu': 0.0, 'batch_cpu': 0.0, 'tp': 0, 'fp': 0, 'fn': 0, 'tn': 0,
+             'premature': 0, 'missed': 0, 'delays': []}
+
+    for _, audio, labels in corpus:
+        # One frame per call, as in the recording loop
+        vad.reset()
+        start = time.process_time()
+        live = np.concatenate([vad.speech_flags(audio[offset:offset + FRAME_SIZE])
+                               for offset in range(0, len(audio) - FRAME_SIZE + 1, FRAME_SIZE)])
+        stats['live_cpu'] += time.process_time() - start
+
+        # The whole clip in one call
+        vad.reset()
+        start = time.process_time()
+        vad.speech_flags(audio)
+        stats['batch_cpu'] += time.process_time() - start
+
+        truth = frame_labels(labels)[:len(live)]
+        stats['frames'] += len(live)
+        stats['tp'] += int(np.count_nonzero(live & truth))
+        stats['fp'] += int(np.count_nonzero(live & ~truth))
+        stats['fn'] += int(np.count_nonzero(~live & truth))
+        stats['tn'] += int(np.count_nonzero(~live & ~truth))
+
+        silent_runs, speech_seen = SilenceTracker().update(live)
+        stops = np.flatnonzero(speech_seen & (silent_runs > silence_frames))
+        speech_end = int(np.flatnonzero(truth)[-1]) + 1 if truth.any() else 0
+        if not len(stops):
+            stats['missed'] += 1
+        elif stops[0] < speech_end:
+            stats['premature'] += 1
+        else:
+            stats['delays'].append((int(stops[0]) + 1 - speech_end - silence_frames) * FRAME_SIZE / SAMPLE_RATE)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('audio', nargs='*', help='Labelled WAV/FLAC files or directories of them')
+    parser.add_argument('--backends', nargs='+', default=list(VAD_BACKENDS), choices=list(VAD_BACKENDS))
+    parser.add_argument('--silence-duration', type=int, default=900, help='Silence in ms that ends a recording')
+    parser.add_argument('--clips', type=int, default=10, help='Synthetic clips per noise level')
+    parser.add_argument('--noise-levels', type=int, nargs='+', default=[60, 300, 1000])
+    args = parser.parse_args()
+
+    corpus = load_labelled_corpus(args.audio, args.clips, args.noise_levels)
+    silence_frames = int(args.silence_duration / (1000 * FRAME_SIZE / SAMPLE_RATE))
+    audio_seconds = sum(len(audio) for _, audio, _ in corpus) / SAMPLE_RATE
+    print(f'{len(corpus)} clips, {audio_seconds:.1f} s of audio')
+    print(f'{"backend":<9}{"live us/frame":>14}{"batch us/frame":>15}{"accuracy":>10}{"precision":>10}'
+          f'{"recall":>8}{"F1":>7}{"premature":>10}{"missed":>8}{"delay (ms)":>11}')
+
+    for name in args.backends:
+        try:
+            stats = evaluate(VAD_BACKENDS[name], corpus, silence_frames)
+        except (ImportError, RuntimeError, ValueError) as e:
+            print(f'{name:<9}unavailable: {e}')
+            continue
+        frames = max(stats['frames'], 1)
+        precision = stats['tp'] / max(stats['tp'] + stats['fp'], 1)
+        recall = stats['tp'] / max(stats['tp'] + stats['fn'], 1)
+        f1 = 2 * precision * recall / max(precision + recall, 1e-9)
+        delay = f'{np.mean(stats["delays"]) * 1000:>11.0f}' if stats['delays'] else f'{"-":>11}'
+        print(f'{name:<9}{stats["live_cpu"] / frames * 1e6:>14.1f}{stats["batch_cpu"] / frames * 1e6:>15.1f}'
+              f'{(stats["tp"] + stats["tn"]) / frames:>10.1%}{precision:>10.1%}{recall:>8.1%}{f1:>7.3f}'
+              f'{stats["premature"]:>10}{stats["missed"]:>8}{delay}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+Shared helpers for the benchmark scripts.
+"""
+
+import os
+import sys
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+
+def synthetic_audio(duration, sample_rate=16000, seed=0):
+    """
+    Generate speech-like int16 audio: harmonic bursts separated by low-level noise.
+
+    :param duration: Duration in seconds
+    :param sample_rate: Sample rate in Hz
+    :param seed: Seed for the random generator
+    :return: 1-D int16 numpy array
+    """
+    return synthetic_labelled_audio(duration, sample_rate, seed)[0]
+
+
+def synthetic_labelled_audio(duration, sample_rate=16000, seed=0, noise_level=60, trailing_silence=0.0):
+    """
+    Generate speech-like int16 audio together with the ground truth of where the bursts are.
+
+    :param noise_level: Standard deviation of the background noise
+    :param trailing_silence: Seconds of background noise without bursts at the end
+    :return: Tuple of (1-D int16 numpy array, boolean numpy array marking the speech samples)
+    """
+    rng = np.random.default_rng(seed)
+    total = int(duration * sample_rate)
+    speech_end = total - int(trailing_silence * sample_rate)
+    audio = rng.normal(0, noise_level, total)
+    labels = np.zeros(total, dtype=bool)
+
+    position = int(0.3 * sample_rate)
+    while position < speech_end:
+        burst = int(rng.uniform(0.4, 1.5) * sample_rate)
+        end = min(position + burst, speech_end)
+        t = np.arange(end - position) / sample_rate
+        pitch = rng.uniform(100, 220)
+        envelope = np.sin(np.pi * t / max(t[-1], 1e-3)) * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t))
+        voice = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 6))
+        audio[position:end] += 6000 * envelope * voice
+        labels[position:end] = True
+        position = end + int(rng.uniform(0.2, 0.8) * sample_rate)
+
+    return np.clip(audio, -32768, 32767).astype(np.int16), labels
+
+
+def load_labels(path, length, sample_rate=16000):
+    """
+    Load speech labels in Audacity label format (start and end in seconds per line).
+
+    :param length: Number of samples of the labelled audio
+    :return: Boolean numpy array marking the speech samples
+    """
+    labels = np.zeros(length, dtype=bool)
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            fields = line.split()
+            if len(fields) >= 2:
+                labels[int(float(fields[0]) * sample_rate):int(float(fields[1]) * sample_rate)] = True
+    return labels
+
+
+def iter_blocks(audio, block_size):
+    """
+    Yield audio in blocks shaped like sounddevice callback input (frames x channels).
+
+    :param audio: 1-D int16 numpy array
+    :param block_size: Number of samples per block
+    """
+    for start in range(0, len(audio) - block_size + 1, block_size):
+        yield audio[start:start + block_size].reshape(-1, 1)
+
+
+def init_config():
+    """Initialize the ConfigManager from the project root so the user's config.yaml is used."""
+    from utils import ConfigManager
+    os.chdir(PROJECT_ROOT)
+    ConfigManager.initialize()
+    return ConfigManager
+
+
+def load_wav(path, sample_rate=16000):
+    """
+    Load an audio file as mono int16 at the given sample rate.
+
+    :param path: Path to a WAV (or other soundfile-supported) file
+    :param sample_rate: Target sample rate in Hz
+    :return: 1-D int16 numpy array
+    """
+    import soundfile as sf
+    audio, file_rate = sf.read(path, dtype='float32', always_2d=True)
+    audio = audio.mean(axis=1)
+    if file_rate != sample_rate:
+        # Linear interpolation is enough for benchmarking purposes
+        positions = np.arange(int(len(audio) * sample_rate / file_rate)) * (file_rate / sample_rate)
+        audio = np.interp(positions, np.arange(len(audio)), audio)
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+
+
+def find_audio_files(paths):
+    """
+    Expand files and directories into a sorted list of WAV/FLAC files.
+
+    :param paths: Iterable of file or directory paths
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in names
+                             if name.lower().endswith(('.wav', '.flac')))
+        else:
+            files.append(path)
+    return sorted(files)
+
+
+def load_corpus(paths, sample_rate=16000, synthetic_count=0, synthetic_duration=8.0):
+    """
+    Load the audio files found under `paths`, or generate synthetic utterances if there are none.
+
+    :return: List of (name, int16 numpy array) tuples
+    """
+    corpus = [(os.path.basename(path), load_wav(path, sample_rate)) for path in find_audio_files(paths)]
+    if not corpus:
+        print('No audio files given, using synthetic audio (timings only, transcripts are meaningless).')
+        corpus = [(f'synthetic-{index}', synthetic_audio(synthetic_duration, sample_rate, seed=index))
+                  for index in range(max(synthetic_count, 1))]
+    return corpus
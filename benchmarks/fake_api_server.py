@@ -0,0 +1,189 @@
+"""
+A local stand-in for the OpenAI transcription endpoint, for benchmarks and manual testing.
+
+POST /v1/audio/transcriptions accepts the same multipart form as the real API and answers with
+a fixed transcription. Connections are kept alive (HTTP/1.1), and the server counts requests,
+connections and uploaded bytes per audio format, so connection reuse and payload sizes can be checked.
+
+Faults can be injected to test deadlines and retries: a delay (with random jitter) before every
+answer, optionally growing with the size of the upload like a real decode does, a share of requests answered with an error status, and a share of requests that hang.
+A script of outcomes (e.g. "error,hang,ok") overrides the random faults and is followed in order,
+request by request, then repeated.
+
+Usage: python benchmarks/fake_api_server.py [--port 8765] [--text "Hello world."] [--delay 0]
+       [--jitter 0] [--delay-per-kb 0] [--error-rate 0] [--error-status 500] [--hang-rate 0] [--script error,ok]
+       then set model_options.api.base_url to http://127.0.0.1:8765/v1
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class TranscriptionHandler(BaseHTTPRequestHandler):
+    """Handles requests to the fake transcription endpoint."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.stats_lock:
+            self.server.stats['connections'] += 1
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path.rstrip('/') != '/v1/audio/transcriptions':
+            self.send_json(404, {'error': {'message': f'Unknown path {self.path}'}})
+            return
+
+        form = parse_multipart(self.headers.get('Content-Type', ''), body)
+        upload = form.get('file')
+        if upload is None:
+            self.send_json(400, {'error': {'message': 'No file uploaded'}})
+            return
+
+        server = self.server
+        with server.stats_lock:
+            stats = server.stats
+            stats['requests'] += 1
+            formats = stats['formats'].setdefault(upload['content_type'], {'requests': 0, 'bytes': 0})
+            formats['requests'] += 1
+            formats['bytes'] += len(upload['data'])
+            outcome = server.next_outcome()
+            stats['outcomes'][outcome] = stats['outcomes'].get(outcome, 0) + 1
+
+        delay = server.faults['delay'] + server.faults['delay_per_kb'] * len(upload['data']) / 1024
+        time.sleep(max(delay + random.uniform(-1, 1) * server.faults['jitter'], 0) / 1000)
+        if outcome == 'hang':
+            # Longer than any sensible client timeout; the client gives up and closes the connection
+            time.sleep(server.faults['hang_seconds'])
+            self.close_connection = True
+            return
+        if outcome == 'error':
+            status = server.faults['error_status']
+            self.send_json(status, {'error': {'message': f'Injected error {status}', 'type': 'server_error'}})
+            return
+        self.send_json(200, {'text': server.text})
+
+
+def parse_multipart(content_type, body):
+    """Parse a multipart/form-data body into {name: {'data', 'content_type', 'filename'}}."""
+    message = BytesParser(policy=HTTP).parsebytes(b'Content-Type: ' + content_type.encode() + b'\r\n\r\n' + body)
+    form = {}
+    for part in message.iter_parts():
+        name = part.get_param('name', header='content-disposition')
+        form[name] = {'data': part.get_payload(decode=True) or b'', 'content_type': part.get_content_type(),
+                      'filename': part.get_filename()}
+    return form
+
+
+class FakeApiServer(ThreadingHTTPServer):
+    """The fake API server with its fault settings and statistics."""
+
+    daemon_threads = True
+
+    def __init__(self, port, text, verbose=False):
+        super().__init__(('127.0.0.1', port), TranscriptionHandler)
+        self.text = text
+        self.verbose = verbose
+        self.stats = {'requests': 0, 'connections': 0, 'formats': {}, 'outcomes': {}}
+        self.stats_lock = threading.Lock()
+        self.set_faults()
+
+    def set_faults(self, delay=0, jitter=0, delay_per_kb=0.0, error_rate=0.0, error_status=500, hang_rate=0.0, hang_seconds=300,
+                   script=None, seed=0):
+        """
+        Change the injected faults, taking effect from the next request.
+
+        :param delay: Milliseconds to wait before answering
+        :param jitter: Maximum milliseconds added to or removed from the delay at random
+        :param delay_per_kb: Milliseconds added to the delay per KB of uploaded audio
+        :param error_rate: Share of requests answered with error_status
+        :param hang_rate: Share of requests that are not answered for hang_seconds
+        :param script: List of 'ok', 'error' and 'hang' outcomes to follow in order instead of the rates
+        """
+        self.faults = {'delay': delay, 'jitter': jitter, 'delay_per_kb': delay_per_kb, 'error_rate': error_rate, 'error_status': error_status,
+                       'hang_rate': hang_rate, 'hang_seconds': hang_seconds}
+        self.script = list(script or [])
+        self.script_position = 0
+        self.random = random.Random(seed)
+
+    def handle_error(self, request, client_address):
+        # Clients giving up on a delayed or hung answer are expected when faults are injected
+        if self.verbose or not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def next_outcome(self):
+        """The outcome of the next request: 'ok', 'error' or 'hang'."""
+        if self.script:
+            outcome = self.script[self.script_position % len(self.script)]
+            self.script_position += 1
+            return outcome
+        roll = self.random.random()
+        if roll < self.faults['hang_rate']:
+            return 'hang'
+        if roll < self.faults['hang_rate'] + self.faults['error_rate']:
+            return 'error'
+        return 'ok'
+
+
+def start_server(port=0, text='This is a fake transcription.', verbose=False, **faults):
+    """
+    Start the fake API server on a background thread.
+
+    :param port: Port to listen on, 0 picks a free one
+    :param faults: Initial fault settings, see FakeApiServer.set_faults
+    :return: Tuple of (server, base URL for model_options.api.base_url)
+    """
+    server = FakeApiServer(port, text, verbose)
+    server.set_faults(**faults)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/v1'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--text', default='This is a fake transcription.')
+    parser.add_argument('--delay', type=int, default=0, help='Milliseconds before answering')
+    parser.add_argument('--jitter', type=int, default=0, help='Random milliseconds added to or removed from the delay')
+    parser.add_argument('--delay-per-kb', type=float, default=0.0, help='Milliseconds added per KB uploaded')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with an error')
+    parser.add_argument('--error-status', type=int, default=500)
+    parser.add_argument('--hang-rate', type=float, default=0.0, help='Share of requests that are never answered')
+    parser.add_argument('--script', help='Comma-separated outcomes (ok, error, hang) to follow in order')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    server, url = start_server(args.port, args.text, verbose=True, delay=args.delay, jitter=args.jitter,
+                               delay_per_kb=args.delay_per_kb,
+                               error_rate=args.error_rate, error_status=args.error_status, hang_rate=args.hang_rate,
+                               script=args.script.split(',') if args.script else None, seed=args.seed)
+    print(f'Serving {url}/audio/transcriptions, press Ctrl+C to stop')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(json.dumps(server.stats, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,324 @@
+"""
+Replay a corpus of recordings through the full transcription pipeline without a microphone.
+
+Each file is played in real time (or faster, see --speed) through a stand-in for
+sounddevice.InputStream into ResultThread, which endpoints it with its VAD loop, transcribes it
+and post-processes it exactly as in the application. Every model / compute type / vad_filter
+combination runs in its own process so that peak RSS is measured per combination.
+
+Reported per combination: latency percentiles of each stage (endpoint: last audio sample to end
+of recording; queue; transcription, including post-processing; end-to-end: last audio sample to
+result), real-time factor, model load time, CPU time and peak RSS. If a .txt file with the
+reference transcript sits next to a recording, the word error rate is reported as well.
+The silence that ends a recording is paced at --speed too, so the endpoint stage shrinks at
+speeds above 1.
+
+Usage: python benchmarks/replay_pipeline.py [AUDIO_FILES_OR_DIRS ...]
+       [--models base] [--compute-types int8] [--vad-filter off] [--speed 1.0] [--json results.json]
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import numpy as np
+
+from common import PROJECT_ROOT, find_audio_files, init_config, load_corpus
+
+STAGES = ('endpoint', 'queue', 'transcription', 'end_to_end')
+
+
+class ReplayInputStream:
+    """
+    Stand-in for sounddevice.InputStream that delivers queued recordings to the audio callback.
+    Silence is delivered between recordings, like a microphone in a quiet room.
+    """
+
+    def __init__(self, samplerate, channels, dtype, blocksize, device, callback, speed=1.0):
+        self.sample_rate = samplerate
+        self.blocksize = blocksize
+        self.callback = callback
+        self.speed = speed
+        self.pending = []
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+        self.speech_ended = threading.Event()
+        self.speech_end_time = None
+
+    def play(self, audio, leading_silence=0.5, trailing_silence=2.0):
+        """Queue a recording surrounded by silence, so recording can start and the VAD can stop it."""
+        silence = lambda seconds: np.zeros(int(seconds * self.sample_rate), dtype=np.int16)
+        self.speech_ended.clear()
+        with self.lock:
+            self.pending.append((np.concatenate([silence(leading_silence), audio]), True))
+            self.pending.append((silence(trailing_silence), False))
+
+    def _feed(self):
+        silence_block = np.zeros((self.blocksize, 1), dtype=np.int16)
+        block_seconds = self.blocksize / self.sample_rate
+        while self.running:
+            with self.lock:
+                audio, is_speech = self.pending.pop(0) if self.pending else (None, False)
+            if audio is None:
+                # Nothing queued, deliver silence in real time
+                self.callback(silence_block, self.blocksize, None, None)
+                time.sleep(block_seconds)
+                continue
+
+            # Queued recordings are paced at the playback speed, or delivered at once at speed 0
+            next_block = time.perf_counter()
+            for start in range(0, len(audio) - self.blocksize + 1, self.blocksize):
+                self.callback(audio[start:start + self.blocksize].reshape(-1, 1), self.blocksize, None, None)
+                if self.speed > 0:
+                    next_block += block_seconds / self.speed
+                    time.sleep(max(next_block - time.perf_counter(), 0))
+
+            if is_speech:
+                self.speech_end_time = time.perf_counter()
+                self.speech_ended.set()
+
+    def __enter__(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._feed, name='replay-stream', daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.running = False
+        self.thread.join()
+
+
+def percentiles(values):
+    """Summarize a list of latencies in seconds."""
+    if not values:
+        return None
+    return {'mean': float(np.mean(values)), 'p50': float(np.percentile(values, 50)),
+            'p90': float(np.percentile(values, 90)), 'p99': float(np.percentile(values, 99)),
+            'max': float(np.max(values))}
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where the resource module is unavailable."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def read_reference(name, paths):
+    """Get the reference transcript stored next to a recording, if there is one."""
+    for path in find_audio_files(paths):
+        if os.path.basename(path) == name:
+            reference_path = os.path.splitext(path)[0] + '.txt'
+            if os.path.isfile(reference_path):
+                with open(reference_path, encoding='utf-8') as file:
+                    return file.read()
+    return None
+
+
+def run_combination(args, combination):
+    """Replay the corpus with one model configuration in this process and return its results."""
+    # Load the audio before init_config changes to the project root, so relative paths work
+    corpus = load_corpus(args.audio, synthetic_count=args.synthetic)
+    references = {name: read_reference(name, args.audio) for name, _ in corpus}
+
+    ConfigManager = init_config()
+    from PyQt5.QtCore import Qt
+    from model_registry import ModelRegistry
+    from result_thread import ResultThread
+    from transcription import word_edit_distance
+
+    longest = max(len(audio) for _, audio in corpus) / 16000
+    overrides = [
+        (combination['model'], 'model_options', 'local', 'model'),
+        (None, 'model_options', 'local', 'model_path'),
+        (combination['compute_type'], 'model_options', 'local', 'compute_type'),
+        (args.device, 'model_options', 'local', 'device'),
+        (combination['vad_filter'], 'model_options', 'local', 'vad_filter'),
+        (None, 'model_options', 'local', 'draft_model'),
+        (False, 'model_options', 'local', 'streaming_transcription'),
+        (1, 'model_options', 'local', 'batch_size'),
+        (False, 'model_options', 'use_api'),
+        (False, 'output', 'stream_segments'),
+        (0, 'model_options', 'common', 'cache_size'),  # Every replay must really be decoded
+        (None, 'model_options', 'common', 'cache_directory'),
+        ('voice_activity_detection', 'recording_options', 'recording_mode'),
+        (16000, 'recording_options', 'sample_rate'),
+        (math.ceil(longest) + 5, 'recording_options', 'max_duration'),
+        (args.verbose, 'misc', 'print_to_terminal'),
+    ]
+    for override in overrides:
+        ConfigManager.set_config_value(*override)
+
+    ModelRegistry.initialize()
+    load_start = time.perf_counter()
+    ModelRegistry.load()
+    load_time = time.perf_counter() - load_start
+
+    streams = []
+    recording_started = threading.Event()
+    recording_started_at = []
+    result_ready = threading.Event()
+    outputs = []
+
+    def stream_factory(**kwargs):
+        streams.append(ReplayInputStream(speed=args.speed, **kwargs))
+        return streams[-1]
+
+    def on_status(status):
+        if status == 'recording' and not recording_started.is_set():
+            recording_started_at.append(time.perf_counter())
+            recording_started.set()
+
+    def on_result(text):
+        outputs.append((time.perf_counter(), text))
+        result_ready.set()
+
+    result_thread = ResultThread(input_stream_factory=stream_factory)
+    # There is no Qt event loop here, so deliver the signals on the emitting threads
+    result_thread.statusSignal.connect(on_status, Qt.DirectConnection)
+    result_thread.resultSignal.connect(on_result, Qt.DirectConnection)
+    result_thread.start()
+
+    cpu_start = time.process_time()
+    utterances = []
+    for name, audio in corpus:
+        while not streams:
+            time.sleep(0.01)
+        recording_started.clear()
+        result_ready.clear()
+        result_thread.start_recording()
+        recording_started.wait()
+        record_start = recording_started_at[-1]
+
+        streams[0].play(audio)
+        streams[0].speech_ended.wait()
+        speech_end = streams[0].speech_end_time
+        audio_seconds = len(audio) / 16000
+        if not result_ready.wait(timeout=audio_seconds / max(args.speed, 1) + 300):
+            print(f'{name}: no result, skipping', file=sys.stderr)
+            continue
+        result_time, text = outputs[-1]
+
+        timings = result_thread.job_timings[-1]
+        utterance = {
+            'name': name,
+            'audio_seconds': audio_seconds,
+            'endpoint': record_start + timings['capture'] - speech_end,
+            'queue': timings['queue'],
+            'transcription': timings['transcription'],
+            'end_to_end': result_time - speech_end,
+            'text': text,
+        }
+        if references.get(name) is not None:
+            reference = references[name].lower()
+            utterance['word_errors'] = word_edit_distance(reference, text.lower())
+            utterance['reference_words'] = len(reference.split())
+        utterances.append(utterance)
+        if not args.verbose:
+            print(f'  {name}: {utterance["end_to_end"]:.2f}s end-to-end', file=sys.stderr)
+
+    cpu_seconds = time.process_time() - cpu_start
+    result_thread.stop()
+
+    audio_seconds = sum(utterance['audio_seconds'] for utterance in utterances)
+    result = dict(combination)
+    result.update({
+        'device': args.device,
+        'utterances': len(utterances),
+        'audio_seconds': audio_seconds,
+        'load_seconds': load_time,
+        'stages': {stage: percentiles([utterance[stage] for utterance in utterances]) for stage in STAGES},
+        'rtf': sum(utterance['transcription'] for utterance in utterances) / audio_seconds if audio_seconds else None,
+        'cpu_seconds': cpu_seconds,
+        'peak_rss_mb': peak_rss_mb(),
+        'per_utterance': utterances,
+    })
+    reference_words = sum(utterance.get('reference_words', 0) for utterance in utterances)
+    if reference_words:
+        result['wer'] = sum(utterance.get('word_errors', 0) for utterance in utterances) / reference_words
+    return result
+
+
+def git_revision():
+    """Get the current commit, so results can be compared across commits."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results):
+    print(f'{"model":<14}{"compute":<10}{"vad":<5}{"utts":>5}{"RTF":>7}{"load (s)":>9}{"cpu (s)":>9}{"RSS (MB)":>9}'
+          f'{"e2e p50":>9}{"e2e p90":>9}{"asr p50":>9}{"endp p50":>9}{"WER":>7}')
+    for result in results:
+        stages = result['stages']
+        cell = lambda stage, key: f'{stages[stage][key]:>9.2f}' if stages[stage] else f'{"-":>9}'
+        rss = f'{result["peak_rss_mb"]:>9.0f}' if result['peak_rss_mb'] is not None else f'{"-":>9}'
+        rtf = f'{result["rtf"]:>7.3f}' if result['rtf'] is not None else f'{"-":>7}'
+        wer = f'{result["wer"]:>7.1%}' if 'wer' in result else f'{"-":>7}'
+        print(f'{result["model"]:<14}{result["compute_type"]:<10}{"on" if result["vad_filter"] else "off":<5}'
+              f'{result["utterances"]:>5}{rtf}{result["load_seconds"]:>9.2f}{result["cpu_seconds"]:>9.2f}{rss}'
+              f'{cell("end_to_end", "p50")}{cell("end_to_end", "p90")}{cell("transcription", "p50")}'
+              f'{cell("endpoint", "p50")}{wer}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('audio', nargs='*', help='WAV/FLAC files or directories of them')
+    parser.add_argument('--models', nargs='+', default=['base'])
+    parser.add_argument('--compute-types', nargs='+', default=['int8'])
+    parser.add_argument('--vad-filter', nargs='+', choices=['on', 'off'], default=['off'])
+    parser.add_argument('--device', default='cpu')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='Playback speed relative to real time; 0 replays as fast as possible')
+    parser.add_argument('--synthetic', type=int, default=4, help='Synthetic utterances to use when no audio is given')
+    parser.add_argument('--json', help='Write the results to this file as JSON')
+    parser.add_argument('--verbose', action='store_true', help="Show the application's console output")
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.audio = [os.path.abspath(path) for path in args.audio]
+
+    if args.worker:
+        # Child process: run one combination and hand the results back on stdout
+        result = run_combination(args, json.loads(args.worker))
+        print('RESULT ' + json.dumps(result))
+        return
+
+    results = []
+    for model, compute_type, vad_filter in itertools.product(args.models, args.compute_types, args.vad_filter):
+        combination = {'model': model, 'compute_type': compute_type, 'vad_filter': vad_filter == 'on'}
+        print(f'Replaying with {model} ({compute_type}, vad_filter {vad_filter})...', file=sys.stderr)
+        command = [sys.executable, os.path.abspath(__file__), *args.audio, '--worker', json.dumps(combination),
+                   '--device', args.device, '--speed', str(args.speed), '--synthetic', str(args.synthetic)]
+        if args.verbose:
+            command.append('--verbose')
+        process = subprocess.run(command, stdout=subprocess.PIPE, text=True)
+        lines = [line for line in process.stdout.splitlines() if line.startswith('RESULT ')]
+        if process.returncode or not lines:
+            print(f'Run failed with exit code {process.returncode}', file=sys.stderr)
+            continue
+        results.append(json.loads(lines[-1][len('RESULT '):]))
+
+    print_table(results)
+    if args.json:
+        report = {'revision': git_revision(), 'platform': platform.platform(), 'python': platform.python_version(),
+                  'speed': args.speed, 'results': results}
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+        print(f'Results written to {args.json}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,15 @@
+import time
+_startup_origin = time.perf_counter()
+
 import os
 import sys
 import socket
 from dotenv import load_dotenv
 
+PROFILE_STARTUP = '--profile-startup' in sys.argv
+if PROFILE_STARTUP:
+    sys.argv.remove('--profile-startup')
+
 # Single instance check using a socket lock
 def check_single_instance():
     """Prevent multiple instances by binding to a specific port."""
@@ -16,6 +23,7 @@ def check_single_instance():
         sys.exit(0)
 
 _instance_lock = check_single_instance()
+_instance_check_done = time.perf_counter()
 
 # Add CUDA/cuDNN DLLs to PATH for GPU support
 venv_path = os.path.dirname(os.path.abspath(__file__))
@@ -33,24 +41,36 @@ load_dotenv()
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-# CRITICAL: Load model BEFORE importing PyQt5 (ctranslate2/Qt DLL conflict on Windows)
-print('Loading Whisper model (this may take a moment)...')
-from utils import ConfigManager
-from transcription import create_local_model
+from utils import ConfigManager, StartupProfiler
+
+StartupProfiler.enabled = PROFILE_STARTUP
+StartupProfiler.set_origin(_startup_origin)
+StartupProfiler.record('single instance check', _startup_origin, _instance_check_done)
+
+with StartupProfiler.phase('load config'):
+    from model_registry import ModelRegistry
+    ConfigManager.initialize()
+    ModelRegistry.initialize()
+    model_options = ConfigManager.get_config_section('model_options')
 
-ConfigManager.initialize()
-model_options = ConfigManager.get_config_section('model_options')
+StartupProfiler.expect('tray icon shown')
+# The local model is also needed as the fallback of the API
+if not model_options.get('use_api') or model_options.get('api', {}).get('local_fallback'):
+    StartupProfiler.expect('model ready')
 
-if not model_options.get('use_api'):
-    preloaded_model = create_local_model()
-else:
-    preloaded_model = None
+    # CRITICAL: ctranslate2 must be imported BEFORE PyQt5 on Windows (ctranslate2/Qt DLL conflict).
+    # Elsewhere the import happens on the model loader thread together with the model load.
+    if sys.platform == 'win32':
+        with StartupProfiler.phase('import faster_whisper'):
+            import faster_whisper
 
-print('Model loaded. Starting UI...')
+    # Load the model in the background; recordings made before it is ready wait in the job queue
+    print('Loading Whisper model in the background...')
+    ModelRegistry.load_async()
 
 # NOW import and run the app (PyQt5 imports happen here)
-from main import WhisperWriterApp
+with StartupProfiler.phase('import Qt and app modules'):
+    from main import WhisperWriterApp
 
-# Pass preloaded model to constructor
-app = WhisperWriterApp(preloaded_model=preloaded_model)
+app = WhisperWriterApp()
 app.run()
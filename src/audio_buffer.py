@@ -0,0 +1,176 @@
+"""
+Preallocated audio buffers used by the recording loop.
+The sounddevice callback writes blocks into them with slice assignment: AudioBuffer holds
+the utterance being recorded and hands out zero-copy views, RingBuffer keeps a short
+pre-roll of the most recent input between recordings.
+"""
+
+import threading
+import numpy as np
+
+
+class AudioBuffer:
+    """
+    A growable, preallocated int16 sample buffer.
+
+    Samples are appended with slice assignment, so no per-sample Python objects are
+    created. Views returned by `view` and `frame` share memory with the buffer and stay
+    valid even if the buffer later grows, because growing allocates a new array and
+    leaves the old one to the views that still reference it.
+    """
+
+    def __init__(self, capacity, dtype=np.int16):
+        """
+        Initialize the buffer.
+
+        :param capacity: Number of samples to preallocate
+        :param dtype: Sample type of the buffer
+        """
+        self._data = np.empty(max(int(capacity), 1), dtype=dtype)
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def capacity(self):
+        """Number of samples the buffer can hold before it has to grow."""
+        return len(self._data)
+
+    @property
+    def nbytes(self):
+        """Memory allocated for the buffer in bytes."""
+        return self._data.nbytes
+
+    def write(self, samples):
+        """
+        Append samples to the buffer, growing it if needed.
+        Safe to call from the audio callback thread.
+
+        :param samples: 1-D array of samples
+        """
+        count = len(samples)
+        with self._lock:
+            end = self._size + count
+            if end > len(self._data):
+                self._grow(end)
+            self._data[self._size:end] = samples
+            self._size = end
+
+    def _grow(self, required):
+        """Reallocate the buffer to at least `required` samples, doubling the capacity."""
+        new_capacity = max(required, len(self._data) * 2)
+        data = np.empty(new_capacity, dtype=self._data.dtype)
+        data[:self._size] = self._data[:self._size]
+        self._data = data
+
+    def view(self, start=0, stop=None):
+        """
+        Get a zero-copy view of the samples in [start, stop).
+
+        :param start: Index of the first sample
+        :param stop: Index after the last sample, defaults to the end of the written data
+        :return: numpy array sharing memory with the buffer
+        """
+        with self._lock:
+            stop = self._size if stop is None else min(stop, self._size)
+            return self._data[start:stop]
+
+    def frame(self, index, frame_size):
+        """
+        Get a zero-copy view of a fixed-size frame.
+
+        :param index: Index of the frame
+        :param frame_size: Number of samples per frame
+        :return: numpy array of `frame_size` samples, or None if the frame is not complete yet
+        """
+        start = index * frame_size
+        with self._lock:
+            if start + frame_size > self._size:
+                return None
+            return self._data[start:start + frame_size]
+
+    def available_frames(self, frame_size):
+        """Number of complete frames written so far."""
+        return self._size // frame_size
+
+    def clear(self):
+        """
+        Discard all samples while keeping the allocated memory.
+        Views handed out before clearing will see the samples written afterwards.
+        """
+        with self._lock:
+            self._size = 0
+
+
+class RingBuffer:
+    """
+    A fixed-size int16 ring buffer that keeps the most recent samples.
+    Used to keep a short pre-roll of microphone input while no recording is in progress.
+    """
+
+    def __init__(self, capacity, dtype=np.int16):
+        """
+        Initialize the ring buffer.
+
+        :param capacity: Maximum number of samples kept
+        :param dtype: Sample type of the buffer
+        """
+        self._data = np.zeros(max(int(capacity), 1), dtype=dtype)
+        self._write_pos = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def capacity(self):
+        """Maximum number of samples kept."""
+        return len(self._data)
+
+    @property
+    def nbytes(self):
+        """Memory allocated for the buffer in bytes."""
+        return self._data.nbytes
+
+    def write(self, samples):
+        """
+        Append samples, overwriting the oldest ones once the buffer is full.
+
+        :param samples: 1-D array of samples
+        """
+        capacity = len(self._data)
+        if len(samples) >= capacity:
+            self._data[:] = samples[-capacity:]
+            self._write_pos = 0
+            self._size = capacity
+            return
+
+        end = self._write_pos + len(samples)
+        if end <= capacity:
+            self._data[self._write_pos:end] = samples
+        else:
+            split = capacity - self._write_pos
+            self._data[self._write_pos:] = samples[:split]
+            self._data[:end - capacity] = samples[split:]
+        self._write_pos = end % capacity
+        self._size = min(self._size + len(samples), capacity)
+
+    def read(self, count=None):
+        """
+        Get a copy of the most recent samples in chronological order.
+
+        :param count: Number of samples to return, defaults to all samples kept
+        :return: 1-D numpy array
+        """
+        count = self._size if count is None else min(count, self._size)
+        start = (self._write_pos - count) % len(self._data)
+        if start + count <= len(self._data):
+            return self._data[start:start + count].copy()
+        return np.concatenate((self._data[start:], self._data[:self._write_pos]))
+
+    def clear(self):
+        """Discard all samples."""
+        self._write_pos = 0
+        self._size = 0
@@ -1,126 +1,507 @@
 """
-Clipboard manager with full format support using pywin32.
+Clipboard manager with pluggable backends.
 Allows saving and restoring clipboard contents including images, files, and formatted text.
+
+Backends are chosen at runtime and import their dependencies lazily:
+- win32: every clipboard format through pywin32
+- wayland: wl-copy and wl-paste
+- x11: xclip
+- memory: an in-process clipboard for tests and benchmarks
 """
 
-import win32clipboard
-import win32con
 import ctypes
-from ctypes import wintypes
+import os
+import shutil
+import subprocess
+import sys
+import time
+from abc import ABC, abstractmethod
+
+# Standard clipboard format IDs, defined here so a fake clipboard module can be used without win32con
+CF_TEXT = 1
+CF_BITMAP = 2
+CF_OEMTEXT = 7
+CF_DIB = 8
+CF_UNICODETEXT = 13
+CF_HDROP = 15
+CF_LOCALE = 16
+CF_DIBV5 = 17
+
+
+class ClipboardBackend(ABC):
+    """
+    Reads and writes the system clipboard.
+
+    Formats are backend specific keys (format IDs on Windows, MIME types elsewhere).
+    """
+
+    name = None
+    text_format = None
+    synchronous_write = True  # Whether written contents can be read back as soon as write returns
+
+    @abstractmethod
+    def sequence_number(self):
+        """A value that changes whenever the clipboard contents change, or None if the backend has no such counter."""
+
+    @abstractmethod
+    def read(self, max_bytes):
+        """
+        Read the formats worth saving.
+
+        :param max_bytes: Formats larger than this are not read. None reads everything
+        :return: Tuple of ({format: data}, [(format, size in bytes, whether it was read)])
+        """
+
+    @abstractmethod
+    def write(self, data):
+        """Replace the clipboard contents with the given {format: data}."""
+
+    def set_text(self, text):
+        """Replace the clipboard contents with text."""
+        self.write({self.text_format: text})
+
+    @abstractmethod
+    def get_text(self):
+        """The text on the clipboard, or None if there is none."""
+
+    def format_name(self, format_id):
+        """Human-readable name of a format."""
+        return str(format_id)
+
+
+class Win32ClipboardBackend(ClipboardBackend):
+    """
+    The Windows clipboard through pywin32, with support for all clipboard formats.
+
+    The size of each format is taken from its global memory handle, so formats above the size cap
+    are skipped without copying them. Formats Windows synthesizes from another saved format are
+    not read either.
+    """
+
+    name = 'win32'
+    text_format = CF_UNICODETEXT
+
+    # Restore in a specific order for best compatibility, text formats first
+    PRIORITY_ORDER = [CF_UNICODETEXT, CF_TEXT, CF_HDROP, CF_DIB, CF_DIBV5]
+
+    # Formats Windows synthesizes on demand when the format they are keyed by is on the clipboard
+    SYNTHESIZED = {
+        CF_UNICODETEXT: (CF_TEXT, CF_OEMTEXT, CF_LOCALE),
+        CF_DIBV5: (CF_DIB, CF_BITMAP),
+        CF_DIB: (CF_BITMAP,),
+    }
+
+    FORMAT_NAMES = {
+        CF_TEXT: "CF_TEXT",
+        CF_UNICODETEXT: "CF_UNICODETEXT",
+        CF_BITMAP: "CF_BITMAP",
+        CF_DIB: "CF_DIB",
+        CF_DIBV5: "CF_DIBV5",
+        CF_HDROP: "CF_HDROP (Files)",
+        CF_OEMTEXT: "CF_OEMTEXT",
+    }
+
+    def __init__(self, clipboard=None, global_size=None):
+        """
+        Initialize the Win32ClipboardBackend.
+
+        :param clipboard: Module with the win32clipboard API, the real one is imported if not given
+        :param global_size: Function returning the size of a global memory handle, GlobalSize if not given
+        """
+        if clipboard is None:
+            import win32clipboard as clipboard
+        if global_size is None:
+            global_size = ctypes.windll.kernel32.GlobalSize
+            global_size.argtypes = [ctypes.c_void_p]
+            global_size.restype = ctypes.c_size_t
+        self.clipboard = clipboard
+        self.global_size = global_size
+
+    def sequence_number(self):
+        return self.clipboard.GetClipboardSequenceNumber()
+
+    def read(self, max_bytes):
+        data, formats = {}, []
+        self.clipboard.OpenClipboard()
+        try:
+            format_ids = []
+            format_id = 0
+            while True:
+                format_id = self.clipboard.EnumClipboardFormats(format_id)
+                if format_id == 0:
+                    break
+                format_ids.append(format_id)
+
+            skipped = {synthesized for format_id in format_ids for synthesized in self.SYNTHESIZED.get(format_id, ())}
+            for format_id in format_ids:
+                if format_id in skipped:
+                    continue
+                size = self._format_size(format_id)
+                if max_bytes is not None and size > max_bytes:
+                    formats.append((format_id, size, False))
+                    continue
+                try:
+                    data[format_id] = self.clipboard.GetClipboardData(format_id)
+                    formats.append((format_id, size, True))
+                except Exception:
+                    # Some formats can't be retrieved (handles, etc.)
+                    pass
+        finally:
+            self.clipboard.CloseClipboard()
+        return data, formats
+
+    def _format_size(self, format_id):
+        """Size in bytes of a format's data without copying it, 0 if it is not global memory."""
+        try:
+            return self.global_size(self.clipboard.GetClipboardDataHandle(format_id))
+        except Exception:
+            return 0
+
+    def write(self, data):
+        self.clipboard.OpenClipboard()
+        try:
+            self.clipboard.EmptyClipboard()
+
+            # Restore priority formats first, then the remaining ones
+            ordered = [f for f in self.PRIORITY_ORDER if f in data] + [f for f in data if f not in self.PRIORITY_ORDER]
+            for format_id in ordered:
+                try:
+                    self.clipboard.SetClipboardData(format_id, data[format_id])
+                except Exception:
+                    pass
+        finally:
+            self.clipboard.CloseClipboard()
+
+    def get_text(self):
+        self.clipboard.OpenClipboard()
+        try:
+            return self.clipboard.GetClipboardData(CF_UNICODETEXT)
+        except Exception:
+            return None
+        finally:
+            self.clipboard.CloseClipboard()
+
+    def format_name(self, format_id):
+        return self.FORMAT_NAMES.get(format_id, f"Format {format_id}")
+
+
+class CommandClipboardBackend(ClipboardBackend):
+    """
+    A clipboard accessed through command line tools, with MIME types as formats.
+
+    These tools can only offer one type at a time, so only the most useful saved type is read and
+    restored. Reads stop as soon as the size cap is exceeded. The tools that set the clipboard
+    keep running in the background to serve it, so no process has to be kept open here. There is
+    no change counter, and emulating one would take a process for every check.
+    """
+
+    text_format = 'text/plain;charset=utf-8'
+    # The tools take ownership of the clipboard in the background, after they have been started
+    synchronous_write = False
+    TEXT_FORMATS = ['text/plain;charset=utf-8', 'UTF8_STRING', 'text/plain', 'STRING', 'TEXT']
+    PRIORITY_ORDER = TEXT_FORMATS + ['image/png', 'text/uri-list', 'text/html']
+    TIMEOUT = 2
+
+    @abstractmethod
+    def list_command(self):
+        """The command that lists the types on the clipboard, one per line."""
+
+    @abstractmethod
+    def read_command(self, mime_type):
+        """The command that writes the clipboard contents of a type to its output."""
+
+    @abstractmethod
+    def write_command(self, mime_type):
+        """The command that sets the clipboard to its input, as the given type."""
+
+    def _types(self):
+        """The types on the clipboard, an empty list if it is empty."""
+        result = subprocess.run(self.list_command(), capture_output=True, timeout=self.TIMEOUT)
+        if result.returncode != 0:
+            return []
+        return [line.strip() for line in result.stdout.decode(errors='replace').splitlines() if line.strip()]
+
+    def _read_type(self, mime_type, max_bytes=None):
+        """Read one type, or None if it fails or is larger than max_bytes. Returns (data, bytes read)."""
+        process = subprocess.Popen(self.read_command(mime_type), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        try:
+            data = process.stdout.read() if max_bytes is None else process.stdout.read(max_bytes + 1)
+            if max_bytes is not None and len(data) > max_bytes:
+                process.kill()
+                return None, len(data)
+            return (data if process.wait(timeout=self.TIMEOUT) == 0 else None), len(data)
+        finally:
+            process.stdout.close()
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+
+    def _preferred(self, types):
+        """The types in the order they are worth saving, keeping only the best text type."""
+        ranked = [t for t in self.PRIORITY_ORDER if t in types]
+        text = [t for t in ranked if t in self.TEXT_FORMATS][:1]
+        ranked = text + [t for t in ranked if t not in self.TEXT_FORMATS]
+        # Other types with a MIME name, e.g. application specific ones; X11 meta targets have none
+        return ranked + [t for t in types if t not in ranked and t not in self.TEXT_FORMATS and '/' in t]
+
+    def sequence_number(self):
+        return None
+
+    def read(self, max_bytes):
+        data, formats = {}, []
+        for mime_type in self._preferred(self._types()):
+            if data:
+                # Only one type can be restored, the others are just listed
+                formats.append((mime_type, 0, False))
+                continue
+            value, size = self._read_type(mime_type, max_bytes)
+            if value is not None:
+                data[mime_type] = value
+            formats.append((mime_type, size, value is not None))
+        return data, formats
+
+    def write(self, data):
+        mime_type, value = next(iter(data.items()))
+        if isinstance(value, str):
+            value = value.encode()
+        # The tool keeps serving the clipboard in the background, so its output must not be waited for
+        subprocess.run(self.write_command(mime_type), input=value, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, timeout=self.TIMEOUT, check=True)
+
+    def get_text(self):
+        text_types = [t for t in self.TEXT_FORMATS if t in self._types()]
+        if not text_types:
+            return None
+        data = self._read_type(text_types[0])[0]
+        return data.decode(errors='replace') if data is not None else None
+
+
+class WaylandClipboardBackend(CommandClipboardBackend):
+    """The Wayland clipboard through wl-clipboard."""
+
+    name = 'wayland'
+
+    @staticmethod
+    def is_available():
+        return bool(os.environ.get('WAYLAND_DISPLAY')) and bool(shutil.which('wl-copy')) and bool(shutil.which('wl-paste'))
+
+    def list_command(self):
+        return ['wl-paste', '--list-types']
+
+    def read_command(self, mime_type):
+        return ['wl-paste', '--no-newline', '--type', mime_type]
+
+    def write_command(self, mime_type):
+        return ['wl-copy', '--type', mime_type]
+
+
+class X11ClipboardBackend(CommandClipboardBackend):
+    """The X11 clipboard selection through xclip."""
+
+    name = 'x11'
+
+    @staticmethod
+    def is_available():
+        return bool(os.environ.get('DISPLAY')) and bool(shutil.which('xclip'))
+
+    def list_command(self):
+        return ['xclip', '-selection', 'clipboard', '-o', '-t', 'TARGETS']
+
+    def read_command(self, mime_type):
+        return ['xclip', '-selection', 'clipboard', '-o', '-t', mime_type]
+
+    def write_command(self, mime_type):
+        return ['xclip', '-selection', 'clipboard', '-i', '-t', mime_type]
+
+
+class MemoryClipboardBackend(ClipboardBackend):
+    """An in-process clipboard, for tests and benchmarks."""
+
+    name = 'memory'
+    text_format = 'text/plain'
+
+    def __init__(self, data=None):
+        self.data = dict(data or {})
+        self._sequence = 1
+
+    def sequence_number(self):
+        return self._sequence
+
+    def read(self, max_bytes):
+        data, formats = {}, []
+        for format_id, value in self.data.items():
+            size = len(value)
+            saved = max_bytes is None or size <= max_bytes
+            if saved:
+                data[format_id] = value
+            formats.append((format_id, size, saved))
+        return data, formats
+
+    def write(self, data):
+        self.data = dict(data)
+        self._sequence += 1
+
+    def get_text(self):
+        return self.data.get(self.text_format)
+
+
+CLIPBOARD_BACKENDS = {
+    'win32': Win32ClipboardBackend,
+    'wayland': WaylandClipboardBackend,
+    'x11': X11ClipboardBackend,
+    'memory': MemoryClipboardBackend,
+}
+
+
+def create_clipboard_backend(name='auto'):
+    """
+    Create a clipboard backend by name, or the one for this desktop when name is 'auto' or None.
+
+    :raises RuntimeError: If no backend is available
+    """
+    if name and name != 'auto':
+        return CLIPBOARD_BACKENDS[name]()
+    if sys.platform == 'win32':
+        return Win32ClipboardBackend()
+    for backend_class in (WaylandClipboardBackend, X11ClipboardBackend):
+        if backend_class.is_available():
+            return backend_class()
+    raise RuntimeError("No clipboard backend available, install wl-clipboard (Wayland) or xclip (X11)")
 
 
 class ClipboardManager:
     """
-    Manages clipboard operations with support for all clipboard formats.
+    Manages clipboard operations on top of a clipboard backend.
     Allows saving the current clipboard state and restoring it later.
+
+    Saving takes a snapshot: the format and size of everything on the clipboard is recorded, but
+    only formats up to a size cap are copied into memory. If the backend has a sequence number,
+    it is used to skip the work entirely when nothing changed: saving again after a restore reuses
+    the snapshot, and restoring is skipped when something other than set_text changed the clipboard
+    in the meantime, so the user's newer contents are not overwritten. Without one, every save
+    reads the clipboard and every restore writes it.
     """
 
-    # Common clipboard formats
-    FORMATS_TO_SAVE = [
-        win32con.CF_UNICODETEXT,  # Unicode text
-        win32con.CF_TEXT,          # ANSI text
-        win32con.CF_HDROP,         # File list
-        win32con.CF_DIB,           # Device-independent bitmap
-        win32con.CF_DIBV5,         # DIB v5 (better color support)
-        win32con.CF_BITMAP,        # Bitmap handle (may not persist)
-    ]
-
-    def __init__(self):
+    def __init__(self, backend=None, max_format_bytes=4 * 1024 * 1024):
+        """
+        Initialize the ClipboardManager.
+
+        :param backend: ClipboardBackend to use, the one for this desktop if not given
+        :param max_format_bytes: Formats larger than this are not saved. None saves everything
+        """
+        self.backend = backend or create_clipboard_backend()
+        self.max_format_bytes = max_format_bytes
         self._saved_data = {}
+        self.formats = []  # (format, size in bytes, whether it was saved) of the last snapshot
+        self.timings = {}  # Operation -> {'count', 'total', 'max'} in seconds
+        self._snapshot_sequence = None  # Sequence number at which the snapshot matches the clipboard
+        self._set_sequence = None  # Sequence number right after set_text
+
+    def _record(self, operation, started):
+        elapsed = time.perf_counter() - started
+        stats = self.timings.setdefault(operation, {'count': 0, 'total': 0.0, 'max': 0.0})
+        stats['count'] += 1
+        stats['total'] += elapsed
+        stats['max'] = max(stats['max'], elapsed)
 
     def save(self):
         """
-        Save all clipboard contents that can be retrieved.
+        Save the clipboard contents that can be retrieved and are not too large.
         Returns True if successful, False otherwise.
         """
-        self._saved_data = {}
-
+        started = time.perf_counter()
         try:
-            win32clipboard.OpenClipboard()
-            try:
-                # Enumerate all available formats
-                format_id = 0
-                while True:
-                    format_id = win32clipboard.EnumClipboardFormats(format_id)
-                    if format_id == 0:
-                        break
-
-                    try:
-                        # Try to get data for this format
-                        data = win32clipboard.GetClipboardData(format_id)
-                        self._saved_data[format_id] = data
-                    except Exception:
-                        # Some formats can't be retrieved (handles, etc.)
-                        pass
-            finally:
-                win32clipboard.CloseClipboard()
+            sequence = self.backend.sequence_number()
+            if self._saved_data and sequence is not None and sequence == self._snapshot_sequence:
+                # Unchanged since the last save or restore, the snapshot is still valid
+                return True
 
+            self._saved_data, self.formats = self.backend.read(self.max_format_bytes)
+            self._snapshot_sequence = sequence
             return True
         except Exception as e:
             print(f"Error saving clipboard: {e}")
             return False
+        finally:
+            self._record('save', started)
 
     def restore(self):
         """
-        Restore previously saved clipboard contents.
+        Restore previously saved clipboard contents, unless the clipboard was changed since set_text.
         Returns True if successful, False otherwise.
         """
         if not self._saved_data:
             return False
 
+        started = time.perf_counter()
         try:
-            win32clipboard.OpenClipboard()
-            try:
-                win32clipboard.EmptyClipboard()
-
-                # Restore in a specific order for best compatibility
-                # Text formats first, then others
-                priority_order = [
-                    win32con.CF_UNICODETEXT,
-                    win32con.CF_TEXT,
-                    win32con.CF_HDROP,
-                    win32con.CF_DIB,
-                    win32con.CF_DIBV5,
-                ]
-
-                # Restore priority formats first
-                for format_id in priority_order:
-                    if format_id in self._saved_data:
-                        try:
-                            win32clipboard.SetClipboardData(format_id, self._saved_data[format_id])
-                        except Exception:
-                            pass
-
-                # Restore remaining formats
-                for format_id, data in self._saved_data.items():
-                    if format_id not in priority_order:
-                        try:
-                            win32clipboard.SetClipboardData(format_id, data)
-                        except Exception:
-                            pass
-            finally:
-                win32clipboard.CloseClipboard()
+            if self._set_sequence is not None and self.backend.sequence_number() != self._set_sequence:
+                print("Clipboard changed since pasting, not restoring it")
+                self.clear_saved()
+                return False
 
+            self.backend.write(self._saved_data)
+            dropped = [format_id for format_id, _, saved in self.formats if not saved]
+            if dropped:
+                print(f"Not restored: {[self.backend.format_name(f) for f in dropped]}")
+            self._snapshot_sequence = self.backend.sequence_number()
+            self._set_sequence = None
             return True
         except Exception as e:
             print(f"Error restoring clipboard: {e}")
             return False
+        finally:
+            self._record('restore', started)
 
-    def set_text(self, text):
+    def set_text(self, text, timeout=0.5):
         """
-        Set text to clipboard.
+        Set text to clipboard. If the backend sets it in the background, wait until it can be read
+        back, so it is not pasted before it is there.
+
+        :param timeout: Seconds to wait for the text to be readable
+        :return: True if the text is on the clipboard, False otherwise
         """
+        started = time.perf_counter()
         try:
-            win32clipboard.OpenClipboard()
-            try:
-                win32clipboard.EmptyClipboard()
-                win32clipboard.SetClipboardData(win32con.CF_UNICODETEXT, text)
-            finally:
-                win32clipboard.CloseClipboard()
+            self.backend.set_text(text)
+            if not self.backend.synchronous_write and not self._wait_for_text(text, started, timeout):
+                print(f"Clipboard text could not be read back within {timeout * 1000:.0f} ms")
+                return False
+            self._set_sequence = self.backend.sequence_number()
             return True
         except Exception as e:
             print(f"Error setting clipboard text: {e}")
             return False
+        finally:
+            self._record('set_text', started)
+
+    def get_text(self):
+        """The text on the clipboard, or None if there is none or it cannot be read."""
+        try:
+            return self.backend.get_text()
+        except Exception as e:
+            print(f"Error reading clipboard text: {e}")
+            return None
+
+    def _wait_for_text(self, text, started, timeout):
+        """Poll the clipboard until it holds text, returning False if it does not within timeout of started."""
+        while time.perf_counter() - started < timeout:
+            if self.get_text() == text:
+                return True
+            time.sleep(0.001)
+        return False
+
+    def measure_round_trip(self, text='whisper-writer clipboard probe', timeout=1.0):
+        """
+        Measure how long it takes until text that was set can be read back from the clipboard.
+
+        :return: The round trip time in seconds, or None if the text did not come back in time
+        """
+        started = time.perf_counter()
+        if not self.set_text(text, timeout) or not self._wait_for_text(text, started, timeout):
+            return None
+        self._record('round_trip', started)
+        return time.perf_counter() - started
 
     def has_saved_data(self):
         """Check if there is saved clipboard data."""
@@ -129,17 +510,11 @@ class ClipboardManager:
     def clear_saved(self):
         """Clear saved clipboard data from memory."""
         self._saved_data = {}
+        self.formats = []
+        self._snapshot_sequence = None
+        self._set_sequence = None
 
     def get_format_names(self):
-        """Get human-readable names of saved formats (for debugging)."""
-        format_names = {
-            win32con.CF_TEXT: "CF_TEXT",
-            win32con.CF_UNICODETEXT: "CF_UNICODETEXT",
-            win32con.CF_BITMAP: "CF_BITMAP",
-            win32con.CF_DIB: "CF_DIB",
-            win32con.CF_DIBV5: "CF_DIBV5",
-            win32con.CF_HDROP: "CF_HDROP (Files)",
-            win32con.CF_OEMTEXT: "CF_OEMTEXT",
-        }
-
-        return [format_names.get(f, f"Format {f}") for f in self._saved_data.keys()]
+        """Get human-readable names and sizes of the formats in the last snapshot (for debugging)."""
+        return [f"{self.backend.format_name(format_id)} ({size} bytes{'' if saved else ', not saved'})"
+                for format_id, size, saved in self.formats]
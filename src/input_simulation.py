@@ -1,39 +1,291 @@
+import ctypes
 import subprocess
 import os
 import signal
+import socket
+import struct
+import sys
 import time
-import pyperclip
 from pynput.keyboard import Controller as PynputController, Key
 
 from utils import ConfigManager
 
-def run_command_or_exit_on_failure(command):
+def run_command(command):
     """
-    Run a shell command and exit if it fails.
+    Run a shell command, reporting a failure instead of raising.
 
     Args:
         command (list): The command to run as a list of strings.
+
+    Returns:
+        bool: Whether the command succeeded.
     """
     try:
         subprocess.run(command, check=True)
-    except subprocess.CalledProcessError as e:
+        return True
+    except (subprocess.CalledProcessError, OSError) as e:
         print(f"Error running command: {e}")
-        exit(1)
+        return False
+
+
+# Linux input event codes of the keys on a US layout, which is what ydotool types with
+_YDOTOOL_SHIFT = 42
+_YDOTOOL_BACKSPACE = 14
+_YDOTOOL_KEYS = {}
+for _row, _codes in (('1234567890-=', range(2, 14)), ('qwertyuiop[]', range(16, 28)),
+                     ("asdfghjkl;'`", range(30, 42)), ('\\zxcvbnm,./', [43, *range(44, 54)])):
+    _YDOTOOL_KEYS.update((char, (code, False)) for char, code in zip(_row, _codes))
+for _plain, _shifted in zip("1234567890-=[];'`\\,./", '!@#$%^&*()_+{}:"~|<>?'):
+    _YDOTOOL_KEYS[_shifted] = (_YDOTOOL_KEYS[_plain][0], True)
+_YDOTOOL_KEYS.update((char.upper(), (code, True)) for char, (code, shift) in list(_YDOTOOL_KEYS.items())
+                     if char.isalpha())
+_YDOTOOL_KEYS.update({' ': (57, False), '\t': (15, False), '\n': (28, False)})
+
+
+class YdotoolSession:
+    """
+    A persistent connection to the ydotoold daemon, sending key events over its socket.
+
+    Each event is one datagram holding a Linux `struct input_event`, which is what the ydotool
+    client sends, so no process is started per utterance. If the daemon went away the session
+    reconnects and resumes where it stopped; if that fails too the remaining keys are sent with
+    the ydotool command instead.
+    """
+
+    EVENT = struct.Struct('@llHHi')
+    EV_SYN, EV_KEY = 0, 1
+
+    def __init__(self, socket_path=None, timeout=1.0):
+        """
+        Initialize the YdotoolSession.
+
+        :param socket_path: Path of the ydotoold socket, found the way ydotool finds it if not given
+        :param timeout: Seconds to wait for a daemon that stopped reading events before reconnecting
+        """
+        self.socket_path = socket_path or self.default_socket_path()
+        self.timeout = timeout
+        self.socket = None
+        self.latency = {'count': 0, 'total': 0.0, 'max': 0.0, 'last': 0.0, 'reconnects': 0, 'fallbacks': 0}
+
+    @staticmethod
+    def default_socket_path():
+        """The socket ydotool uses: $YDOTOOL_SOCKET, the user's runtime directory or the older /tmp location."""
+        if os.environ.get('YDOTOOL_SOCKET'):
+            return os.environ['YDOTOOL_SOCKET']
+        runtime_dir = os.environ.get('XDG_RUNTIME_DIR') or f'/run/user/{os.getuid()}'
+        path = os.path.join(runtime_dir, '.ydotool_socket')
+        return path if os.path.exists(path) else '/tmp/.ydotool_socket'
+
+    def connect(self):
+        """Connect to the daemon's socket, replacing any previous connection."""
+        self.close()
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.socket = sock
+
+    def close(self):
+        """Close the connection to the daemon."""
+        if self.socket:
+            self.socket.close()
+            self.socket = None
+
+    def type(self, text, interval):
+        """
+        Type text, skipping characters that have no key on a US layout.
+
+        :param text: The text to type
+        :param interval: The interval between keystrokes in seconds
+        """
+        keys = [_YDOTOOL_KEYS[char] for char in text if char in _YDOTOOL_KEYS]
+        if len(keys) < len(text):
+            print(f"ydotool cannot type {len(text) - len(keys)} characters, skipping them")
+        self.send_keys(keys, interval)
+
+    def backspace(self, count, interval):
+        """Press backspace count times."""
+        self.send_keys([(_YDOTOOL_BACKSPACE, False)] * count, interval)
+
+    def send_keys(self, keys, interval):
+        """
+        Tap keys, each a (code, shift) tuple, and record how long the call took.
+
+        :param keys: The keys to tap
+        :param interval: The interval between keystrokes in seconds
+        """
+        started = time.perf_counter()
+        sent = 0
+        for attempt in range(2):
+            try:
+                if self.socket is None:
+                    self.connect()
+                sent += self._send(keys[sent:], interval)
+                break
+            except OSError as e:
+                print(f"Lost connection to ydotoold ({e}), reconnecting")
+                sent += getattr(e, 'keys_sent', 0)
+                self.close()
+                self.latency['reconnects'] += 1
+        else:
+            self.latency['fallbacks'] += 1
+            run_command(['ydotool', 'key', '--key-delay', str(interval * 1000),
+                         *[event for code, shift in keys[sent:] for event in self._tap_arguments(code, shift)]])
+
+        elapsed = time.perf_counter() - started
+        self.latency['count'] += 1
+        self.latency['total'] += elapsed
+        self.latency['max'] = max(self.latency['max'], elapsed)
+        self.latency['last'] = elapsed
+        ConfigManager.console_print(f"ydotool sent {len(keys)} keys in {elapsed * 1000:.0f} ms")
+
+    def _send(self, keys, interval):
+        """Send key events until done or the socket fails. Returns the number of keys sent before a failure."""
+        for sent, (code, shift) in enumerate(keys):
+            try:
+                if shift:
+                    self._emit(self.EV_KEY, _YDOTOOL_SHIFT, 1)
+                self._emit(self.EV_KEY, code, 1)
+                self._emit(self.EV_KEY, code, 0)
+                if shift:
+                    self._emit(self.EV_KEY, _YDOTOOL_SHIFT, 0)
+            except OSError as e:
+                # Resume after the last key that was sent completely
+                e.keys_sent = sent
+                raise
+            if interval:
+                time.sleep(interval)
+        return len(keys)
+
+    def _emit(self, event_type, code, value):
+        """Send one event followed by a synchronisation report."""
+        self.socket.send(self.EVENT.pack(0, 0, event_type, code, value))
+        self.socket.send(self.EVENT.pack(0, 0, self.EV_SYN, 0, 0))
+
+    @staticmethod
+    def _tap_arguments(code, shift):
+        """The `ydotool key` arguments that tap a key."""
+        taps = [f"{code}:1", f"{code}:0"]
+        return [f"{_YDOTOOL_SHIFT}:1", *taps, f"{_YDOTOOL_SHIFT}:0"] if shift else taps
+
+class AdaptiveDelay:
+    """
+    The pause between batches of key events, adapted to how well the target keeps up.
+
+    The pause shrinks by a fixed step after every batch that went through promptly and doubles
+    when events were refused or took much longer than usual to inject (additive decrease,
+    multiplicative increase). It never exceeds the pause the per-character path would have taken.
+    """
+
+    def __init__(self, max_delay, step=0.001):
+        """
+        Initialize the AdaptiveDelay.
+
+        :param max_delay: The longest pause in seconds
+        :param step: The amount in seconds the pause shrinks by after each prompt batch
+        """
+        self.max_delay = max_delay
+        self.step = min(step, max_delay)
+        self.delay = 0.0
+        self.event_time = None  # Moving average of the time to inject one event
+
+    def update(self, events, elapsed, complete=True):
+        """
+        Adapt the pause to the last batch and return it.
+
+        :param events: Number of events in the batch
+        :param elapsed: Seconds it took to inject the batch
+        :param complete: Whether all events were accepted
+        :return: The pause in seconds before the next batch
+        """
+        per_event = elapsed / max(events, 1)
+        congested = not complete or (self.event_time is not None and per_event > 2 * self.event_time)
+        self.event_time = per_event if self.event_time is None else 0.8 * self.event_time + 0.2 * per_event
+        if congested:
+            self.delay = min(max(self.delay * 2, self.step), self.max_delay)
+        else:
+            self.delay = max(self.delay - self.step, 0.0)
+        return self.delay
+
+
+if sys.platform == 'win32':
+    from ctypes import wintypes
+
+    _INPUT_KEYBOARD = 1
+    _KEYEVENTF_KEYUP = 0x0002
+    _KEYEVENTF_UNICODE = 0x0004
+    _VK_RETURN = 0x0D
+    _VK_TAB = 0x09
+
+    class _KEYBDINPUT(ctypes.Structure):
+        _fields_ = [('wVk', wintypes.WORD), ('wScan', wintypes.WORD), ('dwFlags', wintypes.DWORD),
+                    ('time', wintypes.DWORD), ('dwExtraInfo', ctypes.c_size_t)]
+
+    class _MOUSEINPUT(ctypes.Structure):
+        _fields_ = [('dx', wintypes.LONG), ('dy', wintypes.LONG), ('mouseData', wintypes.DWORD),
+                    ('dwFlags', wintypes.DWORD), ('time', wintypes.DWORD), ('dwExtraInfo', ctypes.c_size_t)]
+
+    class _INPUTUNION(ctypes.Union):
+        # The mouse structure is the largest member and sets the size SendInput expects
+        _fields_ = [('ki', _KEYBDINPUT), ('mi', _MOUSEINPUT)]
+
+    class _INPUT(ctypes.Structure):
+        _fields_ = [('type', wintypes.DWORD), ('union', _INPUTUNION)]
+
+    _user32 = ctypes.WinDLL('user32', use_last_error=True)
+    _user32.SendInput.argtypes = (wintypes.UINT, ctypes.POINTER(_INPUT), ctypes.c_int)
+    _user32.SendInput.restype = wintypes.UINT
+
+    def _key_inputs(text):
+        """Build key down/up events typing text as Unicode characters, with Enter and Tab as virtual keys."""
+        inputs = []
+        for char in text:
+            if char in '\r\n':
+                codes = [(_VK_RETURN, 0, 0)]
+            elif char == '\t':
+                codes = [(_VK_TAB, 0, 0)]
+            else:
+                # Characters outside the basic plane are sent as their two UTF-16 surrogates
+                encoded = char.encode('utf-16-le')
+                codes = [(0, int.from_bytes(encoded[i:i + 2], 'little'), _KEYEVENTF_UNICODE)
+                         for i in range(0, len(encoded), 2)]
+            for vk, scan, flags in codes:
+                for up in (0, _KEYEVENTF_KEYUP):
+                    inputs.append(_INPUT(type=_INPUT_KEYBOARD,
+                                         union=_INPUTUNION(ki=_KEYBDINPUT(wVk=vk, wScan=scan, dwFlags=flags | up))))
+        return inputs
+
+    def _send_input(inputs):
+        """Inject events with one SendInput call and return how many were accepted."""
+        array = (_INPUT * len(inputs))(*inputs)
+        return _user32.SendInput(len(inputs), array, ctypes.sizeof(_INPUT))
+
 
 class InputSimulator:
     """
     A class to simulate keyboard input using various methods.
     """
 
-    def __init__(self):
+    def __init__(self, clipboard_manager=None):
         """
         Initialize the InputSimulator with the specified configuration.
+
+        Args:
+            clipboard_manager (ClipboardManager): Used by the clipboard input method.
         """
         self.input_method = ConfigManager.get_config_value('post_processing', 'input_method')
+        self.clipboard_manager = clipboard_manager
         self.dotool_process = None
+        self.typing_delay = None
+        self.ydotool_session = None
 
         if self.input_method == 'pynput':
             self.keyboard = PynputController()
+        elif self.input_method == 'ydotool':
+            self.ydotool_session = YdotoolSession()
         elif self.input_method == 'dotool':
             self._initialize_dotool()
 
@@ -59,7 +311,7 @@ class InputSimulator:
         Args:
             text (str): The text to type.
         """
-        interval = ConfigManager.get_config_value('post_processing', 'writing_key_press_delay')
+        interval = ConfigManager.snapshot().post_processing.writing_key_press_delay
         if self.input_method == 'clipboard':
             self._typewrite_clipboard(text)
         elif self.input_method == 'pynput':
@@ -77,15 +329,14 @@ class InputSimulator:
         Args:
             text (str): The text to type.
         """
-        # Save current clipboard content
-        try:
-            old_clipboard = pyperclip.paste()
-        except:
-            old_clipboard = None
+        if self.clipboard_manager is None:
+            print("No clipboard available, cannot type with the clipboard input method")
+            return
 
-        # Copy text to clipboard and paste
-        pyperclip.copy(text)
-        time.sleep(0.05)  # Small delay to ensure clipboard is ready
+        # Save current clipboard content, then copy text to clipboard and paste
+        saved = self.clipboard_manager.save()
+        if not self.clipboard_manager.set_text(text):
+            return
 
         keyboard = PynputController()
         keyboard.press(Key.ctrl)
@@ -96,15 +347,60 @@ class InputSimulator:
         time.sleep(0.1)  # Wait for paste to complete
 
         # Restore old clipboard content
-        if old_clipboard is not None:
-            try:
-                pyperclip.copy(old_clipboard)
-            except:
-                pass
+        if saved:
+            self.clipboard_manager.restore()
 
     def _typewrite_pynput(self, text, interval):
         """
-        Simulate typing using pynput.
+        Simulate typing using pynput. On Windows batches of key events are injected with one SendInput
+        call each and an adaptive pause between them. Elsewhere, or if the batch size is 1 or bulk
+        injection fails, one character is typed at a time with the interval between keystrokes.
+
+        Args:
+            text (str): The text to type.
+            interval (float): The interval between keystrokes in seconds.
+        """
+        batch_size = ConfigManager.snapshot().post_processing.typing_batch_size or 1
+        if batch_size <= 1 or sys.platform != 'win32':
+            # Without SendInput a batch is only a run of single key presses, keep the configured delay
+            self._typewrite_pynput_per_char(text, interval)
+            return
+
+        max_delay = interval * batch_size
+        if self.typing_delay is None or self.typing_delay.max_delay != max_delay:
+            self.typing_delay = AdaptiveDelay(max_delay)
+
+        for start in range(0, len(text), batch_size):
+            try:
+                self._send_batch(text[start:start + batch_size])
+            except Exception as e:
+                print(f"Bulk typing failed, typing one character at a time: {e}")
+                self.typing_delay = None
+                self._typewrite_pynput_per_char(text[start:], interval)
+                return
+            time.sleep(self.typing_delay.delay)
+
+    def _send_batch(self, chunk):
+        """
+        Inject one batch of characters with SendInput and adapt the pause to how long it took and
+        whether it was accepted. Windows only.
+        """
+        inputs = _key_inputs(chunk)
+        sent = 0
+        while sent < len(inputs):
+            started = time.perf_counter()
+            accepted = _send_input(inputs[sent:])
+            if accepted == 0 and sent == 0:
+                # Nothing was typed, e.g. input is blocked for a window with higher privileges
+                raise ctypes.WinError(ctypes.get_last_error())
+            sent += accepted
+            delay = self.typing_delay.update(max(accepted, 1), time.perf_counter() - started, sent == len(inputs))
+            if sent < len(inputs):
+                time.sleep(delay)
+
+    def _typewrite_pynput_per_char(self, text, interval):
+        """
+        Simulate typing using pynput, one character at a time.
 
         Args:
             text (str): The text to type.
@@ -117,21 +413,13 @@ class InputSimulator:
 
     def _typewrite_ydotool(self, text, interval):
         """
-        Simulate typing using ydotool.
+        Simulate typing using the persistent ydotool session.
 
         Args:
             text (str): The text to type.
             interval (float): The interval between keystrokes in seconds.
         """
-        cmd = "ydotool"
-        run_command_or_exit_on_failure([
-            cmd,
-            "type",
-            "--key-delay",
-            str(interval * 1000),
-            "--",
-            text,
-        ])
+        self.ydotool_session.type(text, interval)
 
     def _typewrite_dotool(self, text, interval):
         """
@@ -146,9 +434,35 @@ class InputSimulator:
         self.dotool_process.stdin.write(f"type {text}\n")
         self.dotool_process.stdin.flush()
 
+    def backspace(self, count):
+        """
+        Simulate pressing backspace to delete previously typed characters.
+
+        Args:
+            count (int): The number of characters to delete.
+        """
+        if count <= 0:
+            return
+        interval = ConfigManager.snapshot().post_processing.writing_key_press_delay
+        if self.input_method == 'ydotool':
+            self.ydotool_session.backspace(count, interval)
+        elif self.input_method == 'dotool':
+            assert self.dotool_process and self.dotool_process.stdin
+            self.dotool_process.stdin.write(f"keydelay {interval * 1000}\n")
+            self.dotool_process.stdin.write(f"key {' '.join(['backspace'] * count)}\n")
+            self.dotool_process.stdin.flush()
+        else:
+            keyboard = self.keyboard if self.input_method == 'pynput' else PynputController()
+            for _ in range(count):
+                keyboard.press(Key.backspace)
+                keyboard.release(Key.backspace)
+                time.sleep(interval)
+
     def cleanup(self):
         """
         Perform cleanup operations, such as terminating the dotool process.
         """
         if self.input_method == 'dotool':
             self._terminate_dotool()
+        elif self.ydotool_session:
+            self.ydotool_session.close()
@@ -1,4 +1,9 @@
+import os
+import struct
+import threading
+import time
 from abc import ABC, abstractmethod
+from collections import Counter
 from enum import Enum, auto
 from typing import Callable, Set
 
@@ -242,34 +247,172 @@ class InputBackend(ABC):
         """
         pass
 
-class KeyChord:
+    def set_relevant_keys(self, keys):
+        """
+        Tell the backend which keys are bound, so it may ignore the others as early as possible.
+        Backends that cannot filter ignore this.
+
+        :param keys: Set of KeyCodes, or None for every key
+        """
+        pass
+
+# Actions that key chords can be bound to in recording_options.hotkeys. 'record' is also bound to activation_key
+HOTKEY_ACTIONS = ('record', 'cancel', 'retranscribe', 'toggle_output_method')
+
+# Dense bit index over all KeyCodes, so a set of keys is a single integer
+KEY_BITS = {key: 1 << index for index, key in enumerate(KeyCode)}
+
+class HotkeyEngine:
     """
-    Represents a combination of keys that need to be pressed simultaneously.
+    Matches the held keys against any number of key chords in constant time.
+
+    The held keys are kept as a bitmask over KEY_BITS. Each chord is compiled to the bitmasks of all
+    key combinations satisfying it (CTRL matches either Ctrl key), so finding the chord a key press
+    completes is a single dict lookup, however many chords are bound. A chord activates when exactly
+    its keys are held among the bound keys, so ctrl+space and ctrl+shift+space can be bound to
+    different actions, and stays active until one of its keys is released.
     """
 
-    def __init__(self, keys: Set[KeyCode | frozenset[KeyCode]]):
-        """Initialize the KeyChord."""
-        self.keys = keys
-        self.pressed_keys: Set[KeyCode] = set()
+    def __init__(self):
+        """Initialize the HotkeyEngine."""
+        self.bindings = {}  # bitmask of held keys -> action
+        self.bound_keys = 0  # bitmask of every key in a chord
+        self.pressed = 0  # bitmask of the held bound keys
+        self.active = {}  # action -> bitmask of the keys it was activated with
+
+    def bind(self, keys: Set[KeyCode | frozenset[KeyCode]], action: str):
+        """
+        Bind a chord to an action.
+
+        :param keys: KeyCodes and frozensets of alternative KeyCodes that make up the chord
+        :raises ValueError: If the chord is empty or one of its combinations is bound to another action
+        """
+        if not keys:
+            raise ValueError(f"No keys given for {action}")
+        masks = [0]
+        for key in keys:
+            alternatives = key if isinstance(key, frozenset) else (key,)
+            masks = [mask | KEY_BITS[alternative] for mask in masks for alternative in alternatives]
+        for mask in masks:
+            if self.bindings.get(mask, action) != action:
+                raise ValueError(f"Keys of {action} are already bound to {self.bindings[mask]}")
+        for mask in masks:
+            self.bindings[mask] = action
+            self.bound_keys |= mask
+
+    def keys(self) -> Set[KeyCode]:
+        """Get every key that is part of a chord."""
+        return {key for key, bit in KEY_BITS.items() if self.bound_keys & bit}
+
+    def update(self, key: KeyCode, event_type: InputEvent) -> tuple[str | None, list[str]]:
+        """
+        Update the held keys with a key event.
 
-    def update(self, key: KeyCode, event_type: InputEvent) -> bool:
-        """Update the state of pressed keys and check if the chord is active."""
+        :return: Tuple of (action activated by the event or None, actions deactivated by the event)
+        """
+        bit = KEY_BITS[key] & self.bound_keys
+        if not bit:
+            return None, []
         if event_type == InputEvent.KEY_PRESS:
-            self.pressed_keys.add(key)
-        elif event_type == InputEvent.KEY_RELEASE:
-            self.pressed_keys.discard(key)
-
-        return self.is_active()
-
-    def is_active(self) -> bool:
-        """Check if all keys in the chord are currently pressed."""
-        for key in self.keys:
-            if isinstance(key, frozenset):
-                if not any(k in self.pressed_keys for k in key):
-                    return False
-            elif key not in self.pressed_keys:
+            if self.pressed & bit:
+                return None, []  # Autorepeat of a held key
+            self.pressed |= bit
+            action = self.bindings.get(self.pressed)
+            if action is None or action in self.active:
+                return None, []
+            self.active[action] = self.pressed
+            return action, []
+        if event_type == InputEvent.KEY_RELEASE and self.pressed & bit:
+            self.pressed &= ~bit
+            released = [action for action, mask in self.active.items() if mask & bit]
+            for action in released:
+                del self.active[action]
+            return None, released
+        return None, []
+
+    def reset(self):
+        """Forget the held keys, without deactivating the active chords."""
+        self.pressed = 0
+        self.active.clear()
+
+# Keys that type a character without Shift, for counting the key events of typed text
+CHARACTER_KEYS = {
+    **{chr(ord('a') + index): KeyCode[chr(ord('A') + index)] for index in range(26)},
+    **dict(zip('1234567890', (KeyCode.ONE, KeyCode.TWO, KeyCode.THREE, KeyCode.FOUR, KeyCode.FIVE,
+                              KeyCode.SIX, KeyCode.SEVEN, KeyCode.EIGHT, KeyCode.NINE, KeyCode.ZERO))),
+    ' ': KeyCode.SPACE, '\n': KeyCode.ENTER, '\t': KeyCode.TAB, '-': KeyCode.MINUS, '=': KeyCode.EQUALS,
+    '[': KeyCode.LEFT_BRACKET, ']': KeyCode.RIGHT_BRACKET, ';': KeyCode.SEMICOLON, "'": KeyCode.QUOTE,
+    '`': KeyCode.BACKQUOTE, '\\': KeyCode.BACKSLASH, ',': KeyCode.COMMA, '.': KeyCode.PERIOD, '/': KeyCode.SLASH,
+}
+
+class SyntheticKeys:
+    """
+    Counts the key events the app is about to simulate, so the key listener can skip exactly those
+    and keep handling the user's own key presses and releases while text is being output.
+
+    Simulated events cannot be told apart from real ones by the input backends, so each expected
+    press and release is matched with the next event of the same key. Events a backend never sees
+    (e.g. X11 keystrokes seen by the evdev backend) are forgotten shortly after the output was sent,
+    so they cannot swallow real key presses later.
+    """
+
+    GRACE = 0.25
+
+    def __init__(self):
+        """Initialize the SyntheticKeys."""
+        self.expected = Counter()  # (KeyCode, InputEvent) -> number of events still to come
+        self.expires_at = None  # When the expected events are forgotten, None while they are being sent
+        self.lock = threading.Lock()
+
+    def expect_keys(self, keys):
+        """
+        Expect a press and a release of each key.
+
+        :param keys: Iterable of KeyCodes, one per key stroke
+        """
+        with self.lock:
+            for key in keys:
+                self.expected[(key, InputEvent.KEY_PRESS)] += 1
+                self.expected[(key, InputEvent.KEY_RELEASE)] += 1
+            self.expires_at = None
+
+    def expect_text(self, text):
+        """Expect the key strokes of typing text, with Shift for upper case letters."""
+        keys = []
+        for char in text:
+            if char in CHARACTER_KEYS:
+                keys.append(CHARACTER_KEYS[char])
+            elif char.lower() in CHARACTER_KEYS and char.isupper():
+                keys += [KeyCode.SHIFT_LEFT, CHARACTER_KEYS[char.lower()]]
+        self.expect_keys(keys)
+
+    def expect_paste(self):
+        """Expect the key strokes of pasting with Ctrl+V."""
+        self.expect_keys([KeyCode.CTRL_LEFT, KeyCode.V])
+
+    def expect_backspaces(self, count):
+        """Expect count presses of Backspace."""
+        self.expect_keys([KeyCode.BACKSPACE] * count)
+
+    def sent(self, grace=None):
+        """
+        Mark the expected events as sent. Those that have not arrived within the grace period are forgotten.
+
+        :param grace: Seconds to wait for the events, longer for input methods that send them asynchronously
+        """
+        with self.lock:
+            self.expires_at = time.monotonic() + (self.GRACE if grace is None else grace)
+
+    def consume(self, key, event_type) -> bool:
+        """Return whether the event was expected, i.e. simulated by the app, and count it off."""
+        with self.lock:
+            if self.expires_at is not None and time.monotonic() > self.expires_at:
+                self.expected.clear()
+                self.expires_at = None
+            if not self.expected[(key, event_type)]:
                 return False
-        return True
+            self.expected[(key, event_type)] -= 1
+            return True
 
 class KeyListener:
     """
@@ -277,15 +420,18 @@ class KeyListener:
     """
 
     def __init__(self):
-        """Initialize the KeyListener with backends and activation keys."""
+        """Initialize the KeyListener with backends and hotkeys."""
         self.backends = []
         self.active_backend = None
-        self.key_chord = None
+        self.hotkeys = None
+        self.synthetic_keys = SyntheticKeys()  # Key events of the text being output, which are not hotkeys
+        # The record action triggers on_activate and on_deactivate, the other actions their own callbacks
         self.callbacks = {
             "on_activate": [],
-            "on_deactivate": []
+            "on_deactivate": [],
+            **{action: [] for action in HOTKEY_ACTIONS if action != 'record'}
         }
-        self.load_activation_keys()
+        self.load_hotkeys()
         self.initialize_backends()
         self.select_backend_from_config()
 
@@ -322,6 +468,7 @@ class KeyListener:
             raise RuntimeError("No supported input backend found")
         self.active_backend = self.backends[0]
         self.active_backend.on_input_event = self.on_input_event
+        self.active_backend.set_relevant_keys(self.relevant_keys())
 
     def set_active_backend(self, backend_class):
         """Set a specific backend as active."""
@@ -331,6 +478,7 @@ class KeyListener:
                 self.stop()
             self.active_backend = new_backend
             self.active_backend.on_input_event = self.on_input_event
+            self.active_backend.set_relevant_keys(self.relevant_keys())
             self.start()
         else:
             raise ValueError(f"Backend {backend_class.__name__} is not available")
@@ -351,11 +499,26 @@ class KeyListener:
         if self.active_backend:
             self.active_backend.stop()
 
-    def load_activation_keys(self):
-        """Load activation keys from configuration."""
-        key_combination = ConfigManager.get_config_value('recording_options', 'activation_key')
-        keys = self.parse_key_combination(key_combination)
-        self.set_activation_keys(keys)
+    def load_hotkeys(self):
+        """Bind the activation key and the chords in recording_options.hotkeys to their actions."""
+        hotkeys = HotkeyEngine()
+        bindings = [(ConfigManager.get_config_value('recording_options', 'activation_key'), 'record')]
+        bindings += list((ConfigManager.get_config_value('recording_options', 'hotkeys') or {}).items())
+        for combination, action in bindings:
+            if action not in HOTKEY_ACTIONS:
+                print(f"Unknown hotkey action '{action}' for {combination}, expected one of {', '.join(HOTKEY_ACTIONS)}")
+                continue
+            combination = str(combination or '')
+            keys = self.parse_key_combination(combination)
+            if len(keys) != len({key.strip().upper() for key in combination.split('+') if key.strip()}):
+                # Binding the rest of the chord would trigger the action on a subset of its keys
+                print(f"Ignoring hotkey {combination} for {action}")
+                continue
+            try:
+                hotkeys.bind(keys, action)
+            except ValueError as e:
+                print(f"Cannot bind {combination}: {e}")
+        self.hotkeys = hotkeys
 
     def parse_key_combination(self, combination_string: str) -> Set[KeyCode | frozenset[KeyCode]]:
         """Parse a string representation of key combination into a set of KeyCodes."""
@@ -379,28 +542,24 @@ class KeyListener:
                     print(f"Unknown key: {key}")
         return keys
 
-    def set_activation_keys(self, keys: Set[KeyCode]):
-        """Set the activation keys for the KeyChord."""
-        self.key_chord = KeyChord(keys)
-
     def on_input_event(self, event):
-        """Handle input events and trigger callbacks if the key chord becomes active or inactive."""
-        if not self.key_chord or not self.active_backend:
+        """Handle input events and trigger the callbacks of the chords that become active or inactive."""
+        if not self.hotkeys or not self.active_backend:
             return
 
         key, event_type = event
 
-        # Ignore unknown keys (None)
-        if key is None:
+        # Ignore unknown keys (None) and the keys simulated to output text
+        if key is None or self.synthetic_keys.consume(key, event_type):
             return
 
-        was_active = self.key_chord.is_active()
-        is_active = self.key_chord.update(key, event_type)
-
-        if not was_active and is_active:
-            self._trigger_callbacks("on_activate")
-        elif was_active and not is_active:
+        activated, deactivated = self.hotkeys.update(key, event_type)
+        if 'record' in deactivated:
             self._trigger_callbacks("on_deactivate")
+        if activated == 'record':
+            self._trigger_callbacks("on_activate")
+        elif activated is not None:
+            self._trigger_callbacks(activated)
 
     def add_callback(self, event: str, callback: Callable):
         """Add a callback function for a specific event."""
@@ -412,15 +571,41 @@ class KeyListener:
         for callback in self.callbacks.get(event, []):
             callback()
 
-    def update_activation_keys(self):
-        """Update activation keys from the current configuration."""
-        self.load_activation_keys()
+    def update_hotkeys(self):
+        """Update the hotkeys from the current configuration."""
+        self.load_hotkeys()
+        if self.active_backend:
+            self.active_backend.set_relevant_keys(self.relevant_keys())
+
+    def relevant_keys(self) -> Set[KeyCode]:
+        """Get every key that is part of a hotkey."""
+        return self.hotkeys.keys() if self.hotkeys else set()
 
 class EvdevBackend(InputBackend):
     """
     Backend for handling input events using the evdev library.
+
+    Only devices that can send one of the relevant keys are opened, and the kernel is asked to
+    forward only those keys (EVIOCSMASK), so mouse movement or sensor reports do not wake the
+    listener. Events are read from the raw device file descriptors with epoll and filtered on
+    their type and code before any object is created. Devices plugged in later are picked up
+    through inotify on /dev/input.
     """
 
+    INPUT_DIRECTORY = '/dev/input'
+    # struct input_event: struct timeval time, __u16 type, __u16 code, __s32 value
+    EVENT = struct.Struct('llHHi')
+    EV_SYN, EV_KEY = 0x00, 0x01
+    KEY_CNT = 0x300
+    # Event types dropped entirely by the kernel mask: SYN, REL, ABS, MSC, SW, LED, SND, REP, FF, PWR, FF_STATUS.
+    # EV_KEY gets a mask of the relevant codes instead
+    MASKED_EVENT_TYPES = (EV_SYN, 0x02, 0x03, 0x04, 0x05, 0x11, 0x12, 0x14, 0x15, 0x16, 0x17)
+    # _IOW('E', 0x93, struct input_mask), struct input_mask: __u32 type, __u32 codes_size, __u64 codes_ptr
+    EVIOCSMASK = (1 << 30) | (16 << 16) | (ord('E') << 8) | 0x93
+    IN_CREATE, IN_ATTRIB, IN_DELETE = 0x100, 0x004, 0x200
+    IN_NONBLOCK, IN_CLOEXEC = os.O_NONBLOCK, os.O_CLOEXEC
+    INOTIFY_EVENT = struct.Struct('iIII')
+
     @classmethod
     def is_available(cls) -> bool:
         """Check if the evdev library is available."""
@@ -432,25 +617,57 @@ class EvdevBackend(InputBackend):
 
     def __init__(self):
         """Initialize the EvdevBackend."""
-        self.devices: List[evdev.InputDevice] = []
-        self.key_map: Optional[dict] = None
+        self.devices = {}  # file descriptor -> evdev.InputDevice
+        self.key_map = None
+        self.code_map = {}  # raw key code -> KeyCode, only for the relevant keys
+        self.relevant_keys = None
         self.evdev = None
-        self.thread: Optional[threading.Thread] = None
-        self.stop_event: Optional[threading.Event] = None
+        self.thread = None
+        self.stop_event = None
+        self.epoll = None
+        self.inotify_fd = None
+        self.wake_read, self.wake_write = None, None
+        self.stats = {'wakeups': 0, 'events_read': 0, 'events_handled': 0, 'devices_added': 0, 'devices_removed': 0}
+
+    def set_relevant_keys(self, keys):
+        """
+        Only listen for the given keys, reopening the devices if the backend is running.
+
+        :param keys: Set of KeyCodes, or None for every key
+        """
+        self.relevant_keys = set(keys) if keys is not None else None
+        if self.key_map is not None:
+            self._update_code_map()
+        if self.thread and self.thread.is_alive():
+            self._wake(b'r')
 
     def start(self):
         """Start the evdev backend."""
+        if self.thread and self.thread.is_alive():
+            return
         import evdev
+        import select
         import threading
         self.evdev = evdev
         self.key_map = self._create_key_map()
+        self._update_code_map()
+
+        self.epoll = select.epoll()
+        self.wake_read, self.wake_write = os.pipe2(os.O_NONBLOCK | os.O_CLOEXEC)
+        self.epoll.register(self.wake_read, select.EPOLLIN)
+        self._start_hotplug_watch()
+        for path in evdev.list_devices():
+            self._add_device(path)
 
-        # Initialize input devices
-        self.devices = [evdev.InputDevice(path) for path in evdev.list_devices()]
         self.stop_event = threading.Event()
         self._setup_signal_handler()
         self._start_listening()
 
+    def _update_code_map(self):
+        """Map the raw codes of the relevant keys to KeyCodes."""
+        self.code_map = {code: key for code, key in self.key_map.items()
+                         if self.relevant_keys is None or key in self.relevant_keys}
+
     def _setup_signal_handler(self):
         """Set up signal handlers for graceful shutdown."""
         import signal
@@ -466,6 +683,7 @@ class EvdevBackend(InputBackend):
         """Stop the evdev backend and clean up resources."""
         if self.stop_event:
             self.stop_event.set()
+            self._wake(b's')
 
         if self.thread:
             self.thread.join(timeout=1)  # Wait for up to 1 second
@@ -473,77 +691,199 @@ class EvdevBackend(InputBackend):
                 print("Thread did not terminate in time. Forcing exit.")
 
         # Close all devices
-        for device in self.devices:
+        for fd in list(self.devices):
+            self._remove_device(fd, count=False)
+        for fd in (self.inotify_fd, self.wake_read, self.wake_write):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self.inotify_fd, self.wake_read, self.wake_write = None, None, None
+        if self.epoll:
+            self.epoll.close()
+            self.epoll = None
+
+    def _wake(self, command):
+        """Wake the listening thread to stop (b's') or to reopen the devices (b'r')."""
+        if self.wake_write is not None:
             try:
-                device.close()
-            except Exception:
-                pass  # Ignore errors when closing devices
-        self.devices = []
+                os.write(self.wake_write, command)
+            except OSError:
+                pass
+
+    def _start_hotplug_watch(self):
+        """Watch /dev/input with inotify so devices plugged in later are opened."""
+        import ctypes
+        import select
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+            # A new node may only become readable once udev has set its permissions, hence IN_ATTRIB
+            if libc.inotify_add_watch(fd, self.INPUT_DIRECTORY.encode(),
+                                      self.IN_CREATE | self.IN_ATTRIB | self.IN_DELETE) < 0:
+                os.close(fd)
+                raise OSError(ctypes.get_errno(), f'Cannot watch {self.INPUT_DIRECTORY}')
+        except (OSError, AttributeError) as e:
+            print(f"Hotplug detection unavailable, devices plugged in later are ignored: {e}")
+            return
+        self.inotify_fd = fd
+        self.epoll.register(fd, select.EPOLLIN)
+
+    def _add_device(self, path):
+        """Open a device if it can send one of the relevant keys, and register it with epoll."""
+        import select
+        if any(device.path == path for device in self.devices.values()):
+            return
+        try:
+            device = self.evdev.InputDevice(path)
+        except OSError:
+            return  # No permission (yet) or already gone
+        key_codes = device.capabilities().get(self.EV_KEY, [])
+        if not any(code in self.code_map for code in key_codes):
+            device.close()
+            return
+        self._set_event_mask(device.fd)
+        self.devices[device.fd] = device
+        self.epoll.register(device.fd, select.EPOLLIN)
+        self.stats['devices_added'] += 1
+
+    def _remove_device(self, fd, count=True):
+        """Unregister and close a device."""
+        device = self.devices.pop(fd, None)
+        if device is None:
+            return
+        try:
+            self.epoll.unregister(fd)
+        except (OSError, ValueError):
+            pass
+        try:
+            device.close()
+        except Exception:
+            pass  # Ignore errors when closing devices
+        if count:
+            self.stats['devices_removed'] += 1
+
+    def _set_event_mask(self, fd):
+        """Ask the kernel to forward only the relevant key events of a device (Linux 4.4 and newer)."""
+        import array
+        import fcntl
+        key_bits = array.array('L', bytes(self.KEY_CNT // 8))
+        bits_per_word = key_bits.itemsize * 8
+        for code in self.code_map:
+            key_bits[code // bits_per_word] |= 1 << (code % bits_per_word)
+        try:
+            for event_type in self.MASKED_EVENT_TYPES:
+                fcntl.ioctl(fd, self.EVIOCSMASK, struct.pack('IIQ', event_type, 0, 0))
+            address, length = key_bits.buffer_info()
+            fcntl.ioctl(fd, self.EVIOCSMASK, struct.pack('IIQ', self.EV_KEY, length * key_bits.itemsize, address))
+        except OSError:
+            pass  # Older kernel, the events are filtered when they are read instead
+
+    def _reopen_devices(self):
+        """Reopen the devices after the relevant keys changed."""
+        for fd in list(self.devices):
+            self._remove_device(fd, count=False)
+        for path in self.evdev.list_devices():
+            self._add_device(path)
 
     def _start_listening(self):
         """Start the listening thread."""
         import threading
-        self.thread = threading.Thread(target=self._listen_loop)
+        self.thread = threading.Thread(target=self._listen_loop, daemon=True)
         self.thread.start()
 
     def _listen_loop(self):
-        """Main loop for listening to input events."""
-        import select
+        """Main loop for listening to input events, sleeping until a device or the hotplug watch has data."""
         while not self.stop_event.is_set():
             try:
-                # Wait for input events with a timeout of 0.1 seconds
-                r, _, _ = select.select(self.devices, [], [], 0.1)
-                for device in r:
-                    self._read_device_events(device)
-            except Exception as e:
+                ready = self.epoll.poll()
+            except InterruptedError:
+                continue
+            except (OSError, ValueError) as e:
                 if self.stop_event.is_set():
                     break
                 print(f"Unexpected error in _listen_loop: {e}")
+                continue
+            self.stats['wakeups'] += 1
+            for fd, _ in ready:
+                try:
+                    if fd == self.wake_read:
+                        self._handle_wake()
+                    elif fd == self.inotify_fd:
+                        self._handle_hotplug()
+                    elif fd in self.devices:
+                        self._read_device_events(fd)
+                except Exception as e:
+                    if self.stop_event.is_set():
+                        break
+                    print(f"Unexpected error in _listen_loop: {e}")
+
+    def _handle_wake(self):
+        """Handle the commands written to the wake pipe."""
+        try:
+            commands = os.read(self.wake_read, 64)
+        except BlockingIOError:
+            return
+        if b'r' in commands and not self.stop_event.is_set():
+            self._reopen_devices()
 
-    def _read_device_events(self, device):
-        """Read and process events from a single device."""
+    def _handle_hotplug(self):
+        """Open new event devices and drop removed ones, as reported by inotify."""
         try:
-            for event in device.read():
-                if event.type == self.evdev.ecodes.EV_KEY:
-                    self._handle_input_event(event)
-        except Exception as e:
-            self._handle_device_error(device, e)
+            data = os.read(self.inotify_fd, 4096)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset + self.INOTIFY_EVENT.size <= len(data):
+            _, mask, _, name_length = self.INOTIFY_EVENT.unpack_from(data, offset)
+            offset += self.INOTIFY_EVENT.size
+            name = data[offset:offset + name_length].rstrip(b'\0').decode(errors='replace')
+            offset += name_length
+            if not name.startswith('event'):
+                continue
+            path = os.path.join(self.INPUT_DIRECTORY, name)
+            if mask & self.IN_DELETE:
+                for fd, device in list(self.devices.items()):
+                    if device.path == path:
+                        print(f"Device {path} was removed.")
+                        self._remove_device(fd)
+            else:
+                self._add_device(path)
 
-    def _handle_device_error(self, device, error):
+    def _read_device_events(self, fd):
+        """Read the pending events of a device, handling only the relevant key presses and releases."""
+        try:
+            data = os.read(fd, self.EVENT.size * 64)
+        except OSError as e:
+            self._handle_device_error(fd, e)
+            return
+        self.stats['events_read'] += len(data) // self.EVENT.size
+        code_map = self.code_map
+        for _, _, event_type, code, value in self.EVENT.iter_unpack(data[:len(data) - len(data) % self.EVENT.size]):
+            if event_type != self.EV_KEY:
+                continue
+            key_code = code_map.get(code)
+            if key_code is None:
+                continue
+            # 1 is a press, 2 an autorepeat of a held key, 0 a release
+            self.stats['events_handled'] += 1
+            self.on_input_event((key_code, InputEvent.KEY_RELEASE if value == 0 else InputEvent.KEY_PRESS))
+
+    def _handle_device_error(self, fd, error):
         """Handle errors that occur when reading from a device."""
         import errno
         if isinstance(error, BlockingIOError) and error.errno == errno.EAGAIN:
             return  # Non-blocking IO is expected, just continue
+        device = self.devices.get(fd)
+        path = device.path if device is not None else fd
         if isinstance(error, OSError) and (error.errno == errno.EBADF or error.errno == errno.ENODEV):
-            print(f"Device {device.path} is no longer available. Removing it.")
-            self.devices.remove(device)
-        else:
-            print(f"Unexpected error reading device: {error}")
-
-    def _handle_input_event(self, event):
-        """Process a single input event."""
-        key_code, event_type = self._translate_key_event(event)
-        if key_code is not None and event_type is not None:
-            self.on_input_event((key_code, event_type))
-
-    def _translate_key_event(self, event) -> tuple[KeyCode | None, InputEvent | None]:
-        """Translate an evdev event to our internal representation."""
-        key_event = self.evdev.categorize(event)
-        if not isinstance(key_event, self.evdev.events.KeyEvent):
-            return None, None
-
-        key_code = self.key_map.get(key_event.scancode)
-        if key_code is None:
-            return None, None
-
-        if key_event.keystate in [key_event.key_down, key_event.key_hold]:
-            event_type = InputEvent.KEY_PRESS
-        elif key_event.keystate == key_event.key_up:
-            event_type = InputEvent.KEY_RELEASE
+            print(f"Device {path} is no longer available. Removing it.")
+            self._remove_device(fd)
         else:
-            return None, None
-
-        return key_code, event_type
+            print(f"Unexpected error reading device {path}: {error}")
 
     def _create_key_map(self):
         """Create a mapping from evdev key codes to our internal KeyCode enum."""
@@ -1,9 +1,10 @@
+import copy
 import os
 import sys
-import time
+import threading
 from audioplayer import AudioPlayer
 from pynput.keyboard import Controller, Listener as KeyboardListener, Key
-from PyQt5.QtCore import QObject, QProcess
+from PyQt5.QtCore import QObject, QProcess, QTimer, pyqtSignal
 from PyQt5.QtGui import QIcon
 from PyQt5.QtWidgets import QApplication, QSystemTrayIcon, QMenu, QAction, QMessageBox
 
@@ -12,10 +13,12 @@ from result_thread import ResultThread
 from ui.main_window import MainWindow
 from ui.settings_window import SettingsWindow
 from ui.status_window import StatusWindow
-from transcription import create_local_model
+from model_registry import ModelRegistry
 from input_simulation import InputSimulator
-from utils import ConfigManager
-from clipboard_manager import ClipboardManager
+from utils import ConfigManager, StartupProfiler
+from clipboard_manager import ClipboardManager, create_clipboard_backend
+from output_executor import OutputExecutor
+from transcription import ApiClient
 
 
 def manage_windows_startup(enable):
@@ -39,61 +42,137 @@ def manage_windows_startup(enable):
 
 
 class WhisperWriterApp(QObject):
-    def __init__(self, preloaded_model=None):
+    startupComplete = pyqtSignal()
+
+    def __init__(self):
         """
         Initialize the application, opening settings window if no configuration file is found.
         """
         super().__init__()
-        self.local_model = preloaded_model  # Store preloaded model before Qt init
-        self.app = QApplication(sys.argv)
-        self.app.setQuitOnLastWindowClosed(False)  # Don't quit when windows are closed
-        self.app.setWindowIcon(QIcon(os.path.join('assets', 'ww-logo.png')))
+        with StartupProfiler.phase('create QApplication'):
+            self.app = QApplication(sys.argv)
+            self.app.setQuitOnLastWindowClosed(False)  # Don't quit when windows are closed
+            self.app.setWindowIcon(QIcon(os.path.join('assets', 'ww-logo.png')))
 
         ConfigManager.initialize()
+        ModelRegistry.initialize()
+
+        # The settings window is only built when it is first opened
+        self.settings_window = None
+        self.result_thread = None
+        self.key_listener = None
+        self.input_simulator = None
+        self.output_executor = None
 
-        self.settings_window = SettingsWindow()
-        self.settings_window.settings_closed.connect(self.on_settings_closed)
-        self.settings_window.settings_saved.connect(self.restart_app)
+        if StartupProfiler.enabled:
+            self.startupComplete.connect(self.finish_startup_profile)
 
         if ConfigManager.config_file_exists():
             self.initialize_components()
         else:
             print('No valid configuration file found. Opening settings window...')
-            self.settings_window.show()
+            self.show_settings()
+
+    def show_settings(self):
+        """
+        Show the settings window, creating it on first use.
+        """
+        if self.settings_window is None:
+            self.settings_window = SettingsWindow()
+            self.settings_window.settings_closed.connect(self.on_settings_closed)
+            self.settings_window.settings_saved.connect(self.apply_settings)
+        self.settings_window.show()
 
     def initialize_components(self):
         """
         Initialize the components of the application.
+        The tray icon is shown first; the model keeps loading in the background and input
+        handling is set up once the event loop is running.
         """
-        self.input_simulator = InputSimulator()
-        self.clipboard_manager = ClipboardManager()
-
-        self.key_listener = KeyListener()
-        self.key_listener.add_callback("on_activate", self.on_activation)
-        self.key_listener.add_callback("on_deactivate", self.on_deactivation)
+        with StartupProfiler.phase('create tray icon'):
+            self.main_window = MainWindow()
+            self.main_window.openSettings.connect(self.show_settings)
+            self.main_window.closeApp.connect(self.exit_app)
+            self.create_tray_icon()
+            # Don't show main window - just tray icon
+            # self.main_window.show()
+
+        # Use the model preloaded by run.py if available, otherwise load it in the background
+        if (not ConfigManager.get_config_value('model_options', 'use_api')
+                or ConfigManager.get_config_value('model_options', 'api', 'local_fallback')):
+            ModelRegistry.load_async()
+            self.load_draft_model()
+            if StartupProfiler.enabled:
+                threading.Thread(target=self._wait_for_model_profile, daemon=True).start()
+        self._applied_config = copy.deepcopy(ConfigManager.get_config_section())
 
-        # Use preloaded model if available (loaded before PyQt5 to avoid DLL conflict)
-        if not hasattr(self, 'local_model') or self.local_model is None:
-            model_options = ConfigManager.get_config_section('model_options')
-            self.local_model = create_local_model() if not model_options.get('use_api') else None
-
-        self.result_thread = None
-        self._last_transcription_time = 0  # Cooldown tracking
-        self._processing_transcription = False  # Flag to block activations during processing
         self._any_key_listener = None  # Listener to stop recording on any key press
+        self._any_key_listener_suspended = False  # Whether it is to be started once the output has been sent
+        self._last_output = None  # Last text typed, replaced in place when a refined transcription arrives
+        self._streaming_output = False  # Whether pieces of a transcription are being output as they are decoded
+
+        # Long-lived capture and transcription worker, keeps the audio stream open.
+        # Audio devices are opened on its own thread, and recordings made before the model
+        # is ready are queued until it is.
+        with StartupProfiler.phase('start result thread'):
+            self.result_thread = ResultThread()
+            if not ConfigManager.get_config_value('misc', 'hide_status_window'):
+                self.status_window = StatusWindow()
+                self.result_thread.statusSignal.connect(self.status_window.updateStatus)
+                self.result_thread.partialResultSignal.connect(self.status_window.showPartialResult)
+                self.status_window.closeSignal.connect(self.stop_result_thread)
+            self.result_thread.resultSignal.connect(self.on_transcription_complete)
+            self.result_thread.refineSignal.connect(self.on_refined_transcription)
+            self.result_thread.retranscribeSignal.connect(self.on_retranscription)
+            self.result_thread.textStreamSignal.connect(self.on_text_streamed)
+            self.result_thread.start()
+
+        QTimer.singleShot(0, self.initialize_input)
+
+    def initialize_input(self):
+        """
+        Set up keyboard input and output once the tray icon is visible.
+        """
+        if StartupProfiler.milestone('tray icon shown'):
+            self.startupComplete.emit()
 
-        self.main_window = MainWindow()
-        self.main_window.openSettings.connect(self.settings_window.show)
-        self.main_window.startListening.connect(self.key_listener.start)
-        self.main_window.closeApp.connect(self.exit_app)
-
-        if not ConfigManager.get_config_value('misc', 'hide_status_window'):
-            self.status_window = StatusWindow()
-
-        self.create_tray_icon()
-        # Don't show main window - just tray icon
-        # self.main_window.show()
-        self.key_listener.start()  # Start listening immediately
+        with StartupProfiler.phase('set up input and output'):
+            max_format_kb = ConfigManager.get_config_value('output', 'clipboard_max_format_kb')
+            try:
+                backend = create_clipboard_backend(ConfigManager.get_config_value('output', 'clipboard_backend'))
+                self.clipboard_manager = ClipboardManager(backend, max_format_kb * 1024 if max_format_kb else None)
+                ConfigManager.console_print(f"Clipboard backend: {backend.name}")
+            except (ImportError, RuntimeError, OSError) as e:
+                print(f"Clipboard unavailable, text can only be typed: {e}")
+                self.clipboard_manager = None
+            self.key_listener = KeyListener()
+            self.input_simulator = InputSimulator(self.clipboard_manager)
+            self.output_executor = OutputExecutor(self.input_simulator, self.clipboard_manager,
+                                                  self.key_listener.synthetic_keys)
+            self.output_executor.outputFinished.connect(self.on_output_finished)
+            self.output_executor.start()
+
+            self.key_listener.add_callback("on_activate", self.on_activation)
+            self.key_listener.add_callback("on_deactivate", self.on_deactivation)
+            self.key_listener.add_callback("cancel", self.on_cancel)
+            self.key_listener.add_callback("retranscribe", self.on_retranscribe)
+            self.key_listener.add_callback("toggle_output_method", self.on_toggle_output_method)
+            self.main_window.startListening.connect(self.key_listener.start)
+            self.key_listener.start()  # Start listening immediately
+
+    def _wait_for_model_profile(self):
+        """Mark the model as ready for the startup profile once it has loaded, or end the profile if it failed to."""
+        if not ModelRegistry.wait_for_model():
+            self.startupComplete.emit()
+        elif StartupProfiler.milestone('model ready'):
+            self.startupComplete.emit()
+
+    def finish_startup_profile(self):
+        """
+        Print the startup timing breakdown and exit (--profile-startup).
+        """
+        print(StartupProfiler.report())
+        self.exit_app()
 
     def create_tray_icon(self):
         """
@@ -110,7 +189,7 @@ class WhisperWriterApp(QObject):
         tray_menu.addAction(show_action)
 
         settings_action = QAction('Open Settings', self.app)
-        settings_action.triggered.connect(self.settings_window.show)
+        settings_action.triggered.connect(self.show_settings)
         tray_menu.addAction(settings_action)
 
         exit_action = QAction('Exit', self.app)
@@ -121,10 +200,15 @@ class WhisperWriterApp(QObject):
         self.tray_icon.show()
 
     def cleanup(self):
+        if self.result_thread:
+            self.result_thread.stop()
         if self.key_listener:
             self.key_listener.stop()
+        if self.output_executor:
+            self.output_executor.stop()
         if self.input_simulator:
             self.input_simulator.cleanup()
+        ApiClient.close()
 
     def exit_app(self):
         """
@@ -133,6 +217,38 @@ class WhisperWriterApp(QObject):
         self.cleanup()
         QApplication.quit()
 
+    def load_draft_model(self):
+        """Load the configured draft model in the background, or release it if none is configured."""
+        draft_options = ModelRegistry.draft_model_options()
+        if draft_options:
+            ModelRegistry.load_async(draft_options, role='draft')
+        else:
+            ModelRegistry.deactivate('draft')
+
+    def can_apply_without_restart(self):
+        """Check whether only local model options changed since the settings were last applied."""
+        new_config = ConfigManager.get_config_section()
+        old_config = self._applied_config
+        if any(new_config.get(category) != old_config.get(category)
+               for category in set(new_config) | set(old_config) if category != 'model_options'):
+            return False
+        return not new_config['model_options'].get('use_api') and not old_config['model_options'].get('use_api')
+
+    def apply_settings(self):
+        """
+        Apply saved settings. Model changes are loaded in the background and swapped in atomically;
+        other changes restart the application.
+        """
+        if not hasattr(self, '_applied_config') or not self.can_apply_without_restart():
+            self.restart_app()
+            return
+
+        self._applied_config = copy.deepcopy(ConfigManager.get_config_section())
+        if ModelRegistry.active_key() != ModelRegistry.model_key():
+            ConfigManager.console_print('Loading the new model in the background...')
+            ModelRegistry.load_async(on_loaded=lambda model: ConfigManager.console_print('New model is now active.'))
+        self.load_draft_model()
+
     def restart_app(self):
         """Restart the application to apply the new settings."""
         # Update Windows startup based on setting
@@ -161,19 +277,10 @@ class WhisperWriterApp(QObject):
         """
         print(">>> on_activation called")
 
-        # Block activations while processing transcription
-        if self._processing_transcription:
-            print(">>> Ignoring activation (processing transcription)")
-            return
-
-        # Cooldown check - ignore activations within 1 second of last transcription
-        if time.time() - self._last_transcription_time < 1.0:
-            print(">>> Ignoring activation (cooldown)")
-            return
-
-        if self.result_thread and self.result_thread.isRunning():
+        # Recording can start again while the previous utterance is still being transcribed
+        if self.result_thread.is_recording:
             print(">>> Recording in progress, stopping...")
-            recording_mode = ConfigManager.get_config_value('recording_options', 'recording_mode')
+            recording_mode = ConfigManager.snapshot().recording_options.recording_mode
             if recording_mode == 'press_to_toggle':
                 self.result_thread.stop_recording()
             elif recording_mode == 'continuous':
@@ -187,23 +294,49 @@ class WhisperWriterApp(QObject):
         """
         Called when the activation key combination is released.
         """
-        if ConfigManager.get_config_value('recording_options', 'recording_mode') == 'hold_to_record':
-            if self.result_thread and self.result_thread.isRunning():
+        if ConfigManager.snapshot().recording_options.recording_mode == 'hold_to_record':
+            if self.result_thread.is_recording:
                 self.result_thread.stop_recording()
         else:
             # Start any-key listener now that hotkey is released
-            if self.result_thread and self.result_thread.isRunning():
+            if self.result_thread.is_recording:
                 self._start_any_key_listener()
 
+    def on_cancel(self):
+        """
+        Called when the cancel hotkey is pressed: stop the recording in progress and discard its audio.
+        """
+        self._stop_any_key_listener()
+        if self.result_thread.is_recording:
+            print(">>> Recording cancelled")
+            self.stop_result_thread()
+
+    def on_retranscribe(self):
+        """
+        Called when the retranscribe hotkey is pressed: transcribe the last recording again with the
+        retranscribe model. Its output replaces the previous one once it is done.
+        """
+        if self.result_thread.retranscribe_last():
+            print(">>> Transcribing the last recording again")
+        else:
+            print(">>> Nothing to transcribe again")
+
+    def on_toggle_output_method(self):
+        """
+        Called when the toggle_output_method hotkey is pressed: switch between manual and auto output.
+        The change lasts until the application restarts and is not saved to the configuration file.
+        """
+        print(f">>> Output method: {self.output_executor.toggle_output_method()}")
+
     def start_result_thread(self):
         """
-        Start the result thread to record audio and transcribe it.
+        Start recording a new utterance on the result thread.
         """
-        if self.result_thread and self.result_thread.isRunning():
+        if self.result_thread.is_recording:
             return
 
         # Play start sound (non-blocking)
-        if ConfigManager.get_config_value('misc', 'noise_on_start'):
+        if ConfigManager.snapshot().misc.noise_on_start:
             project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
             sound_path = os.path.join(project_root, 'assets', 'start.wav')
             try:
@@ -212,25 +345,23 @@ class WhisperWriterApp(QObject):
             except Exception as e:
                 print(f"Error playing start sound: {e}")
 
-        self.result_thread = ResultThread(self.local_model)
-        if not ConfigManager.get_config_value('misc', 'hide_status_window'):
-            self.result_thread.statusSignal.connect(self.status_window.updateStatus)
-            self.status_window.closeSignal.connect(self.stop_result_thread)
-        self.result_thread.resultSignal.connect(self.on_transcription_complete)
-        self.result_thread.start()
-
+        self.result_thread.start_recording()
 
     def stop_result_thread(self):
         """
-        Stop the result thread.
+        Cancel the current recording, discarding its audio.
         """
-        if self.result_thread and self.result_thread.isRunning():
-            self.result_thread.stop()
+        if self.result_thread.is_recording:
+            self.result_thread.cancel_recording()
 
     def _start_any_key_listener(self):
-        """Start listening for any key press to stop recording."""
+        """Start listening for any key press to stop recording, once no output is being sent."""
         if self._any_key_listener:
             return
+        if self._output_in_progress():
+            # It would suppress the simulated keystrokes
+            self._any_key_listener_suspended = True
+            return
 
         def on_any_key_press(key):
             # Ignore modifier keys (Ctrl, Shift, Alt, etc.)
@@ -239,7 +370,7 @@ class WhisperWriterApp(QObject):
                 return True  # Don't suppress modifier keys
             print(f">>> Any key pressed: {key} - stopping recording (key suppressed)")
             self._stop_any_key_listener()
-            if self.result_thread and self.result_thread.isRunning():
+            if self.result_thread.is_recording:
                 self.result_thread.stop_recording()
             return False  # Suppress the key - don't send it to the system
 
@@ -257,25 +388,66 @@ class WhisperWriterApp(QObject):
 
     def _stop_any_key_listener(self):
         """Stop the any key listener."""
+        self._any_key_listener_suspended = False
         if self._any_key_listener:
             self._any_key_listener.stop()
             self._any_key_listener = None
 
-    def on_transcription_complete(self, result):
+    def _suspend_any_key_listener(self):
+        """Stop the any key listener while output is sent, it is started again once the output has finished."""
+        if self._any_key_listener:
+            self._any_key_listener.stop()
+            self._any_key_listener = None
+            self._any_key_listener_suspended = True
+
+    def _resume_any_key_listener(self):
+        """Start the any key listener suspended for output again if its recording is still running."""
+        if not self._any_key_listener_suspended:
+            return
+        self._any_key_listener_suspended = False
+        if (self.result_thread.is_recording
+                and ConfigManager.snapshot().recording_options.recording_mode != 'hold_to_record'):
+            self._start_any_key_listener()
+
+    def _output_in_progress(self):
+        """Whether output is queued, being sent, or still being streamed."""
+        return self._streaming_output or bool(self.output_executor and self.output_executor.pending_outputs())
+
+    def on_refined_transcription(self, draft, refined):
         """
-        When the transcription is complete, type the result and start listening for the activation key again.
+        Replace the typed draft with the main model's transcription, deleting and retyping
+        only the part after the longest common prefix.
         """
-        # Block any activations during processing
-        self._processing_transcription = True
+        if refined == draft:
+            return
+        if self._last_output != draft:
+            print("Output changed since the draft was typed, keeping the draft")
+            return
 
-        # Stop the any-key listener
-        self._stop_any_key_listener()
+        prefix_length = len(os.path.commonprefix([draft, refined]))
+        print(f"Refining draft: deleting {len(draft) - prefix_length} and typing {len(refined) - prefix_length} characters")
 
-        # Stop key listener to prevent Ctrl+V from triggering hotkey
-        self.key_listener.stop()
+        self._suspend_any_key_listener()
+        self.output_executor.replace(len(draft) - prefix_length, refined[prefix_length:])
+        self._last_output = refined
 
-        # Play completion sound (non-blocking to not delay key listener restart)
-        if ConfigManager.get_config_value('misc', 'noise_on_completion'):
+    def on_retranscription(self, result):
+        """
+        Replace the last output with the new transcription of the same recording, or output it if the
+        last output cannot be replaced (it was streamed or nothing was output).
+        """
+        if self._last_output:
+            self.on_refined_transcription(self._last_output, result)
+        elif result:
+            self._suspend_any_key_listener()
+            self.output_executor.output(result)
+            self._last_output = result
+
+    def _play_completion_sound(self):
+        """
+        Play the completion sound if enabled (non-blocking to not delay key listener restart).
+        """
+        if ConfigManager.snapshot().misc.noise_on_completion:
             project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
             sound_path = os.path.join(project_root, 'assets', 'beep.wav')
             try:
@@ -284,61 +456,43 @@ class WhisperWriterApp(QObject):
             except Exception as e:
                 print(f"Error playing completion sound: {e}")
 
-        # Check output settings
-        copy_to_clipboard = ConfigManager.get_config_value('output', 'copy_to_clipboard')
-        auto_type = ConfigManager.get_config_value('output', 'auto_type')
-
-        if copy_to_clipboard:
-            try:
-                from pynput.keyboard import Controller, Key
-                import time
-
-                # Save current clipboard contents before overwriting
-                clipboard_saved = self.clipboard_manager.save()
-                if clipboard_saved:
-                    print(f"Clipboard saved: {self.clipboard_manager.get_format_names()}")
-
-                # Set transcription to clipboard and paste
-                self.clipboard_manager.set_text(result)
-                print(f"Copied to clipboard: {result}")
-
-                # Auto-paste with Ctrl+V
-                time.sleep(0.1)
-                keyboard = Controller()
-                keyboard.press(Key.ctrl)
-                keyboard.press('v')
-                time.sleep(0.05)
-                keyboard.release('v')
-                keyboard.release(Key.ctrl)
-                time.sleep(0.1)
-                print("Auto-pasted with Ctrl+V")
-
-                # Restore original clipboard contents
-                if clipboard_saved:
-                    time.sleep(0.1)  # Small delay to ensure paste is complete
-                    self.clipboard_manager.restore()
-                    print("Original clipboard restored")
-
-            except Exception as e:
-                print(f"Error copying/pasting: {e}")
+    def on_text_streamed(self, text, final):
+        """
+        Output a piece of a transcription as soon as it is decoded. The any key listener stays
+        suspended until the last piece has been output.
+        """
+        if not self._streaming_output:
+            self._streaming_output = True
+            self._suspend_any_key_listener()
 
-        if auto_type:
-            self.input_simulator.typewrite(result)
+        if text:
+            self.output_executor.output(text)
 
-        # Set cooldown timestamp before restarting listener
-        self._last_transcription_time = time.time()
+        if final:
+            self._streaming_output = False
+            self._last_output = None  # Streamed text is never replaced by a refinement
+            self._play_completion_sound()
+            if not self.output_executor.pending_outputs():
+                self._resume_any_key_listener()
 
-        # Restart key listener after paste is done
-        time.sleep(0.5)  # Longer delay to ensure all keys are released
+    def on_transcription_complete(self, result):
+        """
+        When the transcription is complete, output the result. The key listener skips the simulated
+        keystrokes, and the any key listener of a recording in progress is suspended until the output
+        has finished, as it would suppress them.
+        """
+        self._suspend_any_key_listener()
 
-        # Clear processing flag before restarting listener
-        self._processing_transcription = False
+        self._play_completion_sound()
+        self.output_executor.output(result)
+        self._last_output = result
 
-        if ConfigManager.get_config_value('recording_options', 'recording_mode') == 'continuous':
-            self.start_result_thread()
-        else:
-            self.key_listener.start()
-            print("Key listener restarted - ready for next recording")
+    def on_output_finished(self, report):
+        """
+        Resume the any key listener once all queued output has been sent, unless more streamed text is coming.
+        """
+        if not report['pending'] and not self._streaming_output:
+            self._resume_any_key_listener()
 
     def run(self):
         """
@@ -0,0 +1,301 @@
+"""
+Registry of loaded faster-whisper models.
+Models are loaded in the background, kept in a bounded LRU and switched atomically, so
+changing the model does not require restarting the application.
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import ConfigManager, StartupProfiler
+
+# Approximate memory footprint in MB of each model at float16; float32 doubles it, int8 halves it
+MODEL_SIZES_MB = {
+    'tiny': 75,
+    'base': 145,
+    'small': 485,
+    'medium': 1530,
+    'large': 3090,
+    'distil-large': 1510,
+    'turbo': 1620,
+}
+
+
+class ModelRegistry:
+    """
+    Keeps loaded WhisperModel instances keyed by (model, device, compute_type, model_path).
+
+    Two roles can be active at once: 'main', the model used for transcription, and 'draft',
+    an optional small model used for a fast first pass. Active models are never evicted; the
+    least recently used inactive models are evicted when the configured number of models or
+    the estimated memory limit is exceeded.
+    """
+
+    _instance = None
+
+    def __init__(self):
+        """Initialize the ModelRegistry instance."""
+        self.models = OrderedDict()
+        self.active = {}
+        self.lock = threading.RLock()
+        self.activated = threading.Condition(self.lock)
+        self.loading = {}
+        self.errors = {}  # role -> exception of its last failed background load
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='model-loader')
+
+    @classmethod
+    def initialize(cls):
+        """Initialize the ModelRegistry."""
+        if cls._instance is None:
+            cls._instance = cls()
+
+    @classmethod
+    def _get_instance(cls):
+        if cls._instance is None:
+            raise RuntimeError("ModelRegistry not initialized")
+        return cls._instance
+
+    @staticmethod
+    def model_key(local_model_options=None):
+        """
+        Get the registry key of a model configuration.
+
+        :param local_model_options: model_options.local section, defaults to the current configuration
+        :return: Tuple of (model, device, compute_type, model_path, num_workers)
+        """
+        if local_model_options is None:
+            local = ConfigManager.snapshot().model_options.local
+            model, device, compute_type = local.model, local.device, local.compute_type
+            model_path, num_workers = local.model_path, local.num_workers
+        else:
+            model, device, compute_type = (local_model_options['model'], local_model_options['device'],
+                                           local_model_options['compute_type'])
+            model_path, num_workers = local_model_options.get('model_path'), local_model_options.get('num_workers')
+        # int8 forces CPU usage in create_local_model
+        if compute_type == 'int8':
+            device = 'cpu'
+        return (model, device, compute_type, model_path, num_workers or 1)
+
+    @staticmethod
+    def draft_model_options():
+        """
+        Get the model options of the configured draft model.
+
+        :return: model_options.local section with the draft model swapped in, or None if no draft model is configured
+        """
+        local_model_options = ConfigManager.get_config_section('model_options', 'local')
+        if not local_model_options.get('draft_model'):
+            return None
+        draft_options = dict(local_model_options)
+        draft_options['model'] = local_model_options['draft_model']
+        draft_options['model_path'] = None
+        return draft_options
+
+    @staticmethod
+    def retranscribe_model_options():
+        """
+        Get the model options of the model used to transcribe the last recording again.
+
+        :return: model_options.local section with the retranscribe model swapped in, or None to use the main model
+        """
+        local_model_options = ConfigManager.get_config_section('model_options', 'local')
+        if not local_model_options.get('retranscribe_model'):
+            return None
+        retranscribe_options = dict(local_model_options)
+        retranscribe_options['model'] = local_model_options['retranscribe_model']
+        retranscribe_options['model_path'] = None
+        return retranscribe_options
+
+    @classmethod
+    def get_model(cls, key):
+        """Get a loaded model by key and mark it as recently used, or None if it is not loaded."""
+        registry = cls._get_instance()
+        with registry.lock:
+            model = registry.models.get(key)
+            if model is not None:
+                registry.models.move_to_end(key)
+            return model
+
+    @classmethod
+    def key_of(cls, model):
+        """Get the key of a loaded model instance, or None if it is not in the registry."""
+        if model is None or cls._instance is None:
+            return None
+        with cls._instance.lock:
+            return next((key for key, loaded in cls._instance.models.items() if loaded is model), None)
+
+    @classmethod
+    def active_model(cls, role='main'):
+        """Get the active model for a role, or None if there is none yet."""
+        registry = cls._get_instance()
+        with registry.lock:
+            key = registry.active.get(role)
+            return registry.models.get(key) if key else None
+
+    @classmethod
+    def active_key(cls, role='main'):
+        """Get the key of the active model for a role."""
+        registry = cls._get_instance()
+        with registry.lock:
+            return registry.active.get(role)
+
+    @classmethod
+    def is_ready(cls, role='main'):
+        """Check whether a model is active for a role."""
+        return cls.active_model(role) is not None
+
+    @classmethod
+    def load_error(cls, role='main'):
+        """Get the exception the last background load of a role failed with, or None."""
+        registry = cls._get_instance()
+        with registry.lock:
+            return registry.errors.get(role)
+
+    @classmethod
+    def wait_for_model(cls, role='main', timeout=None):
+        """
+        Wait until a model is active for a role, or loading it in the background failed.
+
+        :param timeout: Maximum time to wait in seconds, or None to wait indefinitely
+        :return: True if a model is active, False on timeout or if the load failed (see load_error)
+        """
+        registry = cls._get_instance()
+        with registry.activated:
+            registry.activated.wait_for(
+                lambda: registry.active.get(role) in registry.models or role in registry.errors, timeout)
+            return registry.active.get(role) in registry.models
+
+    @classmethod
+    def load(cls, local_model_options=None, role='main', activate=True):
+        """
+        Load a model synchronously, reusing it if it is already loaded.
+
+        :param local_model_options: model_options.local section, defaults to the current configuration
+        :param role: Role to activate the model for
+        :param activate: Whether to make the model active for the role once loaded
+        :return: The loaded WhisperModel
+        """
+        from transcription import create_local_model
+
+        registry = cls._get_instance()
+        key = cls.model_key(local_model_options)
+        model = cls.get_model(key)
+        if model is None:
+            with StartupProfiler.phase(f'load {role} model ({key[0]})'):
+                model = create_local_model(local_model_options)
+            with registry.lock:
+                registry.models[key] = model
+        if activate:
+            cls.activate(key, role)
+        else:
+            cls._evict()
+        return model
+
+    @classmethod
+    def load_async(cls, local_model_options=None, role='main', activate=True, on_loaded=None):
+        """
+        Load a model on the background loader thread.
+        Models are loaded one at a time; requesting a model that is already loading returns the same future.
+        If loading fails, the error is printed and kept as the role's load_error, waking up wait_for_model.
+
+        :param on_loaded: Optional callback receiving the model once it is loaded
+        :return: concurrent.futures.Future resolving to the loaded WhisperModel
+        """
+        registry = cls._get_instance()
+        key = cls.model_key(local_model_options)
+
+        def load_model():
+            try:
+                model = cls.load(local_model_options, role, activate)
+            finally:
+                with registry.lock:
+                    registry.loading.pop((key, role), None)
+            if on_loaded:
+                on_loaded(model)
+            return model
+
+        def on_done(future):
+            if future.cancelled() or future.exception() is None:
+                return
+            error = future.exception()
+            print(f"Failed to load the {role} model {key[0]}: {type(error).__name__}: {error}")
+            with registry.activated:
+                registry.errors[role] = error
+                registry.activated.notify_all()
+
+        with registry.lock:
+            future = registry.loading.get((key, role))
+            if future is None:
+                registry.errors.pop(role, None)
+                future = registry.executor.submit(load_model)
+                registry.loading[(key, role)] = future
+                future.add_done_callback(on_done)
+        return future
+
+    @classmethod
+    def activate(cls, key, role='main'):
+        """
+        Atomically switch the active model of a role to an already loaded model.
+
+        :param key: Registry key of the model
+        :param role: Role to activate the model for
+        """
+        registry = cls._get_instance()
+        with registry.lock:
+            if key not in registry.models:
+                raise KeyError(f"Model {key} is not loaded")
+            registry.active[role] = key
+            registry.errors.pop(role, None)
+            registry.models.move_to_end(key)
+            registry.activated.notify_all()
+        ConfigManager.console_print(f'Active {role} model: {key[0]} ({key[1]}, {key[2]})')
+        cls._evict()
+
+    @classmethod
+    def deactivate(cls, role):
+        """Clear the active model of a role, allowing it to be evicted."""
+        registry = cls._get_instance()
+        with registry.lock:
+            registry.active.pop(role, None)
+        cls._evict()
+
+    @classmethod
+    def loaded_keys(cls):
+        """Get the keys of all loaded models, least recently used first."""
+        registry = cls._get_instance()
+        with registry.lock:
+            return list(registry.models.keys())
+
+    @staticmethod
+    def estimate_size_mb(key):
+        """Estimate the memory footprint of a model in MB from its name and compute type."""
+        name, _, compute_type = key[:3]
+        base = next((size for prefix, size in sorted(MODEL_SIZES_MB.items(), key=lambda item: -len(item[0]))
+                     if name.startswith(prefix)), MODEL_SIZES_MB['large'])
+        if compute_type == 'float32':
+            return base * 2
+        if compute_type.startswith('int8'):
+            return base // 2
+        return base
+
+    @classmethod
+    def _evict(cls):
+        """Evict least recently used inactive models until the configured limits are met."""
+        registry = cls._get_instance()
+        local_options = ConfigManager.snapshot().model_options.local
+        max_models = local_options.max_loaded_models or 1
+        memory_limit_mb = local_options.model_memory_limit_mb or 0
+
+        with registry.lock:
+            active_keys = set(registry.active.values())
+            for key in list(registry.models.keys()):
+                total_mb = sum(cls.estimate_size_mb(k) for k in registry.models)
+                over_count = len(registry.models) > max(max_models, len(active_keys))
+                over_memory = memory_limit_mb and total_mb > memory_limit_mb
+                if not (over_count or over_memory):
+                    break
+                if key in active_keys:
+                    continue
+                del registry.models[key]
+                ConfigManager.console_print(f'Evicted model {key[0]} ({key[1]}, {key[2]}) from memory.')
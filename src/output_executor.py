@@ -0,0 +1,307 @@
+import queue
+import time
+import traceback
+from PyQt5.QtCore import QThread, pyqtSignal
+from pynput.keyboard import Controller as PynputController, Key
+
+from utils import ConfigManager
+
+
+class OutputTask:
+    """
+    A piece of text to output, optionally replacing previously output characters.
+    """
+
+    def __init__(self, text, backspaces=0):
+        """
+        Initialize the OutputTask.
+
+        :param text: Text to paste and/or type
+        :param backspaces: Number of characters to delete before outputting the text
+        """
+        self.text = text
+        self.backspaces = backspaces
+        self.submitted_at = time.perf_counter()
+
+
+class OutputCostModel:
+    """
+    Estimates how long pasting and typing a text take on this machine, learned from past outputs.
+
+    Pasting costs a roughly fixed time regardless of length, typing costs a time per character.
+    The per-character cost is kept separately for ASCII and other characters, which most input
+    methods type more slowly. Estimates are exponentially weighted moving averages of measured
+    times, starting from priors based on the settings.
+    """
+
+    ALPHA = 0.3
+
+    def __init__(self, paste_cost=0.05, char_cost=0.005):
+        """
+        Initialize the OutputCostModel.
+
+        :param paste_cost: Prior for the seconds a paste takes
+        :param char_cost: Prior for the seconds typing one character takes
+        """
+        self.paste_cost = paste_cost
+        self.char_cost = {'ascii': char_cost, 'other': char_cost}
+        self.samples = {'paste': 0, 'type': 0}
+
+    @staticmethod
+    def count_non_ascii(text):
+        return sum(1 for char in text if ord(char) > 127)
+
+    def estimate(self, method, text):
+        """Estimated seconds to output text with 'paste' or 'type'."""
+        if method == 'paste':
+            return self.paste_cost
+        non_ascii = self.count_non_ascii(text)
+        return (len(text) - non_ascii) * self.char_cost['ascii'] + non_ascii * self.char_cost['other']
+
+    def choose(self, text, input_method):
+        """
+        Choose the cheaper way to output text.
+
+        :param text: The text to output
+        :param input_method: The configured input method used for typing
+        :return: Tuple of ('paste' or 'type', reason)
+        """
+        non_ascii = self.count_non_ascii(text)
+        if non_ascii and input_method in ('ydotool', 'dotool'):
+            return 'paste', f'{input_method} cannot type {non_ascii} non-ASCII characters'
+        if self.paste_cost == float('inf'):
+            return 'type', 'the clipboard is unavailable'
+
+        paste, typing = self.estimate('paste', text), self.estimate('type', text)
+        method = 'paste' if paste < typing else 'type'
+        return method, (f'estimated {paste * 1000:.0f} ms to paste vs {typing * 1000:.0f} ms to type '
+                        f'{len(text)} characters ({non_ascii} non-ASCII), '
+                        f'from {self.samples["paste"]} pastes and {self.samples["type"]} typed outputs')
+
+    def observe(self, method, text, seconds):
+        """Update the estimates with the measured time of an output."""
+        if not text:
+            return
+        self.samples[method] += 1
+        if method == 'paste':
+            self.paste_cost += self.ALPHA * (seconds - self.paste_cost)
+            return
+
+        non_ascii = self.count_non_ascii(text)
+        if non_ascii:
+            # Attribute what the ASCII characters do not explain to the other characters
+            ascii_time = (len(text) - non_ascii) * self.char_cost['ascii']
+            kind, per_char = 'other', max(seconds - ascii_time, 0.0) / non_ascii
+        else:
+            kind, per_char = 'ascii', seconds / len(text)
+        self.char_cost[kind] += self.ALPHA * (per_char - self.char_cost[kind])
+
+    def mark_paste_unavailable(self):
+        """Stop choosing paste after it failed."""
+        self.paste_cost = float('inf')
+
+
+class OutputExecutor(QThread):
+    """
+    Outputs transcriptions on its own thread so the GUI thread never waits for keystrokes.
+
+    Tasks are executed in the order they were submitted. After a paste the previous clipboard
+    contents are restored once the configured delay has passed without another paste, without
+    blocking anything in the meantime; consecutive pastes keep the originally saved contents.
+
+    Signals:
+        outputFinished: Emits the method, length, execution time and total latency of each output,
+                        the error if it failed and the number of outputs still pending; it is emitted
+                        for failed outputs too, so whoever waits for the output can carry on
+    """
+
+    outputFinished = pyqtSignal(dict)
+
+    def __init__(self, input_simulator, clipboard_manager, synthetic_keys=None):
+        """
+        Initialize the OutputExecutor.
+
+        :param input_simulator: InputSimulator used for typing and deleting text
+        :param clipboard_manager: ClipboardManager used to save, set and restore the clipboard
+        :param synthetic_keys: SyntheticKeys told about every key event before it is simulated, so
+                               the key listener does not mistake them for the user's
+        """
+        super().__init__()
+        self.input_simulator = input_simulator
+        self.clipboard_manager = clipboard_manager
+        self.synthetic_keys = synthetic_keys
+        self.tasks = queue.Queue()
+        self.latency = {}
+        self.cost_model = OutputCostModel(
+            char_cost=ConfigManager.snapshot().post_processing.writing_key_press_delay or 0.005)
+        self.output_method = None  # Set by the toggle hotkey, overrides output.output_method without saving it
+        self._clipboard_saved = False
+        self._restore_at = None
+
+    def output(self, text):
+        """Queue text to be output."""
+        self.tasks.put(OutputTask(text))
+
+    def replace(self, backspaces, text):
+        """Queue deleting the last `backspaces` output characters and outputting text in their place."""
+        self.tasks.put(OutputTask(text, backspaces))
+
+    def current_output_method(self):
+        """The output method in use, 'auto' or 'manual'."""
+        return self.output_method or ConfigManager.snapshot().output.output_method
+
+    def toggle_output_method(self):
+        """Switch between the manual and auto output methods until the application restarts, returning the new one."""
+        self.output_method = 'auto' if self.current_output_method() == 'manual' else 'manual'
+        return self.output_method
+
+    def pending_outputs(self):
+        """Number of outputs queued or in progress."""
+        return self.tasks.unfinished_tasks
+
+    def stop(self):
+        """Finish the queued outputs, restore the clipboard and stop the thread."""
+        self.tasks.put(None)
+        self.wait()
+
+    def run(self):
+        """Execute queued outputs, restoring the clipboard when it is due."""
+        while True:
+            timeout = None if self._restore_at is None else max(self._restore_at - time.perf_counter(), 0)
+            try:
+                task = self.tasks.get(timeout=timeout)
+            except queue.Empty:
+                self._restore_clipboard()
+                continue
+
+            if task is None:
+                self.tasks.task_done()
+                self._restore_clipboard()
+                break
+
+            report = None
+            try:
+                report = self._execute(task)
+            except Exception as e:
+                traceback.print_exc()
+                elapsed = time.perf_counter() - task.submitted_at
+                report = {'method': 'failed', 'characters': len(task.text), 'backspaces': task.backspaces,
+                          'execution': elapsed, 'latency': elapsed, 'error': f'{type(e).__name__}: {e}'}
+            finally:
+                self.tasks.task_done()
+                if report is not None:
+                    report['pending'] = self.pending_outputs()
+                    self.outputFinished.emit(report)
+
+    def _execute(self, task):
+        """Output one task and return its timing report."""
+        started = time.perf_counter()
+        try:
+            if task.backspaces:
+                self._expect_keys('backspace', task.backspaces)
+                self.input_simulator.backspace(task.backspaces)
+
+            paste, typing = self._choose_methods(task.text)
+            methods = []
+            if paste:
+                paste_started = time.perf_counter()
+                try:
+                    self._paste(task.text)
+                    self.cost_model.observe('paste', task.text, time.perf_counter() - paste_started)
+                    methods.append('clipboard')
+                except Exception as e:
+                    ConfigManager.console_print(f"Error pasting: {e}")
+                    if self.current_output_method() == 'auto':
+                        self.cost_model.mark_paste_unavailable()
+                        typing = True
+            if typing:
+                type_started = time.perf_counter()
+                self._expect_keys('type', task.text)
+                self.input_simulator.typewrite(task.text)
+                self.cost_model.observe('type', task.text, time.perf_counter() - type_started)
+                methods.append(self.input_simulator.input_method)
+        finally:
+            if self.synthetic_keys:
+                self.synthetic_keys.sent(self._synthetic_grace(task))
+        finished = time.perf_counter()
+
+        method = '+'.join(methods) or 'none'
+        execution, latency = finished - started, finished - task.submitted_at
+        stats = self.latency.setdefault(method, {'count': 0, 'total': 0.0, 'max': 0.0})
+        stats['count'] += 1
+        stats['total'] += execution
+        stats['max'] = max(stats['max'], execution)
+        ConfigManager.console_print(
+            f'Output {len(task.text)} characters via {method} in {execution * 1000:.0f} ms '
+            f'({latency * 1000:.0f} ms after submission; mean {stats["total"] / stats["count"] * 1000:.0f} ms '
+            f'over {stats["count"]})')
+        return {'method': method, 'characters': len(task.text), 'backspaces': task.backspaces,
+                'execution': execution, 'latency': latency, 'error': None}
+
+    def _expect_keys(self, action, argument):
+        """
+        Tell the key listener about the key events an output action is about to simulate.
+
+        :param action: 'backspace', 'paste' or 'type'
+        :param argument: Number of backspaces, or the text pasted or typed
+        """
+        if not self.synthetic_keys:
+            return
+        if action == 'backspace':
+            self.synthetic_keys.expect_backspaces(argument)
+        elif action == 'paste' or self.input_simulator.input_method == 'clipboard':
+            self.synthetic_keys.expect_paste()
+        else:
+            self.synthetic_keys.expect_text(argument)
+
+    def _synthetic_grace(self, task):
+        """Seconds the simulated key events of a task may take to arrive after it has been sent."""
+        if self.input_simulator.input_method != 'dotool':
+            return None
+        # dotool types from its own process while we carry on
+        interval = ConfigManager.snapshot().post_processing.writing_key_press_delay or 0
+        return self.synthetic_keys.GRACE + (len(task.text) + task.backspaces) * interval
+
+    def _choose_methods(self, text):
+        """Decide whether to paste and/or type text, returning (paste, type)."""
+        if not text:
+            return False, False
+        if self.current_output_method() != 'auto':
+            return (bool(ConfigManager.snapshot().output.copy_to_clipboard),
+                    bool(ConfigManager.snapshot().output.auto_type))
+
+        method, reason = self.cost_model.choose(text, self.input_simulator.input_method)
+        ConfigManager.console_print(f"Output method: {method}, {reason}")
+        return method == 'paste', method == 'type'
+
+    def _paste(self, text):
+        """Put text on the clipboard and paste it with Ctrl+V, scheduling the clipboard restore."""
+        if self.clipboard_manager is None:
+            raise RuntimeError("No clipboard backend available")
+        if not self._clipboard_saved:
+            # Only save before the first of consecutive pastes, later ones would save our own text
+            self._clipboard_saved = self.clipboard_manager.save()
+            if self._clipboard_saved:
+                ConfigManager.console_print(f"Clipboard saved: {self.clipboard_manager.get_format_names()}")
+
+        # set_text returns once the text can be read back, so the paste cannot get the old contents
+        if not self.clipboard_manager.set_text(text):
+            raise RuntimeError("Could not set the clipboard text")
+        self._expect_keys('paste', text)
+        keyboard = PynputController()
+        keyboard.press(Key.ctrl)
+        keyboard.press('v')
+        keyboard.release('v')
+        keyboard.release(Key.ctrl)
+
+        # The target application reads the clipboard asynchronously, restore it later
+        delay_ms = ConfigManager.snapshot().output.clipboard_restore_delay or 0
+        self._restore_at = time.perf_counter() + delay_ms / 1000
+
+    def _restore_clipboard(self):
+        """Restore the clipboard contents saved before the first paste."""
+        self._restore_at = None
+        if self._clipboard_saved:
+            self.clipboard_manager.restore()
+            self._clipboard_saved = False
+            ConfigManager.console_print("Original clipboard restored")
@@ -1,193 +1,656 @@
+import queue
 import time
 import traceback
 import numpy as np
-import sounddevice as sd
 import tempfile
 import wave
-import webrtcvad
 from PyQt5.QtCore import QThread, QMutex, pyqtSignal
 from collections import deque
-from threading import Event
+from threading import Event, Lock, Thread
 
-from transcription import transcribe
+from audio_buffer import AudioBuffer, RingBuffer
+from model_registry import ModelRegistry
+from streaming import StreamingTranscriber
+from transcription import transcribe, transcribe_batch, transcribe_streaming, word_edit_distance
 from utils import ConfigManager
+from vad import SilenceTracker, compact_silence, create_vad
+
+FRAME_DURATION_MS = 30  # 30ms frame duration for WebRTC VAD
+
+
+class TranscriptionJob:
+    """
+    A recorded utterance waiting to be transcribed, with the time spent in each stage.
+    """
+
+    def __init__(self, job_id, audio_data, streamer=None, streamed_samples=0, timestamp_map=None, retranscribe=False):
+        """
+        Initialize the TranscriptionJob.
+
+        :param job_id: Sequential number of the utterance
+        :param audio_data: numpy array of the recorded audio
+        :param streamer: StreamingTranscriber that already decoded part of the audio (if applicable)
+        :param streamed_samples: Number of samples already handed to the streamer
+        :param timestamp_map: TimestampMap from the compacted audio to the original recording (if compacted)
+        :param retranscribe: Whether this is an earlier recording transcribed again with the retranscribe model
+        """
+        self.job_id = job_id
+        self.audio_data = audio_data
+        self.streamer = streamer
+        self.streamed_samples = streamed_samples
+        self.timestamp_map = timestamp_map
+        self.retranscribe = retranscribe
+        self.draft = None
+        self.streamed_output = False
+        self.words = []
+        self.queued_at = time.perf_counter()
+        self.timings = {}
 
 
 class ResultThread(QThread):
     """
-    A thread class for handling audio recording, transcription, and result processing.
+    A long-lived thread class for handling audio recording, transcription, and result processing.
+
+    The audio input stream is opened once and kept open. The thread itself captures utterances
+    and puts them on a job queue; a separate transcription worker takes jobs from the queue, so
+    the next utterance can be recorded while the previous one is still being transcribed.
 
     This class manages the entire process of:
     1. Recording audio from the microphone
     2. Detecting speech and silence
-    3. Saving the recorded audio as numpy array
-    4. Transcribing the audio
+    3. Saving the recorded audio as numpy array and queueing it
+    4. Transcribing the audio, optionally chunk by chunk while still recording (streaming mode)
     5. Emitting the transcription result
 
     Signals:
         statusSignal: Emits the current status of the thread (e.g., 'recording', 'transcribing', 'idle')
-        resultSignal: Emits the transcription result
+        resultSignal: Emits the transcription result (the draft in two-pass mode)
+        refineSignal: Emits the draft and the main model's transcription of the same audio in two-pass mode
+        retranscribeSignal: Emits the new transcription of the last recording requested with retranscribe_last
+        textStreamSignal: Emits each post-processed piece of text as it is decoded, and whether it is the last
+        partialResultSignal: Emits the committed and tentative text while streaming
+        timingsSignal: Emits the per-stage timings of each transcribed utterance
     """
 
     statusSignal = pyqtSignal(str)
     resultSignal = pyqtSignal(str)
+    refineSignal = pyqtSignal(str, str)
+    retranscribeSignal = pyqtSignal(str)
+    textStreamSignal = pyqtSignal(str, bool)
+    partialResultSignal = pyqtSignal(str, str)
+    timingsSignal = pyqtSignal(dict)
 
-    def __init__(self, local_model=None):
+    def __init__(self, input_stream_factory=None):
         """
         Initialize the ResultThread.
 
-        :param local_model: Local transcription model (if applicable)
+        :param input_stream_factory: Callable creating the audio input stream, defaults to sounddevice.InputStream.
+                                     Used to replay recorded audio without a microphone.
         """
         super().__init__()
-        self.local_model = local_model
+        self.input_stream_factory = input_stream_factory
         self.is_recording = False
         self.is_running = True
+        self.is_transcribing = False
         self.sample_rate = None
+        self.frame_size = None
+        self.streamer = None
+        self.streamed_samples = 0
+        self.speech_flags = None
+        self.last_audio = None
         self.mutex = QMutex()
+        self.job_queue = queue.Queue()
+        self.job_timings = deque(maxlen=100)
+        self.refine_stats = {'refined': 0, 'changed': 0, 'edit_distance': 0, 'draft_words': 0}
+        self._next_job_id = 1
+        self._cancelled = False
+        self._record_requested = Event()
+        self._data_ready = Event()
+        self._capture_buffer = None
+        self._capture_lock = Lock()
+        self._pre_roll = None
+        self._transcription_thread = None
+
+    @property
+    def local_model(self):
+        """The active local model; it can be swapped in the ModelRegistry while the thread is running."""
+        return ModelRegistry.active_model()
+
+    def start_recording(self):
+        """Start recording a new utterance on the open audio stream."""
+        self.mutex.lock()
+        self.is_recording = True
+        self._cancelled = False
+        self._record_requested.set()
+        self.mutex.unlock()
 
     def stop_recording(self):
-        """Stop the current recording session."""
+        """Stop the current recording session and queue what was recorded for transcription."""
+        self.mutex.lock()
+        self.is_recording = False
+        self.mutex.unlock()
+
+    def cancel_recording(self):
+        """Stop the current recording session and discard what was recorded."""
         self.mutex.lock()
+        self._cancelled = True
         self.is_recording = False
         self.mutex.unlock()
+        self._data_ready.set()
 
     def stop(self):
-        """Stop the entire thread execution."""
+        """Stop the entire thread execution, discarding pending transcriptions."""
         self.mutex.lock()
         self.is_running = False
+        self.is_recording = False
         self.mutex.unlock()
+        self._record_requested.set()
+        self._data_ready.set()
         self.statusSignal.emit('idle')
         self.wait()
 
+    def retranscribe_last(self):
+        """
+        Queue the last transcribed recording to be transcribed again with the retranscribe model.
+        The main model would only give the same transcription again, so a different model has to be set.
+
+        :return: False if nothing has been transcribed yet or there is no other model to transcribe it with
+        """
+        if self.last_audio is None:
+            return False
+        options = ModelRegistry.retranscribe_model_options()
+        if (options is None or ConfigManager.snapshot().model_options.use_api
+                or ModelRegistry.model_key(options) == ModelRegistry.model_key()):
+            ConfigManager.console_print('Set model_options.local.retranscribe_model to a model other than the '
+                                        'main model to transcribe recordings again')
+            return False
+        job = TranscriptionJob(self._next_job_id, self.last_audio, retranscribe=True)
+        self._next_job_id += 1
+        self.job_queue.put(job)
+        return True
+
+    def _retranscribe(self, audio_data):
+        """
+        Transcribe a recording again with the retranscribe model. The model is active for the
+        'retranscribe' role while it decodes, so it is neither evicted nor left out of the cache.
+        """
+        options = ModelRegistry.retranscribe_model_options()
+        if options is None or ConfigManager.snapshot().model_options.use_api:
+            return transcribe(audio_data, self.local_model)
+        ConfigManager.console_print(f"Loading {options['model']} to transcribe the last recording again...")
+        model = ModelRegistry.load(options, role='retranscribe')
+        try:
+            return transcribe(audio_data, model)
+        finally:
+            # Evictable again once the limit on loaded models needs the room
+            ModelRegistry.deactivate('retranscribe')
+
+    def queue_depth(self):
+        """Number of recorded utterances waiting to be transcribed."""
+        return self.job_queue.qsize()
+
     def run(self):
-        """Main execution method for the thread."""
+        """Main execution method for the thread: capture utterances until the thread is stopped."""
+        self._transcription_thread = Thread(target=self._transcription_loop, name='transcription-worker', daemon=True)
+        self._transcription_thread.start()
+
         try:
-            if not self.is_running:
-                return
+            while self.is_running:
+                try:
+                    self._run_capture_stream()
+                except Exception:
+                    traceback.print_exc()
+                    self.stop_recording()
+                    self.statusSignal.emit('error')
+                    if self.is_running:
+                        self.msleep(1000)  # Avoid a tight loop if the audio device keeps failing
+        finally:
+            self.job_queue.put(None)
+            self._transcription_thread.join(timeout=1)  # Don't hold up shutdown for a decode in progress
+
+    def _run_capture_stream(self):
+        """Open the audio input stream and record utterances whenever a recording is requested."""
+        input_stream_factory = self.input_stream_factory
+        if input_stream_factory is None:
+            # Imported on this thread so audio device discovery does not delay startup
+            import sounddevice as sd
+            input_stream_factory = sd.InputStream
+
+        recording_options = ConfigManager.snapshot().recording_options
+        self.sample_rate = recording_options.sample_rate or 16000
+        self.frame_size = int(self.sample_rate * (FRAME_DURATION_MS / 1000.0))
+        self._pre_roll = self._create_pre_roll(recording_options)
+
+        # The stream stays open between utterances so opening it is not on the critical path
+        with input_stream_factory(samplerate=self.sample_rate, channels=1, dtype='int16',
+                                  blocksize=self.frame_size, device=recording_options.sound_device,
+                                  callback=self._audio_callback):
+            while self.is_running:
+                if not self._record_requested.wait(timeout=0.1):
+                    continue
+                self._record_requested.clear()
+                self._capture_utterances()
+
+    def _create_pre_roll(self, recording_options):
+        """
+        Create the ring buffer that keeps the most recent input between recordings.
 
-            self.mutex.lock()
-            self.is_recording = True
-            self.mutex.unlock()
+        :return: RingBuffer, or None if pre-roll is disabled
+        """
+        pre_roll_ms = recording_options.pre_roll_duration or 0
+        if pre_roll_ms <= 0:
+            return None
+
+        # Keep whole frames so the VAD frame grid is unchanged, within the memory cap
+        pre_roll_frames = int(pre_roll_ms / FRAME_DURATION_MS)
+        max_memory_kb = recording_options.pre_roll_max_memory_kb or 64
+        max_frames = int(max_memory_kb * 1024 / (2 * self.frame_size))
+        pre_roll_frames = min(pre_roll_frames, max_frames)
+        if pre_roll_frames <= 0:
+            return None
+
+        pre_roll = RingBuffer(pre_roll_frames * self.frame_size)
+        ConfigManager.console_print(f'Keeping {pre_roll_frames * FRAME_DURATION_MS} ms of pre-roll audio ({pre_roll.nbytes / 1024:.1f} KB).')
+        return pre_roll
+
+    def _audio_callback(self, indata, frames, time_info, status):
+        """Write incoming audio into the utterance being recorded, or into the pre-roll between recordings."""
+        if status:
+            ConfigManager.console_print(f"Audio callback status: {status}")
+        with self._capture_lock:
+            if self._capture_buffer is not None:
+                self._capture_buffer.write(indata[:, 0])
+                self._data_ready.set()
+            elif self._pre_roll is not None:
+                self._pre_roll.write(indata[:, 0])
+
+    def _capture_utterances(self):
+        """
+        Record utterances and queue them for transcription until recording is stopped.
+        In continuous mode, recording restarts immediately after each pause in speech.
+        """
+        while self.is_running and self.is_recording:
+            model_options = ConfigManager.snapshot().model_options
+            if (model_options.local.streaming_transcription and not model_options.use_api
+                    and self.local_model):
+                self.streamer = StreamingTranscriber(self.local_model, on_update=self.partialResultSignal.emit)
 
             self.statusSignal.emit('recording')
             ConfigManager.console_print('Recording...')
+            capture_start = time.perf_counter()
             audio_data = self._record_audio()
-
-            if not self.is_running:
+            capture_time = time.perf_counter() - capture_start
+
+            streamer, self.streamer = self.streamer, None
+            job = None
+            if audio_data is None or self._cancelled or not self.is_running:
+                if streamer:
+                    streamer.cancel()
+            else:
+                timestamp_map = None
+                if not streamer:
+                    audio_data, timestamp_map = self._compact_audio(audio_data)
+                job = TranscriptionJob(self._next_job_id, audio_data, streamer, self.streamed_samples, timestamp_map)
+                job.timings['capture'] = capture_time
+                self._next_job_id += 1
+
+            finished = ConfigManager.snapshot().recording_options.recording_mode != 'continuous'
+            if finished:
+                # Leave the recording state before the job is queued, so the status emitted here
+                # cannot overwrite the one the transcription worker emits for the job
+                self._finish_recording(job_pending=job is not None)
+            if job is not None:
+                self.job_queue.put(job)
+                ConfigManager.console_print(f'Utterance {job.job_id} queued for transcription (queue depth: {self.queue_depth()})')
+            if finished:
                 return
 
-            if audio_data is None:
-                self.statusSignal.emit('idle')
-                return
+        self._finish_recording()
+
+    def _finish_recording(self, job_pending=False):
+        """
+        Clear the recording flag and emit the status, unless a new recording was requested in the meantime.
 
+        :param job_pending: Whether the last utterance is about to be queued for transcription
+        """
+        self.mutex.lock()
+        if not self._record_requested.is_set():
+            self.is_recording = False
+        self.mutex.unlock()
+        if job_pending and not self.is_recording:
             self.statusSignal.emit('transcribing')
-            ConfigManager.console_print('Transcribing...')
+        else:
+            self._emit_current_status()
 
-            # Time the transcription process
-            start_time = time.time()
-            result = transcribe(audio_data, self.local_model)
-            end_time = time.time()
+    def _compact_audio(self, audio_data):
+        """
+        Trim leading and trailing silence and shorten long pauses using the recording loop's VAD decisions.
 
-            transcription_time = end_time - start_time
-            ConfigManager.console_print(f'Transcription completed in {transcription_time:.2f} seconds. Post-processed line: {result}')
+        :return: Tuple of (audio to decode, TimestampMap or None if the audio is unchanged)
+        """
+        max_pause_ms = ConfigManager.snapshot().recording_options.max_pause_duration or 0
+        if max_pause_ms <= 0 or self.speech_flags is None:
+            return audio_data, None
+
+        compacted, timestamp_map = compact_silence(audio_data, self.speech_flags, self.frame_size,
+                                                   self.sample_rate, max_pause_ms)
+        if timestamp_map is not None:
+            ConfigManager.console_print(f'Removed {(len(audio_data) - len(compacted)) / self.sample_rate:.2f} s '
+                                        f'of silence before decoding ({len(compacted) / self.sample_rate:.2f} s left).')
+        return compacted, timestamp_map
+
+    def _transcription_loop(self):
+        """Transcribe queued utterances in order, independently of the capture loop."""
+        carried_over = deque()
+        while True:
+            job = carried_over.popleft() if carried_over else self.job_queue.get()
+            if job is None:
+                break
 
             if not self.is_running:
-                return
-
-            self.statusSignal.emit('idle')
-            self.resultSignal.emit(result)
+                if job.streamer:
+                    job.streamer.cancel()
+                continue
+
+            # When a backlog has built up, decode several utterances in one batch
+            jobs = [job]
+            batch_size = ConfigManager.snapshot().model_options.local.batch_size or 1
+            if batch_size > 1 and not job.streamer and not job.retranscribe:
+                while len(jobs) < batch_size:
+                    try:
+                        next_job = self.job_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if next_job is None or next_job.streamer or next_job.retranscribe:
+                        carried_over.append(next_job)
+                        break
+                    jobs.append(next_job)
+
+            # A single utterance is decoded sequentially, with the options the batched pipeline lacks
+            self._transcribe_jobs(jobs, batched=len(jobs) > 1)
+
+    def _transcribe_jobs(self, jobs, batched=False):
+        """Transcribe one or more queued utterances and emit their results in order."""
+        # Utterances recorded while the model is still loading wait here instead of being dropped
+        if not ConfigManager.snapshot().model_options.use_api and not ModelRegistry.is_ready():
+            ConfigManager.console_print('Waiting for the model to finish loading...')
+            self.is_transcribing = True
+            self._emit_current_status()
+            while self.is_running and not ModelRegistry.wait_for_model(timeout=0.5):
+                if ModelRegistry.load_error() is not None:
+                    self._fail_jobs(jobs, f'the model failed to load: {ModelRegistry.load_error()}')
+                    return
+
+        for job in jobs:
+            job.timings['queue'] = time.perf_counter() - job.queued_at
+        self.is_transcribing = True
+        self._emit_current_status()
+        ConfigManager.console_print('Transcribing...' if len(jobs) == 1 else f'Transcribing {len(jobs)} utterances in one batch...')
 
-        except Exception as e:
+        try:
+            # Time the transcription process
+            start_time = time.perf_counter()
+            if jobs[0].streamer:
+                # Earlier chunks were decoded while recording, only the tail is left
+                results = [jobs[0].streamer.finish(jobs[0].audio_data[jobs[0].streamed_samples:])]
+            elif jobs[0].retranscribe:
+                results = [self._retranscribe(jobs[0].audio_data)]
+            elif batched:
+                results = transcribe_batch([job.audio_data for job in jobs], self.local_model)
+            elif self._should_stream_output():
+                job = jobs[0]
+                job.streamed_output = True
+                results = [transcribe_streaming(job.audio_data,
+                                                on_text=lambda text, start, end: self._emit_text(job, text, start, end, start_time),
+                                                local_model=self.local_model)]
+            else:
+                job = jobs[0]
+                results = [transcribe(job.audio_data, self.local_model,
+                                      on_draft=lambda draft: self._emit_draft(job, draft, start_time))]
+            transcription_time = time.perf_counter() - start_time
+        except Exception:
             traceback.print_exc()
+            self.is_transcribing = False
             self.statusSignal.emit('error')
-            self.resultSignal.emit('')
-        finally:
-            self.stop_recording()
+            if jobs[0].streamed_output:
+                # Let the output side finish the text it has already received
+                self.textStreamSignal.emit('', True)
+            return
+
+        self.is_transcribing = False
+        if not jobs[-1].retranscribe:
+            self.last_audio = jobs[-1].audio_data
+        for job, result in zip(jobs, results):
+            job.timings['transcription'] = transcription_time
+            job.timings['batch_size'] = len(jobs)
+            if job.draft is not None:
+                self._record_refinement(job, result)
+            ConfigManager.console_print(f'Transcription completed in {transcription_time:.2f} seconds. Post-processed line: {result}')
+            self._report_timings(job)
+
+        if not self.is_running:
+            return
+
+        self._emit_current_status()
+        for job, result in zip(jobs, results):
+            if job.streamed_output:
+                self.textStreamSignal.emit('', True)
+            elif job.retranscribe:
+                self.retranscribeSignal.emit(result)
+            elif job.draft is None:
+                self.resultSignal.emit(result)
+            else:
+                self.refineSignal.emit(job.draft, result)
+
+    def _fail_jobs(self, jobs, reason):
+        """Drop utterances that cannot be transcribed, reporting an error."""
+        ConfigManager.console_print(f'Cannot transcribe {len(jobs)} utterance(s), {reason}')
+        for job in jobs:
+            if job.streamer:
+                job.streamer.cancel()
+        self.is_transcribing = False
+        self.statusSignal.emit('error')
+
+    def _should_stream_output(self):
+        """Check whether decoded text should be output segment by segment."""
+        return (ConfigManager.snapshot().output.stream_segments
+                and not ConfigManager.snapshot().model_options.use_api
+                and not ModelRegistry.is_ready('draft'))
+
+    def _emit_text(self, job, text, start, end, start_time):
+        """Emit a piece of decoded text so it can be output before the rest of the utterance is decoded."""
+        if 'first_text' not in job.timings:
+            job.timings['first_text'] = time.perf_counter() - start_time
+        if start is not None and job.timestamp_map is not None:
+            # Times in the original recording rather than in the compacted audio
+            start, end = job.timestamp_map.to_original(start), job.timestamp_map.to_original(end)
+        job.words.append((text, start, end))
+        if self.is_running:
+            self.textStreamSignal.emit(text, False)
+
+    def _emit_draft(self, job, draft, start_time):
+        """Emit the draft model's transcription so it can be typed while the main model refines it."""
+        job.draft = draft
+        job.timings['draft'] = time.perf_counter() - start_time
+        ConfigManager.console_print(f"Draft completed in {job.timings['draft']:.2f} seconds: {draft}")
+        if self.is_running:
+            self.resultSignal.emit(draft)
+
+    def _record_refinement(self, job, result):
+        """Record how much the main model's transcription differs from the draft."""
+        distance = word_edit_distance(job.draft, result)
+        job.timings['refine_edit_distance'] = distance
+        self.refine_stats['refined'] += 1
+        self.refine_stats['changed'] += job.draft != result
+        self.refine_stats['edit_distance'] += distance
+        self.refine_stats['draft_words'] += len(job.draft.split())
+        stats = self.refine_stats
+        ConfigManager.console_print(
+            f"Refine pass changed {distance} word(s) of the draft; "
+            f"{stats['changed']}/{stats['refined']} drafts changed so far, "
+            f"{stats['edit_distance'] / max(stats['draft_words'], 1):.1%} of draft words edited")
+
+    def _report_timings(self, job):
+        """Record and emit the per-stage timings of a transcribed utterance."""
+        timings = {
+            'job_id': job.job_id,
+            'capture': job.timings.get('capture', 0.0),
+            'queue': job.timings.get('queue', 0.0),
+            'transcription': job.timings.get('transcription', 0.0),
+            'batch_size': job.timings.get('batch_size', 1),
+            'draft': job.timings.get('draft'),
+            'first_text': job.timings.get('first_text'),
+            'refine_edit_distance': job.timings.get('refine_edit_distance'),
+            'queue_depth': self.queue_depth(),
+            'overlapped_recording': self.is_recording,
+        }
+        self.job_timings.append(timings)
+        first_text = f" (first text after {timings['first_text']:.2f}s)" if timings['first_text'] is not None else ''
+        ConfigManager.console_print(
+            f"Utterance {timings['job_id']}: capture {timings['capture']:.2f}s, queued {timings['queue']:.2f}s, "
+            f"transcription {timings['transcription']:.2f}s{first_text}, {timings['queue_depth']} waiting"
+            f"{', recording in parallel' if timings['overlapped_recording'] else ''}")
+        self.timingsSignal.emit(timings)
+
+    def _emit_current_status(self):
+        """Emit the status matching what the capture loop and transcription worker are doing."""
+        if self.is_recording:
+            self.statusSignal.emit('recording')
+        elif self.is_transcribing or self.queue_depth():
+            self.statusSignal.emit('transcribing')
+        else:
+            self.statusSignal.emit('idle')
 
     def _record_audio(self):
         """
-        Record audio from the microphone and save it to a temporary file.
+        Record one utterance from the open input stream into a preallocated buffer.
 
         :return: numpy array of audio data, or None if the recording is too short
         """
-        recording_options = ConfigManager.get_config_section('recording_options')
-        self.sample_rate = recording_options.get('sample_rate') or 16000
-        frame_duration_ms = 30  # 30ms frame duration for WebRTC VAD
-        frame_size = int(self.sample_rate * (frame_duration_ms / 1000.0))
-        silence_duration_ms = recording_options.get('silence_duration') or 900
+        recording_options = ConfigManager.snapshot().recording_options
+        frame_duration_ms = FRAME_DURATION_MS
+        frame_size = self.frame_size
+        silence_duration_ms = recording_options.silence_duration or 900
         silence_frames = int(silence_duration_ms / frame_duration_ms)
 
-        # Maximum recording duration (safety timeout)
-        max_duration_seconds = recording_options.get('max_duration') or 80
+        # Maximum recording duration (safety timeout), the pre-roll comes on top of it
+        max_duration_seconds = recording_options.max_duration or 80
         max_frames = int(max_duration_seconds * self.sample_rate / frame_size)
+        pre_roll_capacity = self._pre_roll.capacity // frame_size if self._pre_roll is not None else 0
 
         # 150ms delay before starting VAD to avoid mistaking the sound of key pressing for voice
         initial_frames_to_skip = int(0.15 * self.sample_rate / frame_size)
 
-        # Create VAD only for recording modes that use it
-        recording_mode = recording_options.get('recording_mode') or 'continuous'
+        # Create VAD only for recording modes that use it, to split chunks when streaming, or to
+        # compact silence before decoding
+        recording_mode = recording_options.recording_mode or 'continuous'
+        stop_on_silence = recording_mode in ('voice_activity_detection', 'continuous')
         vad = None
-        if recording_mode in ('voice_activity_detection', 'continuous'):
-            vad = webrtcvad.Vad(2)  # VAD aggressiveness: 0 to 3, 3 being the most aggressive
-            speech_detected = False
-            silent_frame_count = 0
-
-        audio_buffer = deque(maxlen=frame_size)
-        recording = []
+        self.speech_flags = None
+        if stop_on_silence or self.streamer or (recording_options.max_pause_duration or 0) > 0:
+            vad = create_vad(sample_rate=self.sample_rate, frame_size=frame_size)
+            silence = SilenceTracker()
+            speech_flags = np.zeros(max_frames + pre_roll_capacity + 1, dtype=bool)
+
+        # Streaming: cut a chunk at each shorter pause and preview the open chunk every second
+        self.streamed_samples = 0
+        if self.streamer:
+            local_options = ConfigManager.snapshot().model_options.local
+            pause_frames = int((local_options.streaming_pause_duration or 300) / frame_duration_ms)
+            min_chunk_frames = int(1000 / frame_duration_ms)
+            preview_interval_frames = int(1000 / frame_duration_ms)
+            chunk_start_frame = 0
+            chunk_has_speech = False
+            last_preview_frame = 0
+
+        # Preallocate for the maximum duration plus one block of slack so the buffer never grows
+        audio_buffer = AudioBuffer((max_frames + pre_roll_capacity + 1) * frame_size)
         total_frames_recorded = 0
 
-        data_ready = Event()
-
-        def audio_callback(indata, frames, time, status):
-            if status:
-                ConfigManager.console_print(f"Audio callback status: {status}")
-            audio_buffer.extend(indata[:, 0])
-            data_ready.set()
-
-        with sd.InputStream(samplerate=self.sample_rate, channels=1, dtype='int16',
-                            blocksize=frame_size, device=recording_options.get('sound_device'),
-                            callback=audio_callback):
+        # Start with the pre-roll so speech from just before activation is kept, then let the
+        # audio callback write into this buffer until recording stops
+        self._data_ready.clear()
+        with self._capture_lock:
+            if self._pre_roll is not None:
+                pre_roll_frames = min(len(self._pre_roll) // frame_size, pre_roll_capacity)
+                audio_buffer.write(self._pre_roll.read(pre_roll_frames * frame_size))
+                self._pre_roll.clear()
+                # The pre-roll may contain the activation key press, don't use it to detect speech
+                initial_frames_to_skip += pre_roll_frames
+                max_frames += pre_roll_frames
+            self._capture_buffer = audio_buffer
+        try:
             while self.is_running and self.is_recording:
-                data_ready.wait()
-                data_ready.clear()
-
-                if len(audio_buffer) < frame_size:
+                # Classify every complete frame that arrived since the last pass in one call
+                available_frames = min(audio_buffer.available_frames(frame_size), max_frames)
+                if available_frames <= total_frames_recorded:
+                    self._data_ready.wait(timeout=0.1)
+                    self._data_ready.clear()
                     continue
+                first_frame, total_frames_recorded = total_frames_recorded, available_frames
+                if vad:
+                    flags = vad.speech_flags(audio_buffer.view(first_frame * frame_size,
+                                                               total_frames_recorded * frame_size))
+                    speech_flags[first_frame:total_frames_recorded] = flags
 
-                # Save frame
-                frame = np.array(list(audio_buffer), dtype=np.int16)
-                audio_buffer.clear()
-                recording.extend(frame)
-                total_frames_recorded += 1
+                # Avoid trying to detect voice in initial frames
+                skipped_frames = min(initial_frames_to_skip, total_frames_recorded - first_frame)
+                initial_frames_to_skip -= skipped_frames
+                first_frame += skipped_frames
+
+                if vad and first_frame < total_frames_recorded:
+                    flags = flags[skipped_frames:]
+                    speech_was_detected = silence.speech_detected
+                    silent_runs, speech_seen = silence.update(flags)
+                    if silence.speech_detected and not speech_was_detected:
+                        ConfigManager.console_print("Speech detected.")
+
+                    stop_frames = np.flatnonzero(speech_seen & (silent_runs > silence_frames)) if stop_on_silence else []
+                    if len(stop_frames):
+                        # Stop right after the frame that completed the pause
+                        total_frames_recorded = first_frame + int(stop_frames[0]) + 1
+
+                    if self.streamer:
+                        for offset in range(total_frames_recorded - first_frame):
+                            frame_end = first_frame + offset + 1
+                            chunk_has_speech = chunk_has_speech or bool(flags[offset])
+                            if not chunk_has_speech:
+                                continue
+                            if silent_runs[offset] == pause_frames and frame_end - chunk_start_frame >= min_chunk_frames:
+                                self.streamer.submit_chunk(audio_buffer.view(self.streamed_samples, frame_end * frame_size))
+                                self.streamed_samples = frame_end * frame_size
+                                chunk_start_frame = last_preview_frame = frame_end
+                                chunk_has_speech = False
+                            elif silent_runs[offset] == 0 and frame_end - last_preview_frame >= preview_interval_frames:
+                                if self.streamer.submit_preview(audio_buffer.view(self.streamed_samples,
+                                                                                  frame_end * frame_size)):
+                                    last_preview_frame = frame_end
+
+                    if len(stop_frames):
+                        break
 
                 # Check for maximum duration timeout
                 if total_frames_recorded >= max_frames:
                     ConfigManager.console_print(f"Maximum recording duration ({max_duration_seconds}s) reached. Stopping.")
                     break
+        finally:
+            with self._capture_lock:
+                self._capture_buffer = None
 
-                # Avoid trying to detect voice in initial frames
-                if initial_frames_to_skip > 0:
-                    initial_frames_to_skip -= 1
-                    continue
+        # Zero-copy view of the recorded frames
+        audio_data = audio_buffer.view(0, total_frames_recorded * frame_size)
+        if vad:
+            self.speech_flags = speech_flags[:total_frames_recorded]
 
-                if vad:
-                    if vad.is_speech(frame.tobytes(), self.sample_rate):
-                        silent_frame_count = 0
-                        if not speech_detected:
-                            ConfigManager.console_print("Speech detected.")
-                            speech_detected = True
-                    else:
-                        silent_frame_count += 1
-
-                    if speech_detected and silent_frame_count > silence_frames:
-                        break
+        # Only silence after the last streamed chunk, so there is no tail left to decode
+        if self.streamer and self.streamed_samples and not chunk_has_speech:
+            self.streamed_samples = len(audio_data)
 
-        audio_data = np.array(recording, dtype=np.int16)
         duration = len(audio_data) / self.sample_rate
 
         ConfigManager.console_print(f'Recording finished. Size: {audio_data.size} samples, Duration: {duration:.2f} seconds')
 
-        min_duration_ms = recording_options.get('min_duration') or 100
+        min_duration_ms = recording_options.min_duration or 100
 
         if (duration * 1000) < min_duration_ms:
             ConfigManager.console_print(f'Discarded due to being too short.')
@@ -0,0 +1,115 @@
+"""
+Incremental transcription of speech chunks while recording is still in progress.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from transcription import transcribe_local, post_process_transcription
+from utils import ConfigManager
+
+
+class StreamingTranscriber:
+    """
+    Decodes completed speech chunks on a background thread while the recording loop keeps running.
+
+    The transcript is kept in two parts:
+    - committed: text of chunks that ended at a pause and have been decoded; it no longer changes.
+    - tentative: a preview decode of the chunk that is still being recorded; it is replaced by
+      the committed text of that chunk once a pause closes it.
+
+    Decoding happens on a single worker thread so chunks are transcribed in order. When the
+    recording stops, only the audio after the last pause is left to decode. Chunks and previews
+    are parts of an utterance, so they are decoded without the TranscriptionCache.
+    """
+
+    def __init__(self, local_model, on_update=None):
+        """
+        Initialize the StreamingTranscriber.
+
+        :param local_model: Local faster-whisper model used to decode chunks
+        :param on_update: Callback receiving (committed, tentative) whenever the transcript changes
+        """
+        self.local_model = local_model
+        self.on_update = on_update
+        self.committed = []
+        self.tentative = ''
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='streaming-transcription')
+        # Chunk decodes must all complete, previews may be dropped
+        self._chunks = []
+        self._previews = []
+        self._lock = threading.Lock()
+
+    def submit_chunk(self, audio_data):
+        """
+        Queue a completed speech chunk for decoding.
+
+        :param audio_data: int16 numpy array of the chunk
+        """
+        self._chunks.append(self._executor.submit(self._decode_chunk, audio_data))
+
+    def submit_preview(self, audio_data):
+        """
+        Queue a preview decode of the chunk still being recorded, if the decoder is idle.
+
+        :param audio_data: int16 numpy array of the open chunk so far
+        :return: True if the preview was queued
+        """
+        self._chunks = [future for future in self._chunks if not future.done()]
+        self._previews = [future for future in self._previews if not future.done()]
+        if self._chunks or self._previews:
+            return False
+        self._previews.append(self._executor.submit(self._decode_preview, audio_data))
+        return True
+
+    def finish(self, tail_audio):
+        """
+        Decode the last chunk, wait for pending chunks and return the full post-processed transcript.
+
+        :param tail_audio: int16 numpy array of the audio after the last submitted chunk
+        :return: Post-processed transcription
+        """
+        # A preview that has not started is no longer needed, every chunk has to be decoded
+        for future in self._previews:
+            future.cancel()
+        for future in self._chunks:
+            future.result()
+
+        if tail_audio is not None and len(tail_audio) > 0:
+            self._decode_chunk(tail_audio)
+
+        self._executor.shutdown(wait=False)
+        return post_process_transcription(self.text())
+
+    def cancel(self):
+        """Drop all pending chunks without decoding them."""
+        for future in self._chunks + self._previews:
+            future.cancel()
+        self._executor.shutdown(wait=False)
+
+    def text(self):
+        """Get the committed transcript as a single string."""
+        with self._lock:
+            return ' '.join(self.committed)
+
+    def _decode_chunk(self, audio_data):
+        text = transcribe_local(audio_data, self.local_model, use_cache=False).strip()
+        with self._lock:
+            if text:
+                self.committed.append(text)
+            self.tentative = ''
+        ConfigManager.console_print(f'Chunk transcribed: {text}')
+        self._notify()
+
+    def _decode_preview(self, audio_data):
+        text = transcribe_local(audio_data, self.local_model, use_cache=False).strip()
+        with self._lock:
+            self.tentative = text
+        self._notify()
+
+    def _notify(self):
+        if self.on_update:
+            with self._lock:
+                committed = ' '.join(self.committed)
+                tentative = self.tentative
+            self.on_update(committed, tentative)
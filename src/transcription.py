@@ -1,18 +1,222 @@
+import bisect
+import hashlib
 import io
 import os
+import threading
+import time
+import weakref
 import numpy as np
-import soundfile as sf
-from faster_whisper import WhisperModel
-from openai import OpenAI
+from collections import OrderedDict
 
+from model_registry import ModelRegistry
 from utils import ConfigManager
 
-def create_local_model():
+class TranscriptionCache:
+    """
+    Content-addressed cache of raw transcriptions, keyed by a hash of the int16 audio and the
+    decode-relevant configuration, so re-decoding identical audio is free.
+
+    Entries are kept in an in-memory LRU and, if model_options.common.cache_directory is set,
+    in one text file per entry on disk. The least recently used files are removed when the
+    directory grows beyond model_options.common.cache_max_disk_mb.
+    """
+
+    _instance = None
+
+    def __init__(self):
+        """Initialize the TranscriptionCache instance."""
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_directory = None
+        self.disk_index = OrderedDict()  # key -> file size, least recently used first
+
+    @classmethod
+    def initialize(cls):
+        """Initialize the TranscriptionCache."""
+        if cls._instance is None:
+            cls._instance = cls()
+
+    @classmethod
+    def _get_instance(cls):
+        cls.initialize()
+        return cls._instance
+
+    @staticmethod
+    def make_key(audio_data, model_id):
+        """
+        Get the cache key of an utterance decoded by a model with the current configuration.
+
+        :param audio_data: int16 numpy array
+        :param model_id: Hashable description of the model and its decode options, or None if unknown
+        :return: Hex digest, or None if the transcription should not be cached
+        """
+        if model_id is None or audio_data is None:
+            return None
+        common = ConfigManager.snapshot().model_options.common
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(np.ascontiguousarray(audio_data, dtype=np.int16))
+        digest.update(repr((model_id, common.language, common.initial_prompt,
+                            common.hotwords, common.temperature)).encode('utf-8'))
+        return digest.hexdigest()
+
+    @classmethod
+    def get(cls, key):
+        """Get a cached transcription, or None on a miss."""
+        if key is None:
+            return None
+        cache = cls._get_instance()
+        with cache.lock:
+            text = cache.entries.get(key)
+            if text is not None:
+                cache.entries.move_to_end(key)
+                cache._touch_disk(key)
+            else:
+                text = cache._read_disk(key)
+                if text is not None:
+                    cache._store_memory(key, text)
+            if text is None:
+                cache.misses += 1
+                return None
+            cache.hits += 1
+        ConfigManager.console_print(f'Transcription cache hit ({cls.hit_rate():.0%} hit rate).')
+        return text
+
+    @classmethod
+    def put(cls, key, text):
+        """Store a transcription in memory and, if enabled, on disk."""
+        if key is None:
+            return
+        cache = cls._get_instance()
+        with cache.lock:
+            cache._store_memory(key, text)
+            cache._write_disk(key, text)
+
+    @classmethod
+    def hit_rate(cls):
+        """Fraction of lookups answered from the cache."""
+        cache = cls._get_instance()
+        lookups = cache.hits + cache.misses
+        return cache.hits / lookups if lookups else 0.0
+
+    @classmethod
+    def stats(cls):
+        """Get the hit and miss counts, hit rate and number of entries held."""
+        cache = cls._get_instance()
+        with cache.lock:
+            return {'hits': cache.hits, 'misses': cache.misses, 'hit_rate': cls.hit_rate(),
+                    'memory_entries': len(cache.entries), 'disk_entries': len(cache.disk_index),
+                    'disk_bytes': sum(cache.disk_index.values())}
+
+    @classmethod
+    def clear(cls):
+        """Drop the in-memory entries and reset the statistics; files on disk are kept."""
+        cache = cls._get_instance()
+        with cache.lock:
+            cache.entries.clear()
+            cache.hits = cache.misses = 0
+
+    def _store_memory(self, key, text):
+        max_entries = ConfigManager.snapshot().model_options.common.cache_size or 0
+        self.entries[key] = text
+        self.entries.move_to_end(key)
+        while len(self.entries) > max_entries:
+            self.entries.popitem(last=False)
+
+    def _disk_store(self):
+        """Get the cache directory, loading its index when it is first used or has changed."""
+        directory = ConfigManager.snapshot().model_options.common.cache_directory
+        if not directory:
+            return None
+        if directory != self.disk_directory:
+            os.makedirs(directory, exist_ok=True)
+            files = [entry for entry in os.scandir(directory) if entry.name.endswith('.txt')]
+            files.sort(key=lambda entry: entry.stat().st_mtime)
+            self.disk_index = OrderedDict((entry.name[:-4], entry.stat().st_size) for entry in files)
+            self.disk_directory = directory
+        return directory
+
+    def _read_disk(self, key):
+        directory = self._disk_store()
+        if directory is None or key not in self.disk_index:
+            return None
+        path = os.path.join(directory, f'{key}.txt')
+        try:
+            with open(path, encoding='utf-8') as file:
+                text = file.read()
+            os.utime(path)  # Keep the file modification time in least recently used order
+        except OSError:
+            self.disk_index.pop(key, None)
+            return None
+        self.disk_index.move_to_end(key)
+        return text
+
+    def _touch_disk(self, key):
+        """Mark the file of an entry answered from memory as recently used, so it is not evicted first."""
+        if self.disk_directory is None or key not in self.disk_index:
+            return
+        try:
+            os.utime(os.path.join(self.disk_directory, f'{key}.txt'))
+        except OSError:
+            self.disk_index.pop(key, None)
+            return
+        self.disk_index.move_to_end(key)
+
+    def _write_disk(self, key, text):
+        directory = self._disk_store()
+        if directory is None:
+            return
+        path = os.path.join(directory, f'{key}.txt')
+        data = text.encode('utf-8')
+        try:
+            with open(path + '.tmp', 'wb') as file:
+                file.write(data)
+            os.replace(path + '.tmp', path)
+        except OSError as e:
+            ConfigManager.console_print(f'Could not write transcription cache entry: {e}')
+            return
+        self.disk_index[key] = len(data)
+        self.disk_index.move_to_end(key)
+
+        max_bytes = (ConfigManager.snapshot().model_options.common.cache_max_disk_mb or 0) * 1024 * 1024
+        total_bytes = sum(self.disk_index.values())
+        while total_bytes > max_bytes and self.disk_index:
+            old_key, size = self.disk_index.popitem(last=False)
+            total_bytes -= size
+            try:
+                os.remove(os.path.join(directory, f'{old_key}.txt'))
+            except OSError:
+                pass
+
+def local_model_id(local_model, batched=False):
+    """
+    Describe a local model and its decode options for the transcription cache.
+    Returns None for models that are not in the ModelRegistry, which are then not cached.
+
+    :param batched: Whether the audio is decoded by the BatchedInferencePipeline, which does not
+                    support all the options of a sequential decode and can transcribe differently
+    """
+    key = ModelRegistry.key_of(local_model)
+    if key is None:
+        return None
+    local_options = ConfigManager.snapshot().model_options.local
+    # The number of workers does not change the transcription
+    return ('local',) + key[:4] + (local_options.vad_filter, local_options.condition_on_previous_text,
+                                   'batched' if batched else 'sequential')
+
+def create_local_model(local_model_options=None):
     """
     Create a local model using the faster-whisper library.
+
+    :param local_model_options: model_options.local section to use, defaults to the current configuration
     """
+    # Imported here so startup does not wait for ctranslate2 unless a local model is needed
+    from faster_whisper import WhisperModel
+
     ConfigManager.console_print('Creating local model...')
-    local_model_options = ConfigManager.get_config_section('model_options')['local']
+    if local_model_options is None:
+        local_model_options = ConfigManager.get_config_section('model_options')['local']
     compute_type = local_model_options['compute_type']
     model_path = local_model_options.get('model_path')
 
@@ -22,102 +226,739 @@ def create_local_model():
     else:
         device = local_model_options['device']
 
+    # Several workers decode chunks of a long recording in parallel, each with its share of the cores
+    num_workers = max(local_model_options.get('num_workers') or 1, 1)
+    cpu_threads = max((os.cpu_count() or 1) // num_workers, 1) if num_workers > 1 else 0
+
     try:
         if model_path:
             ConfigManager.console_print(f'Loading model from: {model_path}')
             model = WhisperModel(model_path,
                                  device=device,
                                  compute_type=compute_type,
+                                 cpu_threads=cpu_threads,
+                                 num_workers=num_workers,
                                  download_root=None)  # Prevent automatic download
         else:
             model = WhisperModel(local_model_options['model'],
                                  device=device,
-                                 compute_type=compute_type)
+                                 compute_type=compute_type,
+                                 cpu_threads=cpu_threads,
+                                 num_workers=num_workers)
     except Exception as e:
         ConfigManager.console_print(f'Error initializing WhisperModel: {e}')
         ConfigManager.console_print('Falling back to CPU.')
         model = WhisperModel(model_path or local_model_options['model'],
                              device='cpu',
                              compute_type=compute_type,
+                             cpu_threads=cpu_threads,
+                             num_workers=num_workers,
                              download_root=None if model_path else None)
 
     ConfigManager.console_print('Local model created.')
     return model
 
-def transcribe_local(audio_data, local_model=None):
+def _local_decode_options(model_options):
+    """
+    Get the WhisperModel.transcribe keyword arguments for the configured model options.
+    """
+    return dict(language=model_options.common.language,
+                initial_prompt=model_options.common.initial_prompt,
+                hotwords=model_options.common.hotwords,
+                condition_on_previous_text=model_options.local.condition_on_previous_text,
+                temperature=model_options.common.temperature,
+                vad_filter=model_options.local.vad_filter,
+                hallucination_silence_threshold=0.5,  # Skip silent sections to prevent hallucinations
+                no_speech_threshold=0.5,  # More aggressive no-speech detection
+                repetition_penalty=1.1)  # Penalize repetitive output
+
+def transcribe_local(audio_data, local_model=None, use_cache=True):
     """
     Transcribe an audio file using a local model.
+
+    :param use_cache: Whether to use the TranscriptionCache. Parts of an utterance, such as streaming
+                      previews and chunks, are decoded without it so they do not evict whole utterances
+    """
+    return ''.join(text for text, _, _ in transcribe_local_streaming(audio_data, local_model, use_cache=use_cache))
+
+def transcribe_local_streaming(audio_data, local_model=None, word_timestamps=False, use_cache=True):
+    """
+    Transcribe an audio file using a local model, yielding the text as faster-whisper decodes it.
+
+    :param word_timestamps: Yield each word separately instead of whole segments
+    :param use_cache: Whether to look the transcription up in and store it in the TranscriptionCache
+    :return: Generator of (text, start, end) tuples with times in seconds relative to the audio
     """
     if not local_model:
-        local_model = create_local_model()
-    model_options = ConfigManager.get_config_section('model_options')
-
-    # Convert int16 to float32
-    audio_data_float = audio_data.astype(np.float32) / 32768.0
-
-    response = local_model.transcribe(audio=audio_data_float,
-                                      language=model_options['common']['language'],
-                                      initial_prompt=model_options['common']['initial_prompt'],
-                                      hotwords=model_options['common'].get('hotwords'),
-                                      condition_on_previous_text=model_options['local']['condition_on_previous_text'],
-                                      temperature=model_options['common']['temperature'],
-                                      vad_filter=model_options['local']['vad_filter'],
-                                      hallucination_silence_threshold=0.5,  # Skip silent sections to prevent hallucinations
-                                      no_speech_threshold=0.5,  # More aggressive no-speech detection
-                                      repetition_penalty=1.1,)  # Penalize repetitive output
-    return ''.join([segment.text for segment in list(response[0])])
-
-def transcribe_api(audio_data):
+        ModelRegistry.initialize()
+        local_model = ModelRegistry.active_model() or ModelRegistry.load()
+    model_options = ConfigManager.snapshot().model_options
+
+    cache_key = TranscriptionCache.make_key(audio_data, local_model_id(local_model)) if use_cache else None
+    cached = TranscriptionCache.get(cache_key)
+    if cached is not None:
+        yield cached, 0.0, len(audio_data) / WHISPER_SAMPLE_RATE
+        return
+
+    # Convert int16 to float32 in a single allocation
+    audio_data_float = np.multiply(audio_data, 1.0 / 32768.0, dtype=np.float32)
+
+    segments, _ = local_model.transcribe(audio=audio_data_float,
+                                         word_timestamps=word_timestamps,
+                                         **_local_decode_options(model_options))
+    # Segments are decoded lazily, one window at a time
+    texts = []
+    for segment in segments:
+        texts.append(segment.text)
+        if word_timestamps and segment.words:
+            for word in segment.words:
+                yield word.word, word.start, word.end
+        else:
+            yield segment.text, segment.start, segment.end
+    TranscriptionCache.put(cache_key, ''.join(texts))
+
+# Whisper decodes at most 30 seconds of audio per window
+WHISPER_SAMPLE_RATE = 16000
+WHISPER_WINDOW_SAMPLES = 30 * WHISPER_SAMPLE_RATE
+
+_batched_pipelines = weakref.WeakKeyDictionary()
+
+def get_batched_pipeline(local_model):
+    """
+    Get the faster-whisper BatchedInferencePipeline wrapping a local model.
+    Returns None if the installed faster-whisper does not provide it.
+    """
+    pipeline = _batched_pipelines.get(local_model)
+    if pipeline is None:
+        try:
+            from faster_whisper import BatchedInferencePipeline
+        except ImportError:
+            ConfigManager.console_print('BatchedInferencePipeline requires faster-whisper 1.1 or newer, decoding sequentially.')
+            return None
+        pipeline = BatchedInferencePipeline(model=local_model)
+        _batched_pipelines[local_model] = pipeline
+    return pipeline
+
+def transcribe_local_batched(audio_list, local_model=None):
+    """
+    Transcribe several utterances at once using faster-whisper's batched pipeline.
+    Falls back to transcribing them one after another with transcribe_local.
+
+    :param audio_list: List of int16 numpy arrays
+    :return: List of transcriptions, one per utterance
+    """
+    if not local_model:
+        ModelRegistry.initialize()
+        local_model = ModelRegistry.active_model() or ModelRegistry.load()
+    model_options = ConfigManager.snapshot().model_options
+    batch_size = model_options.local.batch_size or 1
+
+    pipeline = get_batched_pipeline(local_model) if batch_size > 1 else None
+    if pipeline is None:
+        return [transcribe_local(audio_data, local_model) for audio_data in audio_list]
+
+    # Only decode the utterances that are not cached
+    model_id = local_model_id(local_model, batched=True)
+    cache_keys = [TranscriptionCache.make_key(audio_data, model_id) for audio_data in audio_list]
+    transcriptions = [TranscriptionCache.get(cache_key) for cache_key in cache_keys]
+    missing = [index for index, transcription in enumerate(transcriptions) if transcription is None]
+    if missing:
+        decoded = _decode_batched([audio_list[index] for index in missing], pipeline, model_options, batch_size)
+        for index, transcription in zip(missing, decoded):
+            transcriptions[index] = transcription
+            TranscriptionCache.put(cache_keys[index], transcription)
+    return transcriptions
+
+def _decode_batched(audio_list, pipeline, model_options, batch_size):
+    """Decode utterances back to back in one BatchedInferencePipeline call."""
+    # Decode the utterances back to back; each one is cut into windows of at most 30 seconds
+    # so that every window is a separate batch item
+    audio = np.concatenate([np.multiply(audio_data, 1.0 / 32768.0, dtype=np.float32) for audio_data in audio_list])
+    starts = []
+    clip_timestamps = []
+    offset = 0
+    for audio_data in audio_list:
+        starts.append(offset)
+        for start in range(offset, offset + len(audio_data), WHISPER_WINDOW_SAMPLES):
+            clip_timestamps.append({'start': start, 'end': min(start + WHISPER_WINDOW_SAMPLES, offset + len(audio_data))})
+        offset += len(audio_data)
+
+    if len(audio_list) == 1 and (model_options.local.vad_filter or len(audio) > WHISPER_WINDOW_SAMPLES):
+        # A single long recording is split at pauses by the pipeline's VAD instead
+        clip_timestamps = None
+
+    segments, _ = pipeline.transcribe(audio=audio,
+                                      language=model_options.common.language,
+                                      initial_prompt=model_options.common.initial_prompt,
+                                      hotwords=model_options.common.hotwords,
+                                      temperature=model_options.common.temperature,
+                                      vad_filter=clip_timestamps is None,
+                                      clip_timestamps=clip_timestamps,
+                                      batch_size=batch_size,
+                                      no_speech_threshold=0.5,
+                                      repetition_penalty=1.1)
+
+    # Segment timestamps are relative to the concatenated audio, map them back to each utterance
+    texts = [[] for _ in audio_list]
+    for segment in segments:
+        index = bisect.bisect_right(starts, int(segment.start * WHISPER_SAMPLE_RATE)) - 1
+        texts[max(index, 0)].append(segment.text)
+    return [''.join(text) for text in texts]
+
+class ApiClient:
+    """
+    A persistent OpenAI client whose keep-alive HTTP connections are reused across utterances.
+
+    The client is rebuilt only when the base URL or API key change. Every request is traced
+    through httpcore, so its time can be broken down into connecting (zero when a pooled
+    connection is reused), uploading the request, waiting for the server and downloading the response.
+    """
+
+    _instance = None
+
+    # Trace events marking the phases of a request, for HTTP/1.1 and HTTP/2 connections
+    CONNECT_EVENTS = ('connection.connect_tcp', 'connection.start_tls')
+    UPLOAD_START = ('http11.send_request_headers.started', 'http2.send_request_headers.started')
+    UPLOAD_END = ('http11.send_request_body.complete', 'http2.send_request_body.complete')
+    RESPONSE_START = ('http11.receive_response_headers.complete', 'http2.receive_response_headers.complete')
+    RESPONSE_END = ('http11.receive_response_body.complete', 'http2.receive_response_body.complete')
+
+    def __init__(self):
+        """Initialize the ApiClient instance."""
+        self.client = None
+        self.http_client = None
+        self.client_key = None
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.last_timings = {}
+
+    @classmethod
+    def get(cls):
+        """Get the OpenAI client for the current settings, creating or rebuilding it if needed."""
+        if cls._instance is None:
+            cls._instance = cls()
+        instance = cls._instance
+
+        base_url = ConfigManager.snapshot().model_options.api.base_url or 'https://api.openai.com/v1'
+        api_key = os.getenv('OPENAI_API_KEY') or None
+        with instance.lock:
+            if instance.client is None or instance.client_key != (base_url, api_key):
+                import httpx
+                from openai import OpenAI
+
+                instance._close()
+                instance.http_client = httpx.Client(
+                    timeout=httpx.Timeout(60.0, connect=10.0),
+                    limits=httpx.Limits(max_connections=8, max_keepalive_connections=4, keepalive_expiry=300),
+                    event_hooks={'request': [instance._attach_trace]},
+                )
+                # ApiDeadline retries within the deadline, retries of the client would multiply its own
+                instance.client = OpenAI(api_key=api_key, base_url=base_url, http_client=instance.http_client,
+                                         max_retries=0)
+                instance.client_key = (base_url, api_key)
+            return instance.client
+
+    @classmethod
+    def close(cls):
+        """Close the client and its connections."""
+        if cls._instance is not None:
+            with cls._instance.lock:
+                cls._instance._close()
+
+    def _close(self):
+        if self.http_client is not None:
+            self.http_client.close()
+        self.client = self.http_client = self.client_key = None
+
+    def _attach_trace(self, request):
+        """Record the time of every trace event of the request on the calling thread."""
+        events = self.local.events = {}
+
+        def trace(name, info):
+            events[name] = time.perf_counter()
+
+        request.extensions['trace'] = trace
+
+    def request_timings(self):
+        """
+        Break down the last request made on this thread.
+
+        :return: Dictionary with connect, upload, server and download times in seconds
+        """
+        events = getattr(self.local, 'events', {})
+
+        def first(names):
+            return next((events[name] for name in names if name in events), None)
+
+        def span(start, end):
+            return end - start if start is not None and end is not None else 0.0
+
+        connect = sum(span(events.get(f'{name}.started'), events.get(f'{name}.complete')) for name in self.CONNECT_EVENTS)
+        upload_end, response_start = first(self.UPLOAD_END), first(self.RESPONSE_START)
+        return {
+            'connect': connect,
+            'reused_connection': 'connection.connect_tcp.started' not in events,
+            'upload': span(first(self.UPLOAD_START), upload_end),
+            'server': span(upload_end, response_start),
+            'download': span(response_start, first(self.RESPONSE_END)),
+        }
+
+
+def encode_upload_audio(audio_data, sample_rate, upload_format='wav'):
+    """
+    Encode int16 audio for uploading.
+
+    :param upload_format: 'wav' (uncompressed), 'flac' (lossless, about half the size) or
+                          'opus' (lossy speech codec in Ogg, a small fraction of the size)
+    :return: Tuple of (file name, encoded bytes, MIME type)
+    """
+    if upload_format == 'opus':
+        import av
+        buffer = io.BytesIO()
+        with av.open(buffer, mode='w', format='ogg') as container:
+            # Opus only supports 8, 12, 16, 24 and 48 kHz, the encoder resamples anything else
+            rate = sample_rate if sample_rate in (8000, 12000, 16000, 24000, 48000) else 48000
+            stream = container.add_stream('libopus', rate=rate)
+            stream.layout = 'mono'
+            stream.bit_rate = 24000
+            frame = av.AudioFrame.from_ndarray(np.ascontiguousarray(audio_data, dtype=np.int16).reshape(1, -1),
+                                               format='s16', layout='mono')
+            frame.sample_rate = sample_rate
+            for packet in stream.encode(frame):
+                container.mux(packet)
+            for packet in stream.encode(None):
+                container.mux(packet)
+        return 'audio.ogg', buffer.getvalue(), 'audio/ogg'
+
+    import soundfile as sf
+    buffer = io.BytesIO()
+    if upload_format == 'flac':
+        sf.write(buffer, audio_data, sample_rate, format='FLAC', subtype='PCM_16')
+        return 'audio.flac', buffer.getvalue(), 'audio/flac'
+    sf.write(buffer, audio_data, sample_rate, format='WAV', subtype='PCM_16')
+    return 'audio.wav', buffer.getvalue(), 'audio/wav'
+
+
+def transcribe_api(audio_data, timeout=None):
     """
     Transcribe an audio file using the OpenAI API.
+
+    :param timeout: Seconds the request may take. The client's default applies if None. Failed requests
+                    are not retried, see ApiDeadline
     """
-    model_options = ConfigManager.get_config_section('model_options')
-    client = OpenAI(
-        api_key=os.getenv('OPENAI_API_KEY') or None,
-        base_url=model_options['api']['base_url'] or 'https://api.openai.com/v1'
-    )
+    model_options = ConfigManager.snapshot().model_options
+    upload_format = model_options.api.upload_format or 'wav'
+    cache_key = TranscriptionCache.make_key(
+        audio_data, ('api', model_options.api.base_url, model_options.api.model, upload_format))
+    cached = TranscriptionCache.get(cache_key)
+    if cached is not None:
+        return cached
 
-    # Convert numpy array to WAV file
-    byte_io = io.BytesIO()
-    sample_rate = ConfigManager.get_config_section('recording_options').get('sample_rate') or 16000
-    sf.write(byte_io, audio_data, sample_rate, format='wav')
-    byte_io.seek(0)
+    client = ApiClient.get()
+    if timeout is not None:
+        client = client.with_options(timeout=timeout)
 
+    encode_start = time.perf_counter()
+    sample_rate = ConfigManager.snapshot().recording_options.sample_rate or 16000
+    file_name, payload, mime_type = encode_upload_audio(audio_data, sample_rate, upload_format)
+    encode_time = time.perf_counter() - encode_start
+
+    request_start = time.perf_counter()
     response = client.audio.transcriptions.create(
-        model=model_options['api']['model'],
-        file=('audio.wav', byte_io, 'audio/wav'),
-        language=model_options['common']['language'],
-        prompt=model_options['common']['initial_prompt'],
-        temperature=model_options['common']['temperature'],
+        model=model_options.api.model,
+        file=(file_name, payload, mime_type),
+        language=model_options.common.language,
+        prompt=model_options.common.initial_prompt,
+        temperature=model_options.common.temperature,
     )
+    timings = ApiClient._instance.request_timings()
+    timings.update(encode=encode_time, total=time.perf_counter() - request_start, payload_bytes=len(payload),
+                   raw_bytes=audio_data.nbytes)
+    ApiClient._instance.last_timings = timings
+    ConfigManager.console_print(
+        f"API request: encode {timings['encode'] * 1000:.0f} ms, "
+        f"connect {timings['connect'] * 1000:.0f} ms{' (reused)' if timings['reused_connection'] else ''}, "
+        f"upload {timings['upload'] * 1000:.0f} ms, server {timings['server'] * 1000:.0f} ms, "
+        f"{len(payload) / 1024:.0f} KB {upload_format} ({audio_data.nbytes / max(len(payload), 1):.1f}x smaller than raw)")
+
+    TranscriptionCache.put(cache_key, response.text)
     return response.text
 
+class ApiDeadline:
+    """
+    Transcribes with the API within a deadline, retrying with backoff and falling back to the local model.
+
+    API attempts are retried with exponential backoff while the deadline allows it and the error is
+    transient (timeouts, connection errors, rate limits and server errors). With local_fallback, the
+    local model decodes the audio once the API failed or ran out of time, and with hedge_after it
+    already starts in parallel when the API has not answered after that long. The first good result
+    wins and the other path is cancelled: the local decode stops at the next segment, a pending API
+    request is abandoned and no longer retried. Counters record which path won and why.
+    """
+
+    _instance = None
+
+    def __init__(self):
+        """Initialize the ApiDeadline instance."""
+        from concurrent.futures import ThreadPoolExecutor
+        # Room for an API request and a local decode for each of several parallel chunks
+        self.executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='api-deadline')
+        self.outcomes = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def _get_instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @classmethod
+    def transcribe(cls, audio_data, local_model=None):
+        """
+        Transcribe audio with the API under the configured deadline.
+
+        :return: The raw transcription
+        :raises Exception: The last error if neither path produced a transcription
+        """
+        return cls._get_instance()._transcribe(audio_data, local_model)
+
+    @classmethod
+    def stats(cls):
+        """Counts of how each transcription was produced, keyed by winner and reason."""
+        instance = cls._get_instance()
+        with instance.lock:
+            return dict(instance.outcomes)
+
+    def _count(self, outcome):
+        with self.lock:
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        ConfigManager.console_print(f"Transcription by {outcome} (so far: {self.outcomes})")
+
+    def _transcribe(self, audio_data, local_model):
+        from concurrent.futures import FIRST_COMPLETED, wait
+
+        options = ConfigManager.snapshot().model_options.api
+        start = time.monotonic()
+        deadline = start + options.deadline / 1000 if options.deadline else float('inf')
+        cancelled = threading.Event()
+        attempts = []
+        api_future = self.executor.submit(self._call_api, audio_data, deadline, cancelled, attempts)
+        local_future = None
+        local_reason = None
+
+        if options.local_fallback and options.hedge_after:
+            done, _ = wait([api_future], timeout=options.hedge_after / 1000)
+            if not done:
+                local_future = self.executor.submit(self._decode_local, audio_data, local_model, cancelled)
+                local_reason = f'hedge, no API answer after {options.hedge_after} ms'
+
+        last_error = None
+        pending = {future for future in (api_future, local_future) if future is not None}
+        try:
+            while pending:
+                # The API path ends by itself at the deadline, the grace period covers a hung connection
+                timeout = None if deadline == float('inf') else max(deadline - time.monotonic(), 0) + 1.0
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    if local_future is not None:
+                        continue
+                    last_error = TimeoutError('API deadline exceeded')
+                    pending.discard(api_future)
+                for future in done:
+                    if future.exception() is None:
+                        if future is api_future:
+                            retries = len(attempts) - 1
+                            self._count(f"api{f' after {retries} retries' if retries else ''}")
+                        else:
+                            self._count(f'local ({local_reason})')
+                        return future.result()
+                    last_error = future.exception()
+
+                if api_future not in pending and local_future is None and options.local_fallback:
+                    local_reason = f'fallback, API failed: {type(last_error).__name__}'
+                    local_future = self.executor.submit(self._decode_local, audio_data, local_model, cancelled)
+                    pending.add(local_future)
+        finally:
+            cancelled.set()
+
+        self._count(f'none, {type(last_error).__name__}')
+        raise last_error
+
+    def _call_api(self, audio_data, deadline, cancelled, attempts):
+        """Call the API, retrying transient errors with backoff until the deadline."""
+        import random
+        options = ConfigManager.snapshot().model_options.api
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError('API deadline exceeded')
+            attempts.append(time.monotonic())
+            try:
+                return transcribe_api(audio_data, timeout=None if remaining == float('inf') else remaining)
+            except Exception as e:
+                retries = len(attempts) - 1
+                if cancelled.is_set() or retries >= (options.max_retries or 0) or not self._is_transient(e):
+                    raise
+                backoff = min(0.25 * 2 ** retries * random.uniform(0.5, 1.0), max(deadline - time.monotonic(), 0))
+                ConfigManager.console_print(f"API request failed ({type(e).__name__}: {e}), retrying in {backoff:.2f}s")
+                if cancelled.wait(backoff):
+                    raise
+
+    @staticmethod
+    def _is_transient(error):
+        """Whether an API error may go away when retrying."""
+        status = getattr(error, 'status_code', None)
+        if status is not None:
+            return status in (408, 409, 429) or status >= 500
+        try:
+            import openai
+            if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+                return True
+        except ImportError:
+            pass
+        return isinstance(error, (TimeoutError, ConnectionError))
+
+    @staticmethod
+    def _decode_local(audio_data, local_model, cancelled):
+        """Decode with the local model, stopping at the next segment once cancelled."""
+        if local_model is None:
+            ModelRegistry.initialize()
+            local_model = ModelRegistry.active_model() or ModelRegistry.load()
+        pieces = []
+        for text, _, _ in transcribe_local_streaming(audio_data, local_model):
+            if cancelled.is_set():
+                raise RuntimeError('Local decode cancelled')
+            pieces.append(text)
+        return ''.join(pieces)
+
+
 def post_process_transcription(transcription):
     """
     Apply post-processing to the transcription.
     """
     transcription = transcription.strip()
-    post_processing = ConfigManager.get_config_section('post_processing')
-    if post_processing['remove_trailing_period'] and transcription.endswith('.'):
+    post_processing = ConfigManager.snapshot().post_processing
+    if post_processing.remove_trailing_period and transcription.endswith('.'):
         transcription = transcription[:-1]
-    if post_processing['add_trailing_space']:
+    if post_processing.add_trailing_space:
         transcription += ' '
-    if post_processing['remove_capitalization']:
+    if post_processing.remove_capitalization:
         transcription = transcription.lower()
 
     return transcription
 
-def transcribe(audio_data, local_model=None):
+class IncrementalPostProcessor:
+    """
+    Applies post_process_transcription to text that arrives in pieces.
+
+    Only text that post-processing of the complete transcription cannot change is released:
+    trailing whitespace and a trailing period are held back until the next piece or the end,
+    so the pieces always add up to the post-processed complete transcription.
+    """
+
+    def __init__(self):
+        """Initialize the IncrementalPostProcessor."""
+        self.raw = ''
+        self.emitted = ''
+
+    def feed(self, text):
+        """
+        Add the next piece of raw transcription.
+
+        :return: Post-processed text that can be output now (may be empty)
+        """
+        self.raw += text
+        post_processing = ConfigManager.snapshot().post_processing
+        safe = self.raw.strip()
+        if post_processing.remove_trailing_period and safe.endswith('.'):
+            safe = safe[:-1]
+        if post_processing.remove_capitalization:
+            safe = safe.lower()
+        piece = safe[len(self.emitted):]
+        self.emitted = safe
+        return piece
+
+    def finish(self):
+        """
+        Complete the transcription.
+
+        :return: The rest of the post-processed transcription that has not been output yet
+        """
+        final = post_process_transcription(self.raw)
+        piece = final[len(self.emitted):]
+        self.emitted = final
+        return piece
+
+def word_edit_distance(source, target):
+    """
+    Count the word insertions, deletions and substitutions needed to turn one text into another.
+    """
+    source_words, target_words = source.split(), target.split()
+    previous = list(range(len(target_words) + 1))
+    for i, source_word in enumerate(source_words, 1):
+        current = [i]
+        for j, target_word in enumerate(target_words, 1):
+            current.append(min(previous[j] + 1,
+                               current[j - 1] + 1,
+                               previous[j - 1] + (source_word != target_word)))
+        previous = current
+    return previous[-1]
+
+def parallel_chunk_settings():
+    """
+    Get how long recordings are split for parallel transcription.
+
+    :return: Tuple of (chunk length in samples, number of chunks transcribed at once), with a
+             chunk length of 0 when recordings are not split
+    """
+    model_options = ConfigManager.snapshot().model_options
+    if model_options.use_api:
+        concurrency = model_options.api.max_concurrency or 1
+    else:
+        concurrency = model_options.local.num_workers or 1
+    if concurrency <= 1 or not model_options.common.chunk_duration:
+        return 0, 1
+    return model_options.common.chunk_duration * WHISPER_SAMPLE_RATE, concurrency
+
+def _normalize_word(word):
+    return ''.join(character for character in word.lower() if character.isalnum())
+
+def stitch_transcripts(texts, hard_cuts, max_overlap_words=8, max_partial_words=2):
+    """
+    Join the transcriptions of overlapping chunks, removing the words transcribed twice at each cut.
+
+    The longest run of words (compared without case and punctuation) at the end of one chunk that
+    also starts the next chunk is kept only once. At a hard cut the run may be followed by up to
+    max_partial_words in the first chunk and preceded by as many in the second, which are dropped:
+    these are the words cut off by the edges of the overlap. A run of a single word only counts at
+    a hard cut without such partial words, as a single repeated word elsewhere is more likely spoken
+    twice than transcribed twice.
+
+    :param texts: Transcriptions of the chunks, in order
+    :param hard_cuts: For each cut between two chunks, whether it was made outside a pause
+    :return: The joined transcription
+    """
+    words = texts[0].split() if texts else []
+    for text, hard_cut in zip(texts[1:], hard_cuts):
+        next_words = text.split()
+        tail = [_normalize_word(word) for word in words[-max_overlap_words:]]
+        head = [_normalize_word(word) for word in next_words[:max_overlap_words]]
+        best = None  # (run length, words kept of the first chunk, words skipped of the second)
+        partial_words = max_partial_words if hard_cut else 0
+        for skipped in range(min(partial_words, len(head)) + 1):
+            for dropped in range(min(partial_words, len(tail)) + 1):
+                end = len(tail) - dropped
+                length = next((length for length in range(min(end, len(head) - skipped), 0, -1)
+                               if tail[end - length:end] == head[skipped:skipped + length]), 0)
+                min_length = 1 if hard_cut and not (skipped or dropped) else 2
+                if length >= min_length and (best is None or length > best[0]):
+                    best = (length, len(words) - dropped, skipped + length)
+        if best is not None:
+            words = words[:best[1]] + next_words[best[2]:]
+        else:
+            words += next_words
+    return ' '.join(words)
+
+def transcribe_chunked(audio_data, local_model, chunk_samples, concurrency):
+    """
+    Transcribe a long recording as chunks split at pauses, several chunks at a time.
+
+    The chunks go to the API through the deadline logic in parallel requests, or to the local model
+    from parallel threads, which faster-whisper decodes on its separate workers. The chunk
+    transcriptions are joined with stitch_transcripts. Local transcriptions are cached for the whole
+    recording only, not for each chunk.
+
+    :param chunk_samples: Target length of a chunk in samples
+    :param concurrency: Number of chunks transcribed at once
+    :return: The raw transcription
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from vad import create_vad, split_at_pauses
+
+    snapshot = ConfigManager.snapshot()
+    overlap_samples = snapshot.model_options.common.chunk_overlap * WHISPER_SAMPLE_RATE // 1000
+    cache_key = None
+    if snapshot.model_options.use_api:
+        def transcribe_chunk(chunk):
+            return ApiDeadline.transcribe(chunk, local_model)
+    else:
+        if local_model is None:
+            ModelRegistry.initialize()
+            local_model = ModelRegistry.active_model() or ModelRegistry.load()
+        model_id = local_model_id(local_model)
+        cache_key = TranscriptionCache.make_key(
+            audio_data, model_id and model_id + ('chunked', chunk_samples, overlap_samples))
+        cached = TranscriptionCache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        def transcribe_chunk(chunk):
+            return transcribe_local(chunk, local_model, use_cache=False)
+
+    vad = create_vad(sample_rate=WHISPER_SAMPLE_RATE)
+    ranges, hard_cuts = split_at_pauses(vad.speech_flags(audio_data), vad.frame_size, len(audio_data), chunk_samples,
+                                        overlap_samples)
+    if len(ranges) == 1:
+        return (ApiDeadline.transcribe(audio_data, local_model) if snapshot.model_options.use_api
+                else transcribe_local(audio_data, local_model))
+
+    decode_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(ranges)), thread_name_prefix='chunk') as executor:
+        texts = list(executor.map(transcribe_chunk, [audio_data[start:end] for start, end in ranges]))
+    ConfigManager.console_print(f'Transcribed {len(audio_data) / WHISPER_SAMPLE_RATE:.1f}s of audio as {len(ranges)} '
+                                f'chunks ({sum(hard_cuts)} hard cuts) in {time.perf_counter() - decode_start:.2f}s')
+    transcription = stitch_transcripts(texts, hard_cuts)
+    TranscriptionCache.put(cache_key, transcription)
+    return transcription
+
+def transcribe(audio_data, local_model=None, on_draft=None):
     """
     Transcribe audio date using the OpenAI API or a local model, depending on config.
+
+    :param on_draft: Optional callback receiving a post-processed first pass from the draft model,
+                     called before the main model decodes the same audio (two-pass mode)
     """
     if audio_data is None:
         return ''
 
-    if ConfigManager.get_config_value('model_options', 'use_api'):
-        transcription = transcribe_api(audio_data)
+    chunk_samples, concurrency = parallel_chunk_settings()
+    if chunk_samples and len(audio_data) > chunk_samples * 3 // 2:
+        transcription = transcribe_chunked(audio_data, local_model, chunk_samples, concurrency)
+    elif ConfigManager.snapshot().model_options.use_api:
+        transcription = ApiDeadline.transcribe(audio_data, local_model)
     else:
+        draft_model = ModelRegistry.active_model('draft') if on_draft else None
+        if draft_model is not None and draft_model is not (local_model or ModelRegistry.active_model()):
+            on_draft(post_process_transcription(transcribe_local(audio_data, draft_model)))
         transcription = transcribe_local(audio_data, local_model)
 
     return post_process_transcription(transcription)
 
+def transcribe_streaming(audio_data, on_text, local_model=None):
+    """
+    Transcribe audio data with a local model, passing post-processed text on as soon as it is decoded.
+
+    :param on_text: Callback receiving (text, start, end) for each piece, with times in seconds relative
+                    to the audio (None for the text released when the transcription is complete)
+    :return: The complete post-processed transcription
+    """
+    word_timestamps = bool(ConfigManager.snapshot().model_options.local.word_timestamps)
+    processor = IncrementalPostProcessor()
+    for text, start, end in transcribe_local_streaming(audio_data, local_model, word_timestamps):
+        piece = processor.feed(text)
+        if piece:
+            on_text(piece, start, end)
+    piece = processor.finish()
+    if piece:
+        on_text(piece, None, None)
+    return processor.emitted
+
+def transcribe_batch(audio_list, local_model=None):
+    """
+    Transcribe several utterances, batching them in one decode when using a local model.
+    """
+    if ConfigManager.snapshot().model_options.use_api:
+        return [transcribe(audio_data, local_model) for audio_data in audio_list]
+
+    transcriptions = transcribe_local_batched(audio_list, local_model)
+    return [post_process_transcription(transcription) for transcription in transcriptions]
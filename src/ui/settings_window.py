@@ -116,6 +116,8 @@ class SettingsWindow(BaseWindow):
             return self.create_line_edit(current_value, key)
         elif meta_type in ['int', 'float']:
             return self.create_line_edit(str(current_value))
+        elif meta_type == 'dict':
+            return self.create_line_edit(self.format_mapping(current_value))
         return None
 
     def create_checkbox(self, value, key):
@@ -148,6 +150,21 @@ class SettingsWindow(BaseWindow):
             return container
         return widget
 
+    @staticmethod
+    def format_mapping(value):
+        """Format a mapping as comma-separated 'key: value' pairs for a line edit."""
+        return ', '.join(f'{key}: {item}' for key, item in (value or {}).items())
+
+    @staticmethod
+    def parse_mapping(text):
+        """Parse comma-separated 'key: value' pairs from a line edit into a dict."""
+        mapping = {}
+        for pair in text.split(','):
+            key, separator, item = pair.partition(':')
+            if separator and key.strip() and item.strip():
+                mapping[key.strip()] = item.strip()
+        return mapping
+
     def create_help_button(self, description):
         help_button = QToolButton()
         help_button.setIcon(self.style().standardIcon(QStyle.SP_MessageBoxQuestion))
@@ -185,7 +202,7 @@ class SettingsWindow(BaseWindow):
         ConfigManager.set_config_value(None, 'model_options', 'api', 'api_key')
 
         ConfigManager.save_config()
-        QMessageBox.information(self, 'Settings Saved', 'Settings have been saved. The application will now restart.')
+        QMessageBox.information(self, 'Settings Saved', 'Settings have been saved and will now be applied. The application restarts unless only model options changed.')
         self.settings_saved.emit()
         self.close()
 
@@ -220,6 +237,8 @@ class SettingsWindow(BaseWindow):
             widget.setChecked(value)
         elif isinstance(widget, QComboBox):
             widget.setCurrentText(value)
+        elif isinstance(widget, QLineEdit) and value_type == 'dict':
+            widget.setText(self.format_mapping(value))
         elif isinstance(widget, QLineEdit):
             widget.setText(str(value) if value is not None else '')
         elif isinstance(widget, QWidget) and widget.layout():
@@ -240,6 +259,8 @@ class SettingsWindow(BaseWindow):
                 return int(text) if text else None
             elif value_type == 'float':
                 return float(text) if text else None
+            elif value_type == 'dict':
+                return self.parse_mapping(text)
             else:
                 return text or None
         elif isinstance(widget, QWidget) and widget.layout():
@@ -87,6 +87,15 @@ class StatusWindow(BaseWindow):
         if status in ('idle', 'error', 'cancel'):
             self.close()
 
+    @pyqtSlot(str, str)
+    def showPartialResult(self, committed, tentative):
+        """
+        Show the tail of the transcript while streaming transcription is in progress.
+        """
+        text = f'{committed} {tentative}'.strip()
+        if text:
+            self.status_label.setText(text if len(text) <= 40 else '...' + text[-37:])
+
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
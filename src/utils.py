@@ -1,5 +1,83 @@
 import yaml
 import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import fields, is_dataclass, make_dataclass
+from typing import Optional
+
+# Python types accepted for each schema type; ints are accepted where floats are expected
+SCHEMA_TYPES = {'bool': bool, 'int': int, 'float': float, 'str': str, 'dict': dict}
+
+
+def build_config_class(schema, name='Config'):
+    """
+    Generate a frozen, slotted dataclass mirroring the nesting of the configuration schema.
+
+    Sections become nested dataclasses, settings become fields annotated with their schema type.
+    """
+    class_fields = []
+    for key, item in schema.items():
+        if isinstance(item, dict) and 'value' in item:
+            class_fields.append((key, Optional[SCHEMA_TYPES.get(item.get('type'), object)]))
+        else:
+            class_fields.append((key, build_config_class(item, name + key.title().replace('_', ''))))
+    return make_dataclass(name, class_fields, frozen=True, slots=True)
+
+
+def validate_config_value(item, value):
+    """
+    Check a value against its schema entry.
+
+    :return: The value converted to the schema type
+    :raises ValueError: If the value does not have the schema type
+    """
+    if value is None:
+        return None
+    expected = item.get('type')
+    if expected == 'bool' and isinstance(value, bool):
+        return value
+    if expected == 'int' and isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if expected == 'float' and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if expected == 'str' and isinstance(value, (str, int, float)) and not isinstance(value, bool):
+        # Numbers are fine where a string is expected, e.g. a sound device index
+        return value if isinstance(value, str) else str(value)
+    if expected == 'dict' and isinstance(value, dict):
+        # Mappings such as hotkeys, with string keys and values
+        return {str(key): str(item) if isinstance(item, (int, float)) else item for key, item in value.items()}
+    if expected not in SCHEMA_TYPES:
+        return value
+    raise ValueError(f"expected {expected}, got {type(value).__name__} {value!r}")
+
+
+def build_config_snapshot(config_class, schema, config, path=()):
+    """
+    Build a config_class instance from the configuration, validating every value against the schema.
+    Invalid values are reported and replaced by their default, in the snapshot and in config.
+    """
+    values = {}
+    for field in fields(config_class):
+        item = schema[field.name]
+        section = config.get(field.name) if isinstance(config, dict) else None
+        if is_dataclass(field.type):
+            if not isinstance(section, dict):
+                section = config[field.name] = {}
+            values[field.name] = build_config_snapshot(field.type, item, section, path + (field.name,))
+            continue
+
+        value = section if field.name in config else item['value']
+        try:
+            value = validate_config_value(item, value)
+        except ValueError as e:
+            print(f"Invalid setting {'.'.join(path + (field.name,))}: {e}. Using the default {item['value']!r}.")
+            value = config[field.name] = item['value']
+        if value is not None and 'options' in item and value not in item['options']:
+            print(f"Setting {'.'.join(path + (field.name,))} is {value!r}, which is not one of {item['options']}")
+        values[field.name] = value
+    return config_class(**values)
+
 
 class ConfigManager:
     _instance = None
@@ -8,6 +86,10 @@ class ConfigManager:
         """Initialize the ConfigManager instance."""
         self.config = None
         self.schema = None
+        self.config_class = None
+        self.settings = None
+        self.settings_stale = False
+        self.settings_lock = threading.Lock()
 
     @classmethod
     def initialize(cls, schema_path=None):
@@ -17,6 +99,32 @@ class ConfigManager:
             cls._instance.schema = cls._instance.load_config_schema(schema_path)
             cls._instance.config = cls._instance.load_default_config()
             cls._instance.load_user_config()
+            cls._instance.config_class = build_config_class(cls._instance.schema)
+            cls._instance.update_snapshot()
+
+    def update_snapshot(self):
+        """Validate the configuration and replace the snapshot with one built from it."""
+        # Cleared first, so a value set while the snapshot is built marks it stale again
+        self.settings_stale = False
+        self.settings = build_config_snapshot(self.config_class, self.schema, self.config)
+
+    @classmethod
+    def snapshot(cls):
+        """
+        Get the current configuration as a frozen dataclass, e.g. snapshot().recording_options.sample_rate.
+
+        The snapshot is replaced as a whole when the configuration changes, so code can hold on to it
+        for the duration of an operation and see consistent values. After set_config_value it is
+        rebuilt once, on the next call, however many values were set.
+        """
+        instance = cls._instance
+        if instance is None:
+            raise RuntimeError("ConfigManager not initialized")
+        if instance.settings_stale:
+            with instance.settings_lock:
+                if instance.settings_stale:
+                    instance.update_snapshot()
+        return instance.settings
 
     @classmethod
     def get_schema(cls):
@@ -67,6 +175,7 @@ class ConfigManager:
                 config[key] = {}
             config = config[key]
         config[keys[-1]] = value
+        cls._instance.settings_stale = True
 
     @staticmethod
     def load_config_schema(schema_path=None):
@@ -116,6 +225,9 @@ class ConfigManager:
         """Save the current configuration to a YAML file."""
         if cls._instance is None:
             raise RuntimeError("ConfigManager not initialized")
+        # Validates the values set since the last snapshot, replacing invalid ones before they are saved
+        with cls._instance.settings_lock:
+            cls._instance.update_snapshot()
         with open(config_path, 'w') as file:
             yaml.dump(cls._instance.config, file, default_flow_style=False)
 
@@ -128,6 +240,8 @@ class ConfigManager:
             raise RuntimeError("ConfigManager not initialized")
         cls._instance.config = cls._instance.load_default_config()
         cls._instance.load_user_config()
+        with cls._instance.settings_lock:
+            cls._instance.update_snapshot()
 
     @classmethod
     def config_file_exists(cls):
@@ -138,5 +252,69 @@ class ConfigManager:
     @classmethod
     def console_print(cls, message):
         """Print a message to the console if enabled in the configuration."""
-        if cls._instance and cls._instance.config['misc']['print_to_terminal']:
+        if cls._instance and cls._instance.settings.misc.print_to_terminal:
             print(message)
+
+
+class StartupProfiler:
+    """
+    Records how long each startup phase takes, printed as a breakdown with --profile-startup.
+    Phases may run on different threads; the report shows when each one started and ended
+    relative to process start.
+    """
+    enabled = False
+    _origin = time.perf_counter()
+    _phases = []
+    _pending = set()
+    _lock = threading.Lock()
+
+    @classmethod
+    def set_origin(cls, origin):
+        """Set the time (from time.perf_counter) that phase timings are relative to."""
+        cls._origin = origin
+
+    @classmethod
+    @contextmanager
+    def phase(cls, name):
+        """Context manager timing a startup phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            cls.record(name, start, time.perf_counter())
+
+    @classmethod
+    def record(cls, name, start, end):
+        """Record a phase that ran from `start` to `end` (time.perf_counter values)."""
+        with cls._lock:
+            cls._phases.append((name, threading.current_thread().name, start - cls._origin, end - cls._origin))
+
+    @classmethod
+    def expect(cls, *milestones):
+        """Declare milestones that must be reached before startup is complete."""
+        with cls._lock:
+            cls._pending.update(milestones)
+
+    @classmethod
+    def milestone(cls, name):
+        """
+        Mark a milestone as reached.
+
+        :return: True if this was the last expected milestone
+        """
+        now = time.perf_counter()
+        cls.record(name, now, now)
+        with cls._lock:
+            was_pending = name in cls._pending
+            cls._pending.discard(name)
+            return was_pending and not cls._pending
+
+    @classmethod
+    def report(cls):
+        """Get the per-phase timing breakdown as printable text."""
+        with cls._lock:
+            phases = sorted(cls._phases, key=lambda phase: phase[2])
+        lines = [f'{"phase":<36}{"thread":<18}{"start (s)":>10}{"end (s)":>10}{"took (s)":>10}']
+        for name, thread, start, end in phases:
+            lines.append(f'{name:<36}{thread[:17]:<18}{start:>10.3f}{end:>10.3f}{end - start:>10.3f}')
+        return '\n'.join(lines)
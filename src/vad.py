@@ -0,0 +1,389 @@
+"""
+Voice activity detection backends.
+
+Every backend classifies whole buffers of int16 audio at once, returning one speech flag per
+complete frame, so the recording loop can classify everything that arrived since its last pass
+in one call and whole recordings can be trimmed offline with the same code.
+"""
+
+from abc import ABC, abstractmethod
+import numpy as np
+
+from utils import ConfigManager
+
+
+class VadBackend(ABC):
+    """
+    Base class of the voice activity detectors.
+
+    Backends may keep state between calls (noise floor, recurrent model state), so the audio
+    passed to consecutive speech_flags calls is treated as one continuous stream until reset.
+    """
+
+    name = None
+
+    def __init__(self, sample_rate=16000, frame_size=480, aggressiveness=2):
+        """
+        Initialize the backend.
+
+        :param sample_rate: Sample rate of the audio in Hz
+        :param frame_size: Number of samples per frame
+        :param aggressiveness: How aggressively non-speech is filtered out, 0 to 3
+        """
+        self.sample_rate = sample_rate
+        self.frame_size = frame_size
+        self.aggressiveness = aggressiveness
+
+    def frames(self, audio):
+        """Reshape a buffer into a (frames, frame_size) view, dropping any incomplete last frame."""
+        frame_count = len(audio) // self.frame_size
+        return np.asarray(audio)[:frame_count * self.frame_size].reshape(frame_count, self.frame_size)
+
+    @abstractmethod
+    def speech_flags(self, audio):
+        """
+        Classify each complete frame of a buffer.
+
+        :param audio: 1-D int16 numpy array, continuing the audio of the previous call
+        :return: Boolean numpy array with one entry per complete frame
+        """
+
+    def is_speech(self, frame):
+        """Classify a single frame."""
+        return bool(self.speech_flags(frame)[0])
+
+    def reset(self):
+        """Forget the state of the audio seen so far."""
+
+
+class WebRtcVad(VadBackend):
+    """The WebRTC GMM-based detector; frames must be 10, 20 or 30 ms long."""
+
+    name = 'webrtc'
+
+    def __init__(self, sample_rate=16000, frame_size=480, aggressiveness=2):
+        super().__init__(sample_rate, frame_size, aggressiveness)
+        import webrtcvad
+        self.vad = webrtcvad.Vad(aggressiveness)
+
+    def speech_flags(self, audio):
+        data = np.ascontiguousarray(self.frames(audio), dtype=np.int16).tobytes()
+        frame_bytes = 2 * self.frame_size
+        is_speech = self.vad.is_speech
+        return np.fromiter((is_speech(data[start:start + frame_bytes], self.sample_rate)
+                            for start in range(0, len(data), frame_bytes)),
+                           dtype=bool, count=len(data) // frame_bytes)
+
+
+class EnergyVad(VadBackend):
+    """
+    Energy and zero-crossing rate detector, computed for all frames of a buffer at once.
+
+    A frame is speech when its energy is a margin above the tracked noise floor. Frames with
+    a high zero-crossing rate, typical of broadband noise, need 1.5 times the margin. The noise
+    floor follows the quietest frames immediately and rises slowly otherwise.
+    """
+
+    name = 'energy'
+
+    MARGIN_DB = (4.0, 6.0, 8.0, 10.0)
+    MIN_ENERGY_DB = -55.0  # Frames quieter than this (dBFS) are never speech
+    NOISE_FLOOR_RISE_DB = 0.05  # Per frame
+    NOISY_ZCR = 0.35
+
+    def __init__(self, sample_rate=16000, frame_size=480, aggressiveness=2):
+        super().__init__(sample_rate, frame_size, aggressiveness)
+        self.margin_db = self.MARGIN_DB[aggressiveness]
+        self.noise_floor_db = None
+
+    def speech_flags(self, audio):
+        frames = self.frames(audio)
+        if not len(frames):
+            return np.zeros(0, dtype=bool)
+
+        samples = frames.astype(np.float32) * (1.0 / 32768.0)
+        energy_db = 10.0 * np.log10(np.einsum('ij,ij->i', samples, samples) / self.frame_size + 1e-10)
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (self.frame_size - 1)
+
+        # floor[i] = min(floor[i - 1] + rise, energy[i]) for all frames at once
+        rise = self.NOISE_FLOOR_RISE_DB
+        steps = np.arange(len(energy_db)) * rise
+        initial = energy_db[0] if self.noise_floor_db is None else self.noise_floor_db + rise
+        noise_floor = steps + np.minimum(initial, np.minimum.accumulate(energy_db - steps))
+        self.noise_floor_db = float(noise_floor[-1])
+
+        margin = np.where(zcr > self.NOISY_ZCR, 1.5 * self.margin_db, self.margin_db)
+        return (energy_db > noise_floor + margin) & (energy_db > self.MIN_ENERGY_DB)
+
+    def reset(self):
+        self.noise_floor_db = None
+
+
+class SileroVad(VadBackend):
+    """
+    The Silero neural detector bundled with faster-whisper, run on the CPU with onnxruntime.
+
+    The model classifies 512-sample windows; each frame gets the probability of the last
+    window that ended within it (or before it).
+    """
+
+    name = 'silero'
+
+    WINDOW_SAMPLES = 512
+    HISTORY_WINDOWS = 8  # Context re-run with each call when the model cannot carry its state
+    THRESHOLDS = (0.3, 0.4, 0.5, 0.65)
+
+    def __init__(self, sample_rate=16000, frame_size=480, aggressiveness=2):
+        super().__init__(sample_rate, frame_size, aggressiveness)
+        if sample_rate != 16000:
+            raise ValueError('The Silero VAD requires 16 kHz audio')
+        from faster_whisper.vad import get_vad_model
+        self.model = get_vad_model()
+        # faster-whisper < 1.1 exposes the recurrent state, later versions decode whole buffers
+        self.stateful = hasattr(self.model, 'get_initial_state')
+        self.threshold = self.THRESHOLDS[aggressiveness]
+        self.reset()
+
+    def reset(self):
+        self.pending = np.zeros(0, dtype=np.float32)
+        self.history = np.zeros(0, dtype=np.float32)
+        self.samples_seen = 0
+        self.windows_done = 0
+        self.last_probability = 0.0
+        if self.stateful:
+            self.state = self.model.get_initial_state(batch_size=1)
+
+    def _window_probabilities(self, windows):
+        """Get the speech probability of each new (windows, 512) block."""
+        if self.stateful:
+            probabilities = []
+            for window in windows:
+                probability, self.state = self.model(window, self.state, self.sample_rate)
+                probabilities.append(float(np.ravel(probability)[0]))
+            return np.array(probabilities, dtype=np.float32)
+
+        audio = np.concatenate([self.history, windows.ravel()])
+        # Copied first, the model overwrites part of its input in place
+        self.history = audio[-self.HISTORY_WINDOWS * self.WINDOW_SAMPLES:].copy()
+        return np.ravel(self.model(audio[np.newaxis, :]))[-len(windows):]
+
+    def speech_flags(self, audio):
+        frame_count = len(audio) // self.frame_size
+        audio = np.asarray(audio)[:frame_count * self.frame_size]
+        self.pending = np.concatenate([self.pending, audio.astype(np.float32) * (1.0 / 32768.0)])
+
+        window_count = len(self.pending) // self.WINDOW_SAMPLES
+        if window_count:
+            windows = self.pending[:window_count * self.WINDOW_SAMPLES].reshape(window_count, self.WINDOW_SAMPLES)
+            probabilities = self._window_probabilities(windows)
+            self.pending = self.pending[window_count * self.WINDOW_SAMPLES:]
+
+            # Map each frame to the last window that ended at or before the end of the frame
+            window_ends = (self.windows_done + np.arange(1, window_count + 1)) * self.WINDOW_SAMPLES
+            frame_ends = self.samples_seen + np.arange(1, frame_count + 1) * self.frame_size
+            indices = np.searchsorted(window_ends, frame_ends, side='right') - 1
+            frame_probabilities = np.where(indices >= 0, probabilities[np.maximum(indices, 0)], self.last_probability)
+        else:
+            frame_probabilities = np.full(frame_count, self.last_probability)
+
+        self.samples_seen += frame_count * self.frame_size
+        self.windows_done += window_count
+        if window_count:
+            self.last_probability = float(probabilities[-1])
+        return frame_probabilities > self.threshold
+
+
+VAD_BACKENDS = {backend.name: backend for backend in (WebRtcVad, EnergyVad, SileroVad)}
+
+
+def create_vad(backend=None, sample_rate=16000, frame_size=480, aggressiveness=2):
+    """
+    Create a voice activity detector, falling back to WebRTC if the backend is unavailable.
+
+    :param backend: Name of the backend, defaults to recording_options.vad_backend
+    :return: VadBackend instance
+    """
+    if backend is None:
+        backend = ConfigManager.snapshot().recording_options.vad_backend or 'webrtc'
+    backend_class = VAD_BACKENDS.get(backend)
+    if backend_class is None:
+        ConfigManager.console_print(f'Unknown VAD backend {backend}, using webrtc.')
+        backend_class = WebRtcVad
+    try:
+        return backend_class(sample_rate, frame_size, aggressiveness)
+    except (ImportError, RuntimeError, ValueError) as e:
+        if backend_class is WebRtcVad:
+            raise
+        ConfigManager.console_print(f'Could not create the {backend} VAD ({e}), using webrtc.')
+        return WebRtcVad(sample_rate, frame_size, aggressiveness)
+
+
+class SilenceTracker:
+    """
+    Tracks speech onset and the length of the current silence across batches of speech flags.
+    """
+
+    def __init__(self):
+        """Initialize the SilenceTracker."""
+        self.speech_detected = False
+        self.silent_frames = 0
+
+    def update(self, flags):
+        """
+        Consume the speech flags of the next frames.
+
+        :param flags: Boolean numpy array, one entry per frame
+        :return: Tuple of (consecutive non-speech frames up to and including each frame,
+                 whether speech has been detected by each frame)
+        """
+        flags = np.asarray(flags, dtype=bool)
+        positions = np.arange(len(flags))
+        last_speech = np.maximum.accumulate(np.where(flags, positions, -1)) if len(flags) else positions
+        silent_runs = np.where(last_speech >= 0, positions - last_speech, self.silent_frames + positions + 1)
+        speech_seen = self.speech_detected | (last_speech >= 0)
+        if len(flags):
+            self.speech_detected = bool(speech_seen[-1])
+            self.silent_frames = int(silent_runs[-1])
+        return silent_runs, speech_seen
+
+
+def trim_silence(audio, vad, padding_ms=200):
+    """
+    Trim the silence before the first and after the last speech frame of a recording.
+
+    :param audio: 1-D int16 numpy array
+    :param vad: VadBackend to classify the frames with; it is reset first
+    :param padding_ms: Audio to keep on either side of the speech
+    :return: Zero-copy view of the speech part, or an empty view if there is no speech
+    """
+    vad.reset()
+    speech_frames = np.flatnonzero(vad.speech_flags(audio))
+    if not len(speech_frames):
+        return audio[:0]
+    padding = int(padding_ms * vad.sample_rate / 1000)
+    start = max(int(speech_frames[0]) * vad.frame_size - padding, 0)
+    stop = min((int(speech_frames[-1]) + 1) * vad.frame_size + padding, len(audio))
+    return audio[start:stop]
+
+
+class TimestampMap:
+    """
+    Maps times in compacted audio back to times in the original recording.
+    """
+
+    def __init__(self, chunks, sample_rate):
+        """
+        Initialize the TimestampMap.
+
+        :param chunks: List of (original start, original end) sample ranges kept, in order
+        :param sample_rate: Sample rate of the audio in Hz
+        """
+        self.sample_rate = sample_rate
+        lengths = np.array([end - start for start, end in chunks], dtype=np.int64)
+        self.original_starts = np.array([start for start, _ in chunks], dtype=np.int64)
+        self.compacted_starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]) if len(chunks) else lengths
+
+    def to_original(self, time):
+        """Convert a time in seconds in the compacted audio to the time in the original recording."""
+        if not len(self.original_starts):
+            return time
+        sample = time * self.sample_rate
+        index = max(int(np.searchsorted(self.compacted_starts, sample, side='right')) - 1, 0)
+        return (self.original_starts[index] + sample - self.compacted_starts[index]) / self.sample_rate
+
+
+def compact_silence(audio, flags, frame_size, sample_rate, max_pause_ms, padding_ms=200):
+    """
+    Cut leading and trailing silence and shorten long pauses, using per-frame speech flags.
+
+    :param audio: 1-D int16 numpy array
+    :param flags: Boolean numpy array with one speech flag per frame of the audio
+    :param max_pause_ms: Pauses between speech are shortened to this length
+    :param padding_ms: Audio kept before the first and after the last speech frame
+    :return: Tuple of (compacted audio, TimestampMap), or (audio, None) if nothing is removed
+    """
+    flags = np.asarray(flags, dtype=bool)[:len(audio) // frame_size]
+    if not flags.any():
+        # Nothing was detected, decode everything rather than risk losing quiet speech
+        return audio, None
+
+    frame_ms = 1000 * frame_size / sample_rate
+    padding_frames = int(padding_ms / frame_ms)
+    max_pause_frames = max(int(max_pause_ms / frame_ms), 2 * padding_frames)
+
+    # Frame ranges of the speech, from the first speech frame to the last
+    edges = np.flatnonzero(np.diff(np.concatenate([[False], flags, [False]]).astype(np.int8)))
+    speech_starts, speech_ends = edges[::2], edges[1::2]
+
+    # Keep each pause up to the maximum, split between its start and its end
+    ranges = [[max(speech_starts[0] - padding_frames, 0), speech_ends[0]]]
+    for start, end in zip(speech_starts[1:], speech_ends[1:]):
+        pause = start - ranges[-1][1]
+        if pause <= max_pause_frames:
+            ranges[-1][1] = end
+        else:
+            ranges[-1][1] += max_pause_frames // 2
+            ranges.append([start - (max_pause_frames - max_pause_frames // 2), end])
+    ranges[-1][1] = min(ranges[-1][1] + padding_frames, len(flags))
+
+    chunks = [(int(start) * frame_size, int(end) * frame_size) for start, end in ranges]
+    kept = sum(end - start for start, end in chunks)
+    if kept >= len(audio):
+        return audio, None
+    compacted = np.concatenate([audio[start:end] for start, end in chunks])
+    return compacted, TimestampMap(chunks, sample_rate)
+
+
+def split_at_pauses(flags, frame_size, total_samples, chunk_samples, overlap_samples=0, min_pause_frames=10):
+    """
+    Split a recording into chunks of about chunk_samples, cutting in the middle of pauses in speech.
+
+    Each cut is made in a pause between half and one and a half chunks after the previous cut: the
+    pause of at least min_pause_frames closest to a full chunk, else the longest shorter pause. Where
+    there is no pause the chunk is cut hard at its full length. Chunks overlap by overlap_samples on
+    either side of a hard cut, and by at most half the pause on either side of a cut in a pause.
+
+    :param flags: Boolean numpy array with one speech flag per frame of the recording
+    :param total_samples: Length of the recording in samples
+    :return: Tuple of (list of (start, end) sample ranges, list telling for each cut whether it was hard)
+    """
+    flags = np.asarray(flags, dtype=bool)[:-(-total_samples // frame_size)]
+    total_frames = -(-total_samples // frame_size)
+    chunk_frames = max(chunk_samples // frame_size, 1)
+
+    # Frame ranges of the pauses, longer than a frame so a single misclassified frame is no pause
+    edges = np.flatnonzero(np.diff(np.concatenate([[True], flags, [True]]).astype(np.int8)))
+    pause_starts, pause_ends = edges[::2], edges[1::2]
+    lengths = pause_ends - pause_starts
+    keep = lengths >= 2
+    pause_starts, lengths = pause_starts[keep], lengths[keep]
+    centers = pause_starts + lengths // 2
+
+    cuts = []
+    start = 0
+    while total_frames - start > chunk_frames * 3 // 2:
+        target = start + chunk_frames
+        candidates = np.flatnonzero((centers > start + chunk_frames // 2) & (centers < start + chunk_frames * 3 // 2))
+        long_pauses = candidates[lengths[candidates] >= min_pause_frames]
+        if len(long_pauses):
+            best = long_pauses[np.argmin(np.abs(centers[long_pauses] - target))]
+        elif len(candidates):
+            best = candidates[np.argmax(lengths[candidates])]
+        else:
+            best = None
+        if best is None:
+            cuts.append((target, overlap_samples, True))
+            start = target
+        else:
+            cuts.append((int(centers[best]), min(overlap_samples, int(lengths[best]) // 2 * frame_size), False))
+            start = int(centers[best])
+
+    ranges = []
+    previous_end, previous_overlap = 0, 0
+    for frame, overlap, _ in cuts:
+        cut = frame * frame_size
+        ranges.append((max(previous_end - previous_overlap, 0), min(cut + overlap, total_samples)))
+        previous_end, previous_overlap = cut, overlap
+    ranges.append((max(previous_end - previous_overlap, 0), total_samples))
+    return ranges, [hard for _, _, hard in cuts]
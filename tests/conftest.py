@@ -0,0 +1,52 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    """A ConfigManager with the schema defaults, not reading the user's config.yaml."""
+    from utils import ConfigManager
+    monkeypatch.chdir(tmp_path)
+    ConfigManager._instance = None
+    ConfigManager.initialize()
+    ConfigManager.set_config_value(False, 'misc', 'print_to_terminal')
+    ConfigManager.set_config_value(0, 'model_options', 'common', 'cache_size')
+    yield ConfigManager
+    ConfigManager._instance = None
+
+
+class FakeWhisperModel:
+    """Stands in for a faster-whisper WhisperModel, decoding any audio to the given segments."""
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.calls = []
+
+    def transcribe(self, audio, **options):
+        self.calls.append(options)
+        duration = len(audio) / 16000 / max(len(self.texts), 1)
+        segments = (SimpleNamespace(text=text, start=i * duration, end=(i + 1) * duration, words=None)
+                    for i, text in enumerate(self.texts))
+        return segments, None
+
+
+@pytest.fixture
+def fake_model(config):
+    """A FakeWhisperModel registered as the active main model."""
+    from model_registry import ModelRegistry
+    ModelRegistry._instance = None
+    ModelRegistry.initialize()
+    model = FakeWhisperModel([' Hello', ' world.'])
+    key = ModelRegistry.model_key()
+    with ModelRegistry._instance.lock:
+        ModelRegistry._instance.models[key] = model
+    ModelRegistry.activate(key)
+    yield model
+    ModelRegistry._instance = None
@@ -0,0 +1,110 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip('openai')
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks')
+if BENCHMARKS_DIR not in sys.path:
+    sys.path.insert(0, BENCHMARKS_DIR)
+
+from fake_api_server import start_server  # noqa: E402
+from transcription import ApiClient, ApiDeadline, transcribe_api  # noqa: E402
+
+
+@pytest.fixture
+def api_server(config, monkeypatch):
+    """The fake API server, configured as model_options.api.base_url."""
+    server, base_url = start_server()
+    config.set_config_value(base_url, 'model_options', 'api', 'base_url')
+    monkeypatch.setenv('OPENAI_API_KEY', 'test-key')
+    ApiClient.close()
+    yield server
+    ApiClient.close()
+    server.shutdown()
+    server.server_close()
+
+
+def test_api_deadline_makes_the_only_retries(config, api_server):
+    config.set_config_value(1, 'model_options', 'api', 'max_retries')
+    config.set_config_value(False, 'model_options', 'api', 'local_fallback')
+    audio = np.zeros(16000, dtype=np.int16)
+
+    api_server.set_faults(script=['error', 'ok'])
+    with pytest.raises(Exception):
+        transcribe_api(audio)
+    assert api_server.stats['requests'] == 1
+
+    api_server.set_faults(script=['error', 'error', 'ok'])
+    with pytest.raises(Exception):
+        ApiDeadline.transcribe(audio)
+    assert api_server.stats['requests'] == 3
+
+
+@pytest.mark.parametrize('upload_format, mime_type, module', [
+    ('wav', 'audio/wav', 'soundfile'),
+    ('flac', 'audio/flac', 'soundfile'),
+    ('opus', 'audio/ogg', 'av'),
+])
+def test_each_upload_format_reaches_the_api(config, api_server, upload_format, mime_type, module):
+    pytest.importorskip(module)
+    config.set_config_value(upload_format, 'model_options', 'api', 'upload_format')
+    # A second of a tone, something for the encoders to compress
+    audio = (np.sin(np.arange(16000) * 2 * np.pi * 440 / 16000) * 8000).astype(np.int16)
+
+    assert transcribe_api(audio) == 'This is a fake transcription.'
+    assert transcribe_api(audio[::-1].copy()) == 'This is a fake transcription.'
+
+    formats = api_server.stats['formats']
+    assert list(formats) == [mime_type]
+    assert formats[mime_type]['requests'] == 2
+    if upload_format != 'wav':
+        assert formats[mime_type]['bytes'] < 2 * audio.nbytes / 2
+    # The pooled client keeps its connection alive between requests
+    assert api_server.stats['connections'] == 1
+    assert ApiClient._instance.last_timings['reused_connection']
+
+
+@pytest.fixture
+def deadline(config, monkeypatch):
+    """A fresh ApiDeadline, configured to fall back to the local model."""
+    monkeypatch.setattr(ApiDeadline, '_instance', None)
+    config.set_config_value(True, 'model_options', 'api', 'local_fallback')
+    config.set_config_value(0, 'model_options', 'api', 'max_retries')
+    return ApiDeadline
+
+
+def test_local_model_answers_when_the_api_fails(config, api_server, fake_model, deadline):
+    api_server.set_faults(script=['error'])
+
+    assert deadline.transcribe(np.zeros(16000, dtype=np.int16)) == ' Hello world.'
+    assert deadline.stats() == {'local (fallback, API failed: InternalServerError)': 1}
+
+
+def test_hedged_local_decode_wins_over_a_slow_api(config, api_server, fake_model, deadline):
+    config.set_config_value(100, 'model_options', 'api', 'hedge_after')
+    api_server.set_faults(delay=2000)
+
+    started = time.monotonic()
+    assert deadline.transcribe(np.zeros(16000, dtype=np.int16)) == ' Hello world.'
+
+    assert time.monotonic() - started < 1.5
+    assert deadline.stats() == {'local (hedge, no API answer after 100 ms)': 1}
+    api_server.set_faults()
+    assert deadline.transcribe(np.ones(16000, dtype=np.int16)) == 'This is a fake transcription.'
+
+
+def test_hung_api_is_given_up_on_at_the_deadline(config, api_server, deadline):
+    config.set_config_value(False, 'model_options', 'api', 'local_fallback')
+    config.set_config_value(300, 'model_options', 'api', 'deadline')
+    api_server.set_faults(script=['hang'], hang_seconds=3)
+
+    started = time.monotonic()
+    with pytest.raises(Exception):
+        deadline.transcribe(np.zeros(16000, dtype=np.int16))
+
+    assert time.monotonic() - started < 1.5
+    assert api_server.stats['requests'] == 1
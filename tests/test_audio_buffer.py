@@ -0,0 +1,47 @@
+import numpy as np
+
+from audio_buffer import AudioBuffer, RingBuffer
+
+
+def test_audio_buffer_grows_without_invalidating_views():
+    buffer = AudioBuffer(4)
+    buffer.write(np.arange(3, dtype=np.int16))
+    early_view = buffer.view()
+
+    buffer.write(np.arange(3, 10, dtype=np.int16))
+
+    assert buffer.capacity >= 10
+    assert early_view.tolist() == [0, 1, 2]
+    assert buffer.view().tolist() == list(range(10))
+    assert buffer.view(2, 5).tolist() == [2, 3, 4]
+
+
+def test_audio_buffer_hands_out_complete_frames_only():
+    buffer = AudioBuffer(16)
+    buffer.write(np.arange(10, dtype=np.int16))
+
+    assert buffer.available_frames(4) == 2
+    assert buffer.frame(1, 4).tolist() == [4, 5, 6, 7]
+    assert buffer.frame(2, 4) is None
+
+    frame = buffer.frame(0, 4)
+    frame_memory = np.shares_memory(frame, buffer.view())
+    buffer.clear()
+    assert frame_memory
+    assert len(buffer) == 0 and buffer.capacity == 16
+
+
+def test_ring_buffer_keeps_the_most_recent_samples_in_order():
+    ring = RingBuffer(5)
+    ring.write(np.arange(3, dtype=np.int16))
+    assert ring.read().tolist() == [0, 1, 2]
+
+    ring.write(np.arange(3, 7, dtype=np.int16))
+    assert ring.read().tolist() == [2, 3, 4, 5, 6]
+    assert ring.read(2).tolist() == [5, 6]
+
+    ring.write(np.arange(10, 20, dtype=np.int16))
+    assert ring.read().tolist() == [15, 16, 17, 18, 19]
+
+    ring.clear()
+    assert len(ring) == 0 and ring.read().tolist() == []
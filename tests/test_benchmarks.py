@@ -0,0 +1,70 @@
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks')
+if BENCHMARKS_DIR not in sys.path:
+    sys.path.insert(0, BENCHMARKS_DIR)
+
+from common import find_audio_files, load_corpus, load_wav, synthetic_labelled_audio  # noqa: E402
+
+
+def test_corpus_is_read_from_wav_and_flac_files_at_16_khz(tmp_path):
+    soundfile = pytest.importorskip('soundfile')
+    tone = np.sin(np.arange(8000) * 2 * np.pi * 440 / 8000).astype(np.float32) * 0.5
+    (tmp_path / 'nested').mkdir()
+    soundfile.write(tmp_path / 'nested' / 'b.flac', tone, 8000)
+    soundfile.write(tmp_path / 'a.wav', np.stack([tone, tone], axis=1), 8000)
+    (tmp_path / 'a.txt').write_text('reference transcript')
+
+    assert [os.path.basename(path) for path in find_audio_files([str(tmp_path)])] == ['a.wav', 'b.flac']
+    audio = load_wav(str(tmp_path / 'a.wav'))
+    assert audio.dtype == np.int16 and len(audio) == 16000
+    assert 16000 < np.abs(audio).max() <= 16384
+
+
+def test_synthetic_corpus_is_used_without_audio_files(tmp_path):
+    corpus = load_corpus([str(tmp_path)], synthetic_count=2, synthetic_duration=2.0)
+
+    assert [name for name, _ in corpus] == ['synthetic-0', 'synthetic-1']
+    assert all(len(audio) == 32000 for _, audio in corpus)
+    audio, labels = synthetic_labelled_audio(4.0, trailing_silence=1.0)
+    assert labels.any() and not labels[-16000:].any()
+    assert np.abs(audio[labels]).mean() > 10 * np.abs(audio[~labels]).mean()
+
+
+def test_replayed_recording_goes_through_the_voice_activity_loop(config, fake_model):
+    pytest.importorskip('PyQt5')
+    pytest.importorskip('webrtcvad')
+    from PyQt5.QtCore import Qt
+    from replay_pipeline import ReplayInputStream
+    from result_thread import ResultThread
+
+    config.set_config_value('voice_activity_detection', 'recording_options', 'recording_mode')
+    config.set_config_value(16000, 'recording_options', 'sample_rate')
+    streams, results = [], []
+    result_ready = threading.Event()
+
+    def stream_factory(**kwargs):
+        streams.append(ReplayInputStream(speed=0, **kwargs))
+        return streams[-1]
+
+    thread = ResultThread(input_stream_factory=stream_factory)
+    thread.resultSignal.connect(lambda text: (results.append(text), result_ready.set()), Qt.DirectConnection)
+    thread.start()
+    try:
+        while not streams:
+            time.sleep(0.01)
+        thread.start_recording()
+        streams[0].play(synthetic_labelled_audio(3.0, trailing_silence=0.5)[0])
+        assert result_ready.wait(10)
+    finally:
+        thread.stop()
+        thread.wait(5000)
+
+    assert results == ['Hello world. ']
+    assert thread.job_timings[-1]['transcription'] >= 0
@@ -0,0 +1,219 @@
+import os
+import sys
+import threading
+
+import pytest
+
+from clipboard_manager import (CF_DIB, CF_TEXT, CF_UNICODETEXT, ClipboardManager, MemoryClipboardBackend,
+                               WaylandClipboardBackend, Win32ClipboardBackend, X11ClipboardBackend,
+                               create_clipboard_backend)
+
+
+class DelayedClipboardBackend(MemoryClipboardBackend):
+    """A clipboard whose writes land in the background, like wl-copy and xclip."""
+
+    synchronous_write = False
+
+    def __init__(self, delay, data=None):
+        super().__init__(data)
+        self.delay = delay
+
+    def write(self, data):
+        timer = threading.Timer(self.delay, MemoryClipboardBackend.write, (self, data))
+        timer.daemon = True
+        timer.start()
+
+
+def test_set_text_waits_until_the_text_can_be_read_back():
+    manager = ClipboardManager(DelayedClipboardBackend(0.05, {'text/plain': 'old'}))
+
+    assert manager.set_text('new')
+    assert manager.get_text() == 'new'
+
+
+def test_set_text_fails_when_the_text_never_arrives():
+    manager = ClipboardManager(DelayedClipboardBackend(10, {'text/plain': 'old'}))
+
+    assert not manager.set_text('new', timeout=0.05)
+
+
+class RecordingX11Backend(X11ClipboardBackend):
+    """The xclip backend with the commands replaced by an in-memory clipboard that counts them."""
+
+    synchronous_write = True
+
+    def __init__(self, text):
+        self.text = text.encode()
+        self.commands = []
+
+    def _types(self):
+        self.commands.append('list')
+        return ['UTF8_STRING', 'TARGETS']
+
+    def _read_type(self, mime_type, max_bytes=None):
+        self.commands.append('read')
+        return self.text, len(self.text)
+
+    def write(self, data):
+        self.commands.append('write')
+        self.text = next(iter(data.values()))
+        self.text = self.text.encode() if isinstance(self.text, str) else self.text
+
+
+def test_command_backend_paste_runs_no_extra_commands():
+    backend = RecordingX11Backend('copied by the user')
+    manager = ClipboardManager(backend)
+
+    assert manager.save()
+    assert manager.set_text('dictated')
+    assert manager.restore()
+
+    assert backend.commands == ['list', 'read', 'write', 'write']
+    assert backend.text == b'copied by the user'
+
+
+class FakeWin32Clipboard:
+    """Stands in for the win32clipboard module, with the format ID as the handle of each format."""
+
+    def __init__(self, data):
+        self.data = dict(data)
+        self.sequence = 1
+        self.copied = []
+
+    def GetClipboardSequenceNumber(self):
+        return self.sequence
+
+    def OpenClipboard(self):
+        pass
+
+    def CloseClipboard(self):
+        pass
+
+    def EnumClipboardFormats(self, format_id):
+        format_ids = list(self.data)
+        index = format_ids.index(format_id) + 1 if format_id else 0
+        return format_ids[index] if index < len(format_ids) else 0
+
+    def GetClipboardDataHandle(self, format_id):
+        return format_id
+
+    def GetClipboardData(self, format_id):
+        self.copied.append(format_id)
+        return self.data[format_id]
+
+    def EmptyClipboard(self):
+        self.data = {}
+        self.sequence += 1
+
+    def SetClipboardData(self, format_id, data):
+        self.data[format_id] = data
+        self.sequence += 1
+
+    def size(self, handle):
+        return len(self.data[handle])
+
+
+def win32_manager(data, max_format_bytes=1024):
+    clipboard = FakeWin32Clipboard(data)
+    return clipboard, ClipboardManager(Win32ClipboardBackend(clipboard, clipboard.size), max_format_bytes)
+
+
+def test_snapshot_skips_large_and_synthesized_formats():
+    clipboard, manager = win32_manager({CF_UNICODETEXT: 'caption', CF_TEXT: b'caption', CF_DIB: b'x' * 4096})
+
+    assert manager.save()
+    assert clipboard.copied == [CF_UNICODETEXT]
+    assert manager.get_format_names() == ['CF_UNICODETEXT (7 bytes)', 'CF_DIB (4096 bytes, not saved)']
+
+    assert manager.set_text('dictated')
+    assert manager.restore()
+    assert clipboard.data == {CF_UNICODETEXT: 'caption'}
+
+
+def test_snapshot_is_reused_while_the_clipboard_is_unchanged():
+    clipboard, manager = win32_manager({CF_UNICODETEXT: 'caption'})
+
+    for text in ('first', 'second'):
+        assert manager.save()
+        assert manager.set_text(text)
+        assert manager.restore()
+
+    assert clipboard.copied == [CF_UNICODETEXT]  # One snapshot for both pastes
+    assert clipboard.data == {CF_UNICODETEXT: 'caption'}
+
+
+def test_restore_keeps_what_the_user_copied_after_the_paste():
+    clipboard, manager = win32_manager({CF_UNICODETEXT: 'caption'})
+    assert manager.save()
+    assert manager.set_text('dictated')
+
+    clipboard.SetClipboardData(CF_UNICODETEXT, 'copied by the user')
+
+    assert not manager.restore()
+    assert clipboard.data == {CF_UNICODETEXT: 'copied by the user'}
+
+
+FAKE_WL_CLIPBOARD = """#!{python}
+import os, sys
+store = os.environ['FAKE_CLIPBOARD']
+if os.path.basename(sys.argv[0]) == 'wl-copy':
+    with open(os.path.join(store, 'data'), 'wb') as file:
+        file.write(sys.stdin.buffer.read())
+    with open(os.path.join(store, 'type'), 'w') as file:
+        file.write(sys.argv[sys.argv.index('--type') + 1])
+elif os.path.exists(os.path.join(store, 'type')):
+    with open(os.path.join(store, 'type')) as file:
+        mime_type = file.read()
+    if '--list-types' in sys.argv:
+        print(mime_type)
+    elif sys.argv[sys.argv.index('--type') + 1] == mime_type:
+        with open(os.path.join(store, 'data'), 'rb') as file:
+            sys.stdout.buffer.write(file.read())
+    else:
+        sys.exit(1)
+"""
+
+
+@pytest.fixture
+def wayland_clipboard(tmp_path, monkeypatch):
+    """A WaylandClipboardBackend running stand-ins for wl-copy and wl-paste that keep one type."""
+    if sys.platform == 'win32':
+        pytest.skip('The stand-ins are scripts run through their shebang line')
+    bin_dir, store = tmp_path / 'bin', tmp_path / 'clipboard'
+    bin_dir.mkdir()
+    store.mkdir()
+    for name in ('wl-copy', 'wl-paste'):
+        script = bin_dir / name
+        script.write_text(FAKE_WL_CLIPBOARD.format(python=sys.executable))
+        script.chmod(0o755)
+    monkeypatch.setenv('PATH', f'{bin_dir}:' + os.environ['PATH'])
+    monkeypatch.setenv('FAKE_CLIPBOARD', str(store))
+    monkeypatch.setenv('WAYLAND_DISPLAY', 'wayland-0')
+    return WaylandClipboardBackend()
+
+
+@pytest.mark.parametrize('backend_name', ['memory', 'wayland'])
+def test_save_and_restore_behave_the_same_on_every_backend(backend_name, request):
+    backend = request.getfixturevalue('wayland_clipboard') if backend_name == 'wayland' else MemoryClipboardBackend()
+    manager = ClipboardManager(backend)
+    backend.write({'image/png': b'\x89PNG screenshot'})
+
+    assert manager.save()
+    assert manager.set_text('dictated')
+    assert manager.get_text() == 'dictated'
+    assert manager.restore()
+
+    data, _ = backend.read(None)
+    assert data == {'image/png': b'\x89PNG screenshot'}
+    assert manager.measure_round_trip() is not None
+
+
+def test_clipboard_backend_is_chosen_for_the_session(wayland_clipboard, monkeypatch):
+    monkeypatch.setattr(sys, 'platform', 'linux')
+    assert isinstance(create_clipboard_backend('memory'), MemoryClipboardBackend)
+    assert isinstance(create_clipboard_backend(), WaylandClipboardBackend)
+
+    monkeypatch.delenv('WAYLAND_DISPLAY')
+    monkeypatch.delenv('DISPLAY', raising=False)
+    with pytest.raises(RuntimeError):
+        create_clipboard_backend('auto')
@@ -0,0 +1,67 @@
+import dataclasses
+
+import pytest
+
+
+def test_snapshot_is_rebuilt_once_after_several_values_are_set(config, monkeypatch):
+    builds = []
+    update_snapshot = config.update_snapshot
+    monkeypatch.setattr(config, 'update_snapshot', lambda self: builds.append(self) or update_snapshot(self))
+
+    config.set_config_value(0.01, 'post_processing', 'writing_key_press_delay')
+    config.set_config_value(8, 'post_processing', 'typing_batch_size')
+    config.set_config_value('auto', 'output', 'output_method')
+    assert not builds
+
+    snapshot = config.snapshot()
+    assert config.snapshot() is snapshot
+    assert len(builds) == 1
+    assert snapshot.post_processing.typing_batch_size == 8
+    assert snapshot.output.output_method == 'auto'
+
+
+def test_save_validates_the_values_set(config):
+    config.set_config_value('many', 'post_processing', 'typing_batch_size')
+    config.save_config('config.yaml')
+
+    default = config.get_schema()['post_processing']['typing_batch_size']['value']
+    assert config.get_config_value('post_processing', 'typing_batch_size') == default
+    assert config.snapshot().post_processing.typing_batch_size == default
+
+
+def test_snapshot_is_frozen_and_covers_the_schema(config):
+    snapshot = config.snapshot()
+
+    def settings(schema, path=()):
+        for key, item in schema.items():
+            if 'value' in item:
+                yield path + (key,)
+            else:
+                yield from settings(item, path + (key,))
+
+    for path in settings(config.get_schema()):
+        value = snapshot
+        for key in path:
+            value = getattr(value, key)
+        assert value == config.get_config_value(*path), path
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        snapshot.recording_options.sample_rate = 8000
+
+
+def test_user_config_is_validated_at_load(config, tmp_path):
+    (tmp_path / 'src').mkdir()
+    (tmp_path / 'src' / 'config.yaml').write_text(
+        'recording_options:\n  sample_rate: fast\n  silence_duration: 700\n'
+        'post_processing:\n  writing_key_press_delay: 0\n')
+    old_snapshot = config.snapshot()
+
+    config.reload_config()
+
+    snapshot = config.snapshot()
+    assert snapshot is not old_snapshot
+    assert old_snapshot.recording_options.silence_duration == 900
+    assert snapshot.recording_options.silence_duration == 700
+    assert snapshot.recording_options.sample_rate == config.get_schema()['recording_options']['sample_rate']['value']
+    # Ints are accepted where a float is expected
+    assert snapshot.post_processing.writing_key_press_delay == 0.0
+    assert isinstance(snapshot.post_processing.writing_key_press_delay, float)
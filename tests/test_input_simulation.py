@@ -0,0 +1,139 @@
+import os
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('pynput')
+
+import input_simulation  # noqa: E402
+from input_simulation import InputSimulator  # noqa: E402
+
+
+class RecordingKeyboard:
+    def __init__(self):
+        self.pressed = []
+
+    def press(self, key):
+        self.pressed.append(key)
+
+    def release(self, key):
+        pass
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='Windows types in batches with SendInput')
+def test_pynput_keeps_key_press_delay_without_send_input(config, monkeypatch):
+    config.set_config_value('pynput', 'post_processing', 'input_method')
+    config.set_config_value(0.01, 'post_processing', 'writing_key_press_delay')
+    config.set_config_value(32, 'post_processing', 'typing_batch_size')
+    sleeps = []
+    monkeypatch.setattr(input_simulation.time, 'sleep', sleeps.append)
+    simulator = InputSimulator()
+    simulator.keyboard = RecordingKeyboard()
+
+    simulator.typewrite('Hello world.')
+
+    assert ''.join(simulator.keyboard.pressed) == 'Hello world.'
+    assert sleeps == [0.01] * len('Hello world.')
+
+
+def test_adaptive_delay_backs_off_when_the_target_falls_behind():
+    delay = input_simulation.AdaptiveDelay(max_delay=0.02, step=0.001)
+
+    assert delay.update(10, 0.001) == 0.0
+    assert delay.update(10, 0.001, complete=False) == 0.001
+    assert delay.update(10, 0.01) == 0.002  # Ten times slower than usual
+    assert delay.update(10, 0.001) == pytest.approx(0.001)
+    for _ in range(10):
+        delay.update(10, 0.001, complete=False)
+    assert delay.delay == 0.02
+
+
+def test_bulk_typing_falls_back_to_one_character_at_a_time(config, monkeypatch):
+    config.set_config_value('pynput', 'post_processing', 'input_method')
+    config.set_config_value(0.005, 'post_processing', 'writing_key_press_delay')
+    config.set_config_value(4, 'post_processing', 'typing_batch_size')
+    monkeypatch.setattr(input_simulation.sys, 'platform', 'win32')
+    monkeypatch.setattr(input_simulation.time, 'sleep', lambda seconds: None)
+    batches = []
+
+    def send_input(inputs):
+        if len(batches) == 2:
+            raise OSError('input blocked')
+        batches.append(''.join(inputs))
+        return len(inputs)
+
+    monkeypatch.setattr(input_simulation, '_key_inputs', list, raising=False)
+    monkeypatch.setattr(input_simulation, '_send_input', send_input, raising=False)
+    simulator = InputSimulator()
+    simulator.keyboard = RecordingKeyboard()
+
+    simulator.typewrite('Hello world.')
+
+    assert batches == ['Hell', 'o wo']
+    assert ''.join(simulator.keyboard.pressed) == 'rld.'
+    assert simulator.typing_delay is None
+
+
+class FakeYdotoold:
+    """A ydotoold stand-in that records the keys pressed through its socket."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.presses = []
+        self.start()
+
+    def start(self):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.socket.bind(self.path)
+        # Reads as the real daemon does, the socket only queues a few datagrams
+        self.thread = threading.Thread(target=self._receive, args=(self.socket,), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.socket.shutdown(socket.SHUT_RDWR)
+        self.thread.join(timeout=5)
+        self.socket.close()
+        os.unlink(self.path)
+
+    def _receive(self, sock):
+        event = input_simulation.YdotoolSession.EVENT
+        while True:
+            data = sock.recv(64)
+            if not data:
+                return
+            _, _, event_type, code, value = event.unpack(data)
+            if event_type == input_simulation.YdotoolSession.EV_KEY and value == 1:
+                self.presses.append(code)
+
+    def key_presses(self, count):
+        """Wait for count more key presses and return their codes, Shift included."""
+        deadline = time.monotonic() + 5
+        while len(self.presses) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        presses, self.presses = self.presses, []
+        return presses
+
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason='ydotool is Linux only')
+def test_ydotool_session_reconnects_to_a_restarted_daemon(config, tmp_path, monkeypatch):
+    daemon = FakeYdotoold(tmp_path / 'ydotool.socket')
+    session = input_simulation.YdotoolSession(daemon.path)
+    commands = []
+    monkeypatch.setattr(input_simulation, 'run_command', commands.append)
+
+    session.type('Hi', 0)
+    assert daemon.key_presses(3) == [42, 35, 23]  # Shift, H, I
+
+    daemon.stop()
+    daemon.start()
+    session.backspace(2, 0)
+    assert daemon.key_presses(2) == [14, 14]
+    assert session.latency['reconnects'] == 1
+
+    daemon.stop()
+    session.type('a', 0)
+    assert commands == [['ydotool', 'key', '--key-delay', '0', '30:1', '30:0']]
+    assert session.latency['count'] == 3 and session.latency['fallbacks'] == 1
@@ -0,0 +1,202 @@
+import os
+import select
+from types import SimpleNamespace
+
+import pytest
+
+from key_listener import EvdevBackend, HotkeyEngine, InputEvent, KeyCode, KeyListener
+
+PRESS, RELEASE = InputEvent.KEY_PRESS, InputEvent.KEY_RELEASE
+
+
+class IdleBackend:
+    """An input backend that never produces events by itself."""
+
+    def set_relevant_keys(self, keys):
+        self.relevant_keys = keys
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+@pytest.fixture
+def listener(config, monkeypatch):
+    """A KeyListener for ctrl+shift+space that records the callbacks it triggers."""
+    monkeypatch.setattr(KeyListener, 'initialize_backends', lambda self: setattr(self, 'backends', [IdleBackend()]))
+    listener = KeyListener()
+    listener.triggered = []
+    for event in ('on_activate', 'on_deactivate'):
+        listener.add_callback(event, lambda event=event: listener.triggered.append(event))
+    return listener
+
+
+def send(listener, *events):
+    for key, event_type in events:
+        listener.on_input_event((key, event_type))
+
+
+def test_release_during_output_deactivates(listener):
+    send(listener, (KeyCode.CTRL_LEFT, PRESS), (KeyCode.SHIFT_LEFT, PRESS), (KeyCode.SPACE, PRESS))
+    assert listener.triggered == ['on_activate']
+
+    # The previous utterance is pasted while the chord is held, and the user lets go mid-paste
+    listener.synthetic_keys.expect_paste()
+    send(listener, (KeyCode.CTRL_LEFT, PRESS), (KeyCode.V, PRESS), (KeyCode.SPACE, RELEASE),
+         (KeyCode.V, RELEASE), (KeyCode.CTRL_LEFT, RELEASE))
+    listener.synthetic_keys.sent()
+
+    assert listener.triggered == ['on_activate', 'on_deactivate']
+
+
+def test_simulated_keys_do_not_trigger_hotkeys(listener):
+    listener.synthetic_keys.expect_keys([KeyCode.CTRL_LEFT, KeyCode.SHIFT_LEFT, KeyCode.SPACE])
+    send(listener, (KeyCode.CTRL_LEFT, PRESS), (KeyCode.SHIFT_LEFT, PRESS), (KeyCode.SPACE, PRESS),
+         (KeyCode.SPACE, RELEASE), (KeyCode.SHIFT_LEFT, RELEASE), (KeyCode.CTRL_LEFT, RELEASE))
+    listener.synthetic_keys.sent()
+    assert listener.triggered == []
+
+    send(listener, (KeyCode.CTRL_LEFT, PRESS), (KeyCode.SHIFT_LEFT, PRESS), (KeyCode.SPACE, PRESS))
+    assert listener.triggered == ['on_activate']
+
+
+def test_simulated_keys_that_never_arrive_are_forgotten(listener):
+    listener.synthetic_keys.expect_text('Hi ')
+    listener.synthetic_keys.sent(grace=-1)
+
+    send(listener, (KeyCode.CTRL_LEFT, PRESS), (KeyCode.SHIFT_LEFT, PRESS), (KeyCode.SPACE, PRESS))
+    assert listener.triggered == ['on_activate']
+
+
+
+CTRL = frozenset({KeyCode.CTRL_LEFT, KeyCode.CTRL_RIGHT})
+SHIFT = frozenset({KeyCode.SHIFT_LEFT, KeyCode.SHIFT_RIGHT})
+
+
+def test_hotkey_engine_tells_apart_chords_sharing_keys():
+    engine = HotkeyEngine()
+    engine.bind({CTRL, KeyCode.SPACE}, 'record')
+    engine.bind({CTRL, SHIFT, KeyCode.SPACE}, 'retranscribe')
+
+    assert engine.update(KeyCode.CTRL_RIGHT, PRESS) == (None, [])
+    assert engine.update(KeyCode.SHIFT_LEFT, PRESS) == (None, [])
+    assert engine.update(KeyCode.A, PRESS) == (None, [])  # Not part of any chord
+    assert engine.update(KeyCode.SPACE, PRESS) == ('retranscribe', [])
+    assert engine.update(KeyCode.SPACE, PRESS) == (None, [])  # Autorepeat
+    assert engine.update(KeyCode.SHIFT_LEFT, RELEASE) == (None, ['retranscribe'])
+    assert engine.update(KeyCode.SPACE, RELEASE) == (None, [])
+
+    assert engine.update(KeyCode.SPACE, PRESS) == ('record', [])
+    assert engine.update(KeyCode.CTRL_RIGHT, RELEASE) == (None, ['record'])
+    assert engine.keys() == {KeyCode.CTRL_LEFT, KeyCode.CTRL_RIGHT, KeyCode.SHIFT_LEFT, KeyCode.SHIFT_RIGHT,
+                             KeyCode.SPACE}
+
+
+def test_hotkey_engine_refuses_a_chord_bound_twice():
+    engine = HotkeyEngine()
+    engine.bind({CTRL, KeyCode.SPACE}, 'record')
+
+    with pytest.raises(ValueError):
+        engine.bind({KeyCode.CTRL_LEFT, KeyCode.SPACE}, 'cancel')
+    with pytest.raises(ValueError):
+        engine.bind(set(), 'cancel')
+
+
+def test_configured_hotkeys_trigger_their_actions(config, listener):
+    config.set_config_value({'ctrl+shift+esc': 'cancel', 'alt+r': 'retranscribe', 'ctrl+q': 'quit',
+                             'ctrl+nokey': 'toggle_output_method'}, 'recording_options', 'hotkeys')
+    listener.update_hotkeys()
+    for event in ('cancel', 'retranscribe', 'toggle_output_method'):
+        listener.add_callback(event, lambda event=event: listener.triggered.append(event))
+
+    send(listener, (KeyCode.CTRL_LEFT, PRESS), (KeyCode.SHIFT_RIGHT, PRESS), (KeyCode.ESC, PRESS),
+         (KeyCode.ESC, RELEASE), (KeyCode.SPACE, PRESS), (KeyCode.SPACE, RELEASE),
+         (KeyCode.SHIFT_RIGHT, RELEASE), (KeyCode.CTRL_LEFT, RELEASE),
+         (KeyCode.ALT_LEFT, PRESS), (KeyCode.R, PRESS), (KeyCode.CTRL_LEFT, PRESS), (KeyCode.Q, PRESS))
+
+    assert listener.triggered == ['cancel', 'on_activate', 'on_deactivate', 'retranscribe']
+    assert KeyCode.Q not in listener.relevant_keys()
+
+
+evdev_backend = pytest.mark.skipif(not hasattr(os, 'pipe2') or not hasattr(select, 'epoll'),
+                                   reason='The evdev backend is Linux only')
+EV_SYN, EV_KEY, EV_REL = 0x00, 0x01, 0x02
+KEY_LEFTCTRL, KEY_A, KEY_SPACE, BTN_LEFT = 29, 30, 57, 0x110
+
+
+class PipeDevice:
+    """Stands in for an evdev.InputDevice, reading from a pipe with the given key capabilities."""
+
+    def __init__(self, path, key_codes):
+        self.path = path
+        self.key_codes = key_codes
+        self.fd, self.write_fd = os.pipe2(os.O_NONBLOCK)
+
+    def capabilities(self):
+        return {EV_KEY: self.key_codes, EV_REL: [0, 1]}
+
+    def send(self, *events):
+        os.write(self.write_fd, b''.join(EvdevBackend.EVENT.pack(0, 0, *event) for event in events))
+
+    def close(self):
+        os.close(self.fd)
+        os.close(self.write_fd)
+
+
+@pytest.fixture
+def evdev(monkeypatch):
+    """An EvdevBackend for ctrl+space, opening PipeDevices from a fake /dev/input."""
+    plugged = {'/dev/input/event3': [KEY_LEFTCTRL, KEY_A, KEY_SPACE], '/dev/input/event4': [BTN_LEFT]}
+    backend = EvdevBackend()
+    backend.evdev = SimpleNamespace(InputDevice=lambda path: PipeDevice(path, plugged[path]))
+    backend.code_map = {KEY_LEFTCTRL: KeyCode.CTRL_LEFT, KEY_SPACE: KeyCode.SPACE}
+    backend.epoll = select.epoll()
+    backend.handled = []
+    backend.on_input_event = backend.handled.append
+    yield backend
+    for fd in list(backend.devices):
+        backend._remove_device(fd)
+    backend.epoll.close()
+
+
+@evdev_backend
+def test_evdev_reader_handles_only_the_relevant_keys(evdev):
+    evdev._add_device('/dev/input/event3')
+    (fd, device), = evdev.devices.items()
+
+    device.send((EV_REL, 0, 5), (EV_SYN, 0, 0), (EV_KEY, KEY_A, 1), (EV_KEY, KEY_LEFTCTRL, 1),
+                (EV_KEY, KEY_SPACE, 1), (EV_KEY, KEY_SPACE, 2), (EV_SYN, 0, 0), (EV_KEY, KEY_SPACE, 0))
+    evdev._read_device_events(fd)
+
+    assert evdev.handled == [(KeyCode.CTRL_LEFT, PRESS), (KeyCode.SPACE, PRESS), (KeyCode.SPACE, PRESS),
+                             (KeyCode.SPACE, RELEASE)]
+    assert evdev.stats['events_read'] == 8 and evdev.stats['events_handled'] == 4
+
+
+@evdev_backend
+def test_evdev_hotplug_opens_only_devices_with_relevant_keys(evdev):
+    read_fd, write_fd = os.pipe2(os.O_NONBLOCK)
+    evdev.inotify_fd = read_fd
+
+    def notify(mask, name):
+        name = name.encode().ljust(16, b'\0')
+        os.write(write_fd, EvdevBackend.INOTIFY_EVENT.pack(1, mask, 0, len(name)) + name)
+        evdev._handle_hotplug()
+
+    try:
+        notify(EvdevBackend.IN_CREATE, 'event4')  # A mouse without the chord's keys
+        notify(EvdevBackend.IN_CREATE, 'mouse0')
+        assert evdev.devices == {}
+
+        notify(EvdevBackend.IN_CREATE, 'event3')
+        notify(EvdevBackend.IN_ATTRIB, 'event3')
+        assert [device.path for device in evdev.devices.values()] == ['/dev/input/event3']
+
+        notify(EvdevBackend.IN_DELETE, 'event3')
+        assert evdev.devices == {}
+        assert evdev.stats['devices_added'] == 1 and evdev.stats['devices_removed'] == 1
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
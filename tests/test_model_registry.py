@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from model_registry import ModelRegistry
+
+
+@pytest.fixture
+def registry(config):
+    ModelRegistry._instance = None
+    ModelRegistry.initialize()
+    yield ModelRegistry
+    ModelRegistry._instance = None
+
+
+def test_failed_background_load_wakes_up_waiters(registry, monkeypatch):
+    import transcription
+
+    def create_local_model(options=None):
+        raise RuntimeError('CUDA out of memory')
+
+    monkeypatch.setattr(transcription, 'create_local_model', create_local_model)
+
+    future = registry.load_async()
+
+    assert not registry.wait_for_model(timeout=5)
+    assert isinstance(future.exception(), RuntimeError)
+    assert 'out of memory' in str(registry.load_error())
+
+
+def test_jobs_fail_when_the_model_fails_to_load(registry, monkeypatch):
+    pytest.importorskip('PyQt5')
+    import transcription
+    from result_thread import ResultThread, TranscriptionJob
+
+    monkeypatch.setattr(transcription, 'create_local_model', lambda options=None: 1 / 0)
+    registry.load_async().exception(timeout=5)
+    thread = ResultThread()
+    statuses, results = [], []
+    thread.statusSignal.connect(statuses.append)
+    thread.resultSignal.connect(results.append)
+
+    thread._transcribe_jobs([TranscriptionJob(1, np.zeros(16000, dtype=np.int16))])
+
+    assert statuses[-1] == 'error'
+    assert not thread.is_transcribing
+    assert results == []
+
+
+def add_model(registry, name, compute_type='float16'):
+    key = (name, 'cuda', compute_type, None, 1)
+    with registry._instance.lock:
+        registry._instance.models[key] = object()
+    return key
+
+
+def test_least_recently_used_inactive_models_are_evicted(config, registry):
+    config.set_config_value(3, 'model_options', 'local', 'max_loaded_models')
+    base, small = add_model(registry, 'base'), add_model(registry, 'small')
+    registry.activate(base)
+    medium = add_model(registry, 'medium')
+    registry.get_model(small)  # Now used more recently than medium
+
+    large = add_model(registry, 'large-v3')
+    registry.activate(large, role='draft')
+    assert registry.loaded_keys() == [base, small, large]
+
+    # Active models are kept even when they alone exceed the limit
+    config.set_config_value(1, 'model_options', 'local', 'max_loaded_models')
+    registry.activate(large, role='draft')
+    assert registry.loaded_keys() == [base, large]
+
+    registry.deactivate('draft')
+    assert registry.loaded_keys() == [base]
+
+
+def test_models_are_evicted_to_stay_within_the_memory_limit(config, registry):
+    config.set_config_value(5, 'model_options', 'local', 'max_loaded_models')
+    config.set_config_value(2000, 'model_options', 'local', 'model_memory_limit_mb')
+    medium = add_model(registry, 'medium')  # 1530 MB
+    small = add_model(registry, 'small', 'int8')  # 242 MB
+    registry.activate(small)
+
+    assert registry.estimate_size_mb(medium) == 1530 and registry.estimate_size_mb(small) == 242
+    registry.activate(add_model(registry, 'base', 'float32'), role='draft')  # 290 MB
+
+    assert medium not in registry.loaded_keys()
+    assert len(registry.loaded_keys()) == 2
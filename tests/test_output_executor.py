@@ -0,0 +1,127 @@
+import queue
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('PyQt5')
+pytest.importorskip('pynput')
+
+from PyQt5.QtCore import Qt  # noqa: E402
+
+import output_executor  # noqa: E402
+from clipboard_manager import ClipboardManager, MemoryClipboardBackend  # noqa: E402
+from output_executor import OutputCostModel, OutputExecutor  # noqa: E402
+
+
+class FailingInputSimulator:
+    """Fails to type anything, like a backend that lost its display connection."""
+    input_method = 'pynput'
+
+    def typewrite(self, text):
+        raise OSError('display connection lost')
+
+    def backspace(self, count):
+        pass
+
+
+def test_failed_output_is_reported(config):
+    config.set_config_value(True, 'output', 'auto_type')
+    config.set_config_value(False, 'output', 'copy_to_clipboard')
+    executor = OutputExecutor(FailingInputSimulator(), None)
+    reports = queue.Queue()
+    # Called on the executor's thread, as there is no event loop to deliver it on this one
+    executor.outputFinished.connect(reports.put, Qt.DirectConnection)
+    thread = threading.Thread(target=executor.run, daemon=True)
+    thread.start()
+
+    executor.output('Hello world.')
+    try:
+        report = reports.get(timeout=5)
+    finally:
+        executor.tasks.put(None)
+        thread.join(timeout=5)
+
+    assert report['method'] == 'failed'
+    assert 'display connection lost' in report['error']
+    assert report['pending'] == 0
+
+
+class RecordingController:
+    """Records the keys pressed instead of sending them."""
+    pressed = []
+
+    def press(self, key):
+        self.pressed.append(key)
+
+    def release(self, key):
+        pass
+
+
+def test_clipboard_is_restored_once_after_consecutive_pastes(config, monkeypatch):
+    config.set_config_value(False, 'output', 'auto_type')
+    config.set_config_value(True, 'output', 'copy_to_clipboard')
+    config.set_config_value(200, 'output', 'clipboard_restore_delay')
+    monkeypatch.setattr(output_executor, 'PynputController', RecordingController)
+    monkeypatch.setattr(RecordingController, 'pressed', [])
+    backend = MemoryClipboardBackend({'text/plain': 'copied by the user'})
+    executor = OutputExecutor(FailingInputSimulator(), ClipboardManager(backend))
+    reports = queue.Queue()
+    executor.outputFinished.connect(reports.put, Qt.DirectConnection)
+    thread = threading.Thread(target=executor.run, daemon=True)
+    thread.start()
+
+    try:
+        executor.output('First.')
+        executor.output('Second.')
+        assert [reports.get(timeout=5)['method'] for _ in range(2)] == ['clipboard', 'clipboard']
+        # The target application may still be reading the clipboard
+        assert backend.get_text() == 'Second.'
+        time.sleep(0.4)
+        assert backend.get_text() == 'copied by the user'
+    finally:
+        executor.tasks.put(None)
+        thread.join(timeout=5)
+
+    assert RecordingController.pressed.count('v') == 2
+    assert executor.latency['clipboard']['count'] == 2
+
+
+def test_toggled_output_method_is_not_saved(config):
+    config.set_config_value('manual', 'output', 'output_method')
+    config.set_config_value(True, 'output', 'auto_type')
+    config.set_config_value(False, 'output', 'copy_to_clipboard')
+    executor = OutputExecutor(FailingInputSimulator(), None)
+
+    assert executor.toggle_output_method() == 'auto'
+    assert executor._choose_methods('Hello world.') == (True, False)  # Pasting is estimated to be faster
+    assert config.get_config_value('output', 'output_method') == 'manual'
+    assert executor.toggle_output_method() == 'manual'
+
+
+def test_cost_model_learns_which_method_is_cheaper():
+    model = OutputCostModel(paste_cost=0.05, char_cost=0.005)
+
+    assert model.choose('Hi.', 'pynput')[0] == 'type'
+    assert model.choose('A sentence long enough to paste.', 'pynput')[0] == 'paste'
+    assert model.choose('Ça va?', 'ydotool') == ('paste', 'ydotool cannot type 1 non-ASCII characters')
+
+    # Pasting turns out to be slow on this machine, typing fast
+    for _ in range(10):
+        model.observe('paste', 'x', 0.5)
+        model.observe('type', 'x' * 50, 0.05)
+    assert model.choose('A sentence long enough to paste.', 'pynput')[0] == 'type'
+    assert model.samples == {'paste': 10, 'type': 10}
+
+    model.mark_paste_unavailable()
+    assert model.choose('x' * 1000, 'pynput') == ('type', 'the clipboard is unavailable')
+
+
+def test_non_ascii_typing_cost_is_learned_separately():
+    model = OutputCostModel(char_cost=0.005)
+
+    model.observe('type', 'éééé' + 'a' * 6, 0.23)
+
+    assert model.char_cost['ascii'] == 0.005
+    assert model.char_cost['other'] == pytest.approx(0.005 + 0.3 * (0.05 - 0.005))
+    assert model.estimate('type', 'éa') == pytest.approx(model.char_cost['other'] + 0.005)
@@ -0,0 +1,198 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip('PyQt5')
+
+from PyQt5.QtCore import Qt  # noqa: E402
+
+from conftest import FakeWhisperModel  # noqa: E402
+from result_thread import ResultThread, TranscriptionJob  # noqa: E402
+
+
+def test_recording_state_is_left_before_the_job_is_queued(config, fake_model, monkeypatch):
+    config.set_config_value('press_to_toggle', 'recording_options', 'recording_mode')
+    thread = ResultThread()
+    thread.is_running = thread.is_recording = True
+    monkeypatch.setattr(thread, '_record_audio', lambda: np.zeros(16000, dtype=np.int16))
+    statuses = []
+    thread.statusSignal.connect(lambda status: statuses.append((status, thread.is_recording, thread.queue_depth())))
+
+    thread._capture_utterances()
+
+    assert thread.queue_depth() == 1
+    assert statuses == [('recording', True, 0), ('transcribing', False, 0)]
+
+
+def test_single_utterance_is_not_batched(config, fake_model, monkeypatch):
+    import transcription
+
+    config.set_config_value(4, 'model_options', 'local', 'batch_size')
+    pipeline = FakeWhisperModel([' Batched.'])
+    monkeypatch.setattr(transcription, 'get_batched_pipeline', lambda local_model: pipeline)
+    thread = ResultThread()
+    thread.is_running = True
+    results = []
+    thread.resultSignal.connect(results.append)
+
+    thread.job_queue.put(TranscriptionJob(1, np.zeros(16000, dtype=np.int16)))
+    thread.job_queue.put(None)
+    thread._transcription_loop()
+
+    assert not pipeline.calls
+    assert 'condition_on_previous_text' in fake_model.calls[0]
+    assert results == ['Hello world. ']
+    # Batched and sequential decodes of the same audio are cached separately
+    assert transcription.local_model_id(fake_model) != transcription.local_model_id(fake_model, batched=True)
+
+
+def test_stream_segments_outputs_each_segment(config, fake_model):
+    config.set_config_value(True, 'output', 'stream_segments')
+    thread = ResultThread()
+    streamed, statuses = [], []
+    thread.textStreamSignal.connect(lambda text, final: streamed.append((text, final)))
+    thread.statusSignal.connect(statuses.append)
+
+    thread._transcribe_jobs([TranscriptionJob(1, np.zeros(16000, dtype=np.int16))])
+
+    assert 'error' not in statuses
+    assert fake_model.calls
+    assert ''.join(text for text, _ in streamed) == 'Hello world. '
+    assert streamed[-1] == ('', True)
+
+
+def test_retranscribe_model_stays_loaded_while_it_decodes(config, fake_model, monkeypatch):
+    import transcription
+    from model_registry import ModelRegistry
+
+    config.set_config_value('large-v3', 'model_options', 'local', 'retranscribe_model')
+    config.set_config_value(16, 'model_options', 'common', 'cache_size')
+    config.set_config_value(1, 'model_options', 'local', 'max_loaded_models')
+    monkeypatch.setattr(transcription.TranscriptionCache, '_instance', None)
+    retranscribe_model = FakeWhisperModel([' Hello', ' world!'])
+    monkeypatch.setattr(transcription, 'create_local_model', lambda options=None: retranscribe_model)
+    thread = ResultThread()
+    thread.last_audio = np.zeros(16000, dtype=np.int16)
+    results = []
+    thread.retranscribeSignal.connect(results.append)
+
+    for _ in range(2):
+        assert thread.retranscribe_last()
+        thread._transcribe_jobs([thread.job_queue.get()])
+
+    assert results == ['Hello world! '] * 2
+    # The second press is answered from the cache
+    assert len(retranscribe_model.calls) == 1
+    assert ModelRegistry.active_key('retranscribe') is None
+    assert ModelRegistry.active_model() is fake_model
+
+
+
+def test_draft_is_output_first_and_refined_by_the_main_model(config, fake_model):
+    from model_registry import ModelRegistry
+
+    draft_model = FakeWhisperModel([' Hello', ' word.'])
+    draft_key = ('tiny',) + ModelRegistry.model_key()[1:]
+    with ModelRegistry._instance.lock:
+        ModelRegistry._instance.models[draft_key] = draft_model
+    ModelRegistry.activate(draft_key, role='draft')
+    thread = ResultThread()
+    thread.is_running = True
+    outputs = []
+    thread.resultSignal.connect(lambda text: outputs.append(('result', text, len(fake_model.calls))))
+    thread.refineSignal.connect(lambda draft, refined: outputs.append(('refine', draft, refined)))
+
+    thread._transcribe_jobs([TranscriptionJob(1, np.zeros(16000, dtype=np.int16))])
+
+    # The draft is output before the main model has decoded anything
+    assert outputs == [('result', 'Hello word. ', 0), ('refine', 'Hello word. ', 'Hello world. ')]
+    assert thread.refine_stats == {'refined': 1, 'changed': 1, 'edit_distance': 1, 'draft_words': 2}
+
+@pytest.mark.parametrize('retranscribe_model', [None, 'base'])
+def test_retranscribe_needs_a_model_other_than_the_main_model(config, fake_model, retranscribe_model):
+    config.set_config_value('base', 'model_options', 'local', 'model')
+    config.set_config_value(retranscribe_model, 'model_options', 'local', 'retranscribe_model')
+    thread = ResultThread()
+    thread.last_audio = np.zeros(16000, dtype=np.int16)
+
+    assert not thread.retranscribe_last()
+    assert thread.queue_depth() == 0
+
+
+def test_pre_roll_does_not_count_towards_max_duration(config):
+    config.set_config_value('press_to_toggle', 'recording_options', 'recording_mode')
+    config.set_config_value(300, 'recording_options', 'pre_roll_duration')
+    config.set_config_value(1, 'recording_options', 'max_duration')
+    thread = ResultThread()
+    thread.sample_rate, thread.frame_size = 16000, 480
+    thread._pre_roll = thread._create_pre_roll(config.snapshot().recording_options)
+    block = np.ones((480, 1), dtype=np.int16)
+    for _ in range(20):
+        thread._audio_callback(block, 480, None, None)
+
+    thread.is_recording = True
+    recordings = []
+    recorder = threading.Thread(target=lambda: recordings.append(thread._record_audio()))
+    recorder.start()
+    while thread._capture_buffer is None:
+        time.sleep(0.001)
+    for _ in range(100):
+        thread._audio_callback(block, 480, None, None)
+    recorder.join(timeout=5)
+
+    # 10 frames of pre-roll on top of the 33 frames of max_duration
+    assert len(recordings[0]) == (33 + 10) * 480
+
+
+def test_worker_keeps_transcribing_after_a_failed_utterance(config, fake_model, monkeypatch):
+    transcribe = fake_model.transcribe
+    calls = []
+
+    def fail_first(audio, **options):
+        calls.append(len(audio))
+        if len(calls) == 1:
+            raise RuntimeError('decode failed')
+        return transcribe(audio, **options)
+
+    monkeypatch.setattr(fake_model, 'transcribe', fail_first)
+    thread = ResultThread()
+    results, statuses = [], []
+    thread.resultSignal.connect(results.append)
+    thread.statusSignal.connect(statuses.append)
+
+    thread.job_queue.put(TranscriptionJob(1, np.zeros(16000, dtype=np.int16)))
+    thread.job_queue.put(TranscriptionJob(2, np.ones(16000, dtype=np.int16)))
+    thread.job_queue.put(None)
+    thread._transcription_loop()
+
+    assert 'error' in statuses
+    assert results == ['Hello world. ']
+    assert len(calls) == 2
+
+
+def test_utterances_wait_for_the_model_to_finish_loading(config, monkeypatch):
+    import transcription
+    from model_registry import ModelRegistry
+
+    loaded = threading.Event()
+    model = FakeWhisperModel([' Queued.'])
+    monkeypatch.setattr(transcription, 'create_local_model', lambda options=None: loaded.wait(5) and model)
+    ModelRegistry._instance = None
+    ModelRegistry.initialize()
+    ModelRegistry.load_async()
+    thread = ResultThread()
+    thread.is_running = True
+    results = []
+    thread.resultSignal.connect(results.append, Qt.DirectConnection)
+
+    worker = threading.Thread(target=thread._transcribe_jobs, args=([TranscriptionJob(1, np.zeros(16000, dtype=np.int16))],))
+    worker.start()
+    time.sleep(0.1)
+    assert thread.is_transcribing and results == []
+
+    loaded.set()
+    worker.join(5)
+    assert results == ['Queued. ']
+    ModelRegistry._instance = None
@@ -0,0 +1,59 @@
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from conftest import SRC_DIR
+from utils import StartupProfiler
+
+
+@pytest.fixture
+def profiler(monkeypatch):
+    """A StartupProfiler with no phases recorded yet."""
+    monkeypatch.setattr(StartupProfiler, '_phases', [])
+    monkeypatch.setattr(StartupProfiler, '_pending', set())
+    monkeypatch.setattr(StartupProfiler, '_origin', time.perf_counter())
+    return StartupProfiler
+
+
+def test_startup_completes_at_the_last_expected_milestone(profiler):
+    profiler.expect('tray icon shown', 'model ready')
+    with profiler.phase('load config'):
+        pass
+
+    assert not profiler.milestone('model ready')
+    assert not profiler.milestone('unrelated')
+    assert profiler.milestone('tray icon shown')
+    assert not profiler.milestone('tray icon shown')
+
+
+def test_startup_report_lists_the_phases_of_each_thread_in_order(profiler):
+    def load_model():
+        start = time.perf_counter()
+        profiler.record('load model', start, start + 2)
+
+    with profiler.phase('import Qt and app modules'):
+        thread = threading.Thread(target=load_model, name='ModelLoader')
+        thread.start()
+        thread.join()
+
+    lines = profiler.report().splitlines()
+
+    assert lines[0].split() == ['phase', 'thread', 'start', '(s)', 'end', '(s)', 'took', '(s)']
+    assert lines[1].startswith('import Qt and app modules') and 'MainThread' in lines[1]
+    assert lines[2].startswith('load model') and 'ModelLoader' in lines[2]
+    assert lines[2].split()[-1] == '2.000'
+
+
+def test_heavy_dependencies_are_not_imported_with_the_app_modules():
+    pytest.importorskip('PyQt5')
+    heavy = ['faster_whisper', 'ctranslate2', 'openai', 'sounddevice', 'webrtcvad']
+    code = (f'import sys; sys.path.insert(0, {SRC_DIR!r}); '
+            'import result_thread, output_executor, clipboard_manager; '
+            f'print([name for name in {heavy!r} if name in sys.modules])')
+
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+
+    assert output.strip() == '[]'
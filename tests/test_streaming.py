@@ -0,0 +1,73 @@
+import sys
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+
+from streaming import StreamingTranscriber
+
+
+class ValueModel:
+    """Decodes audio to the value of its first sample."""
+
+    def transcribe(self, audio, **options):
+        segment = SimpleNamespace(text=f' chunk{round(audio[0] * 32768)}', start=0.0, end=1.0, words=None)
+        return iter([segment]), None
+
+
+class GatedModel(ValueModel):
+    """A ValueModel that only decodes once it is allowed to."""
+
+    def __init__(self):
+        self.allowed = threading.Event()
+
+    def transcribe(self, audio, **options):
+        self.allowed.wait(timeout=5)
+        return super().transcribe(audio, **options)
+
+
+def test_preview_is_skipped_while_busy_and_replaced_by_the_chunk(config):
+    model = GatedModel()
+    updates = []
+    streamer = StreamingTranscriber(model, on_update=lambda committed, tentative: updates.append((committed, tentative)))
+
+    streamer.submit_chunk(np.full(160, 1, dtype=np.int16))
+    assert not streamer.submit_preview(np.full(160, 9, dtype=np.int16))
+    model.allowed.set()
+    streamer._chunks[0].result()
+
+    assert streamer.submit_preview(np.full(160, 2, dtype=np.int16))
+    streamer._previews[0].result()
+    assert updates[-1] == ('chunk1', 'chunk2')
+
+    assert streamer.finish(np.full(160, 2, dtype=np.int16)) == 'chunk1 chunk2 '
+    assert updates[-1] == ('chunk1 chunk2', '')
+
+
+def test_finish_decodes_every_submitted_chunk(config):
+    # Switch threads as often as possible so finish() runs while chunks are still queued
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for _ in range(200):
+            streamer = StreamingTranscriber(ValueModel())
+            streamer.submit_preview(np.full(160, 9, dtype=np.int16))
+            for value in (1, 2, 3):
+                streamer.submit_chunk(np.full(160, value, dtype=np.int16))
+            assert streamer.finish(np.full(160, 4, dtype=np.int16)) == 'chunk1 chunk2 chunk3 chunk4 '
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+
+def test_chunks_and_previews_are_not_cached(config, fake_model, monkeypatch):
+    import transcription
+
+    config.set_config_value(16, 'model_options', 'common', 'cache_size')
+    monkeypatch.setattr(transcription.TranscriptionCache, '_instance', None)
+    streamer = StreamingTranscriber(fake_model)
+    streamer.submit_preview(np.full(160, 1, dtype=np.int16))
+    streamer.submit_chunk(np.full(160, 2, dtype=np.int16))
+    streamer.finish(np.full(160, 3, dtype=np.int16))
+
+    assert len(fake_model.calls) >= 2
+    assert not transcription.TranscriptionCache._get_instance().entries
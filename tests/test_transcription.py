@@ -0,0 +1,182 @@
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import transcription
+from transcription import TranscriptionCache
+
+
+def test_chunked_recording_is_cached_whole(config, fake_model, monkeypatch):
+    import vad
+
+    config.set_config_value(16, 'model_options', 'common', 'cache_size')
+    monkeypatch.setattr(TranscriptionCache, '_instance', None)
+    monkeypatch.setattr(vad, 'split_at_pauses', lambda flags, frame_size, total, chunk, overlap:
+                        ([(0, total // 2), (total // 2, total)], [False]))
+    audio = np.zeros(32000, dtype=np.int16)
+
+    first = transcription.transcribe_chunked(audio, fake_model, 16000, 2)
+    assert transcription.transcribe_chunked(audio, fake_model, 16000, 2) == first
+
+    assert len(fake_model.calls) == 2  # One decode per chunk, the second call was a cache hit
+    assert len(TranscriptionCache._get_instance().entries) == 1
+
+
+class SegmentsPipeline:
+    """Stands in for a BatchedInferencePipeline, answering with fixed segments."""
+
+    def __init__(self, segments):
+        self.segments = segments
+        self.calls = []
+
+    def transcribe(self, audio, **options):
+        self.calls.append(options)
+        return iter([SimpleNamespace(text=text, start=start, end=start + 0.1) for text, start in self.segments]), None
+
+
+def test_batched_segments_are_mapped_back_to_their_utterances(config, fake_model, monkeypatch):
+    config.set_config_value(8, 'model_options', 'local', 'batch_size')
+    pipeline = SegmentsPipeline([(' One.', 0.2), (' Two', 1.1), (' three.', 2.5)])
+    monkeypatch.setattr(transcription, 'get_batched_pipeline', lambda local_model: pipeline)
+    audio_list = [np.zeros(16000, dtype=np.int16), np.zeros(32000, dtype=np.int16)]
+
+    assert transcription.transcribe_local_batched(audio_list, fake_model) == [' One.', ' Two three.']
+    # One decode for both utterances, each of them a separate window
+    assert pipeline.calls[0]['clip_timestamps'] == [{'start': 0, 'end': 16000}, {'start': 16000, 'end': 48000}]
+    assert not fake_model.calls
+
+
+def test_word_edit_distance_counts_word_edits():
+    assert transcription.word_edit_distance('the quick brown fox', 'the quick brown fox') == 0
+    assert transcription.word_edit_distance('the quick brown fox', 'a quick fox jumps') == 3
+    assert transcription.word_edit_distance('', 'two words') == 2
+
+
+def test_cache_key_covers_the_audio_and_the_decode_options(config):
+    audio = np.arange(1600, dtype=np.int16)
+    key = TranscriptionCache.make_key(audio, ('local', 'base'))
+
+    assert TranscriptionCache.make_key(audio.copy(), ('local', 'base')) == key
+    assert TranscriptionCache.make_key(audio[::-1], ('local', 'base')) != key
+    assert TranscriptionCache.make_key(audio, ('local', 'small')) != key
+    assert TranscriptionCache.make_key(audio, None) is None
+    config.set_config_value('de', 'model_options', 'common', 'language')
+    assert TranscriptionCache.make_key(audio, ('local', 'base')) != key
+
+
+def test_cache_evicts_the_least_recently_used_entries(config, tmp_path, monkeypatch):
+    config.set_config_value(2, 'model_options', 'common', 'cache_size')
+    config.set_config_value(str(tmp_path / 'cache'), 'model_options', 'common', 'cache_directory')
+    config.set_config_value(1, 'model_options', 'common', 'cache_max_disk_mb')
+    monkeypatch.setattr(TranscriptionCache, '_instance', None)
+
+    TranscriptionCache.put('a', 'first')
+    TranscriptionCache.put('b', 'second')
+    assert TranscriptionCache.get('a') == 'first'
+    TranscriptionCache.put('c', 'x' * (1024 * 1024 - 8))
+
+    assert list(TranscriptionCache._get_instance().entries) == ['a', 'c']
+    # Reading 'a' made 'b' the least recently used file on disk too; 'c' pushed it over 1 MB
+    assert sorted(path.name for path in (tmp_path / 'cache').iterdir()) == ['a.txt', 'c.txt']
+
+    # Entries on disk outlive the process
+    monkeypatch.setattr(TranscriptionCache, '_instance', None)
+    assert TranscriptionCache.get('a') == 'first'
+    assert TranscriptionCache.get('b') is None
+    assert TranscriptionCache.stats()['hit_rate'] == 0.5
+
+
+def test_identical_audio_is_decoded_once(config, fake_model, monkeypatch):
+    config.set_config_value(16, 'model_options', 'common', 'cache_size')
+    monkeypatch.setattr(TranscriptionCache, '_instance', None)
+    audio = np.zeros(16000, dtype=np.int16)
+
+    assert transcription.transcribe(audio, fake_model) == transcription.transcribe(audio.copy(), fake_model)
+    assert len(fake_model.calls) == 1
+    assert TranscriptionCache.stats()['hits'] == 1
+
+
+@pytest.mark.parametrize('remove_trailing_period', [False, True])
+@pytest.mark.parametrize('add_trailing_space', [False, True])
+@pytest.mark.parametrize('remove_capitalization', [False, True])
+def test_pieces_add_up_to_the_post_processed_transcription(config, remove_trailing_period, add_trailing_space,
+                                                           remove_capitalization):
+    config.set_config_value(remove_trailing_period, 'post_processing', 'remove_trailing_period')
+    config.set_config_value(add_trailing_space, 'post_processing', 'add_trailing_space')
+    config.set_config_value(remove_capitalization, 'post_processing', 'remove_capitalization')
+    segments = [' Hello.', ' It is Mr.', ' Smith.', ' ']
+    processor = transcription.IncrementalPostProcessor()
+
+    pieces = [processor.feed(segment) for segment in segments]
+    pieces.append(processor.finish())
+
+    assert ''.join(pieces) == transcription.post_process_transcription(''.join(segments))
+    # A trailing period is only held back while it may still have to be removed
+    first = 'Hello' if remove_trailing_period else 'Hello.'
+    assert pieces[0] == (first.lower() if remove_capitalization else first)
+
+
+class LazyWhisperModel:
+    """Decodes one segment at a time, recording when each one is decoded."""
+
+    def __init__(self, events):
+        self.events = events
+
+    def transcribe(self, audio, word_timestamps=False, **options):
+        def segments():
+            for index, text in enumerate([' First words', ' then more.']):
+                self.events.append(f'decoded {index}')
+                words = [SimpleNamespace(word=' ' + word, start=index, end=index + 0.5) for word in text.split()]
+                yield SimpleNamespace(text=text, start=index, end=index + 1, words=words)
+        return segments(), None
+
+
+@pytest.mark.parametrize('word_timestamps', [False, True])
+def test_text_is_output_as_soon_as_it_is_decoded(config, word_timestamps):
+    config.set_config_value(word_timestamps, 'model_options', 'local', 'word_timestamps')
+    events = []
+
+    final = transcription.transcribe_streaming(np.zeros(32000, dtype=np.int16),
+                                               on_text=lambda text, start, end: events.append(text),
+                                               local_model=LazyWhisperModel(events))
+
+    if word_timestamps:
+        assert events == ['decoded 0', 'First', ' words', 'decoded 1', ' then', ' more.', ' ']
+    else:
+        assert events == ['decoded 0', 'First words', 'decoded 1', ' then more.', ' ']
+    assert final == 'First words then more. '
+
+
+def test_words_transcribed_twice_at_a_cut_are_kept_once():
+    stitch = transcription.stitch_transcripts
+
+    # A hard cut, with a word cut off at either edge of the overlap
+    assert stitch(['so the quick brown fo', 'ick quick brown fox jumps.'], [True]) == 'so the quick brown fox jumps.'
+    assert stitch(['The quick brown', 'Brown fox jumps.'], [True]) == 'The quick brown fox jumps.'
+    # A single repeated word at a cut in a pause was most likely said twice
+    assert stitch(['I said no.', 'No, thanks.'], [False]) == 'I said no. No, thanks.'
+    assert stitch(['One two three', 'two three four', 'four five'], [False, True]) == 'One two three four five'
+
+
+class ConcurrentWhisperModel:
+    """Only answers once the given number of decodes run at the same time."""
+
+    def __init__(self, parties):
+        self.barrier = threading.Barrier(parties, timeout=5)
+
+    def transcribe(self, audio, **options):
+        self.barrier.wait()
+        return iter([SimpleNamespace(text=f' {len(audio)}', start=0, end=1, words=None)]), None
+
+
+def test_chunks_are_transcribed_concurrently(config, monkeypatch):
+    import vad
+
+    monkeypatch.setattr(vad, 'split_at_pauses', lambda flags, frame_size, total, chunk, overlap:
+                        ([(0, 16000), (16000, 40000), (40000, total)], [False, False]))
+
+    text = transcription.transcribe_chunked(np.zeros(48000, dtype=np.int16), ConcurrentWhisperModel(3), 16000, 3)
+
+    assert text == '16000 24000 8000'
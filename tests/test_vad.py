@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+
+from vad import EnergyVad, SilenceTracker, WebRtcVad, compact_silence, create_vad, split_at_pauses, trim_silence
+
+
+def tone_bursts(bursts, total, seed=0):
+    """Quiet noise with a loud tone in each (start, end) second range of the bursts."""
+    audio = np.random.default_rng(seed).normal(0, 30, int(total * 16000))
+    for start, end in bursts:
+        t = np.arange(int((end - start) * 16000)) / 16000
+        audio[int(start * 16000):int(start * 16000) + len(t)] += 8000 * np.sin(2 * np.pi * 220 * t)
+    return audio.astype(np.int16)
+
+
+def test_energy_vad_finds_the_speech():
+    audio = tone_bursts([(0.5, 1.0), (1.5, 2.1)], 2.5)
+
+    flags = EnergyVad().speech_flags(audio)
+
+    assert len(flags) == len(audio) // 480
+    expected = np.zeros(len(flags), dtype=bool)
+    for start, end in [(0.5, 1.0), (1.5, 2.1)]:
+        expected[int(start / 0.03) + 1:int(end / 0.03)] = True
+    assert flags[expected].all()
+    assert flags.sum() <= expected.sum() + 4
+
+
+def test_buffers_are_classified_as_one_continuous_stream():
+    audio = tone_bursts([(0.5, 1.0), (1.5, 2.1)], 2.5)
+    whole = EnergyVad().speech_flags(audio)
+
+    vad = EnergyVad()
+    pieces = np.concatenate([vad.speech_flags(audio[start:start + 4800]) for start in range(0, len(audio), 4800)])
+
+    assert np.array_equal(pieces, whole)
+
+
+def test_webrtc_backend_matches_per_frame_calls():
+    webrtcvad = pytest.importorskip('webrtcvad')
+    audio = tone_bursts([(0.3, 0.9)], 1.2)
+    reference = webrtcvad.Vad(2)
+
+    flags = WebRtcVad().speech_flags(audio)
+
+    assert flags.tolist() == [reference.is_speech(audio[start:start + 480].tobytes(), 16000)
+                              for start in range(0, len(audio) - 479, 480)]
+
+
+def test_silence_tracker_counts_silence_across_batches():
+    tracker = SilenceTracker()
+
+    silent_runs, speech_seen = tracker.update([False, False])
+    assert silent_runs.tolist() == [1, 2] and speech_seen.tolist() == [False, False]
+
+    silent_runs, speech_seen = tracker.update([False, True, False, False])
+    assert silent_runs.tolist() == [3, 0, 1, 2] and speech_seen.tolist() == [False, True, True, True]
+
+    silent_runs, _ = tracker.update([False])
+    assert silent_runs.tolist() == [3] and tracker.speech_detected
+
+
+def test_trim_silence_keeps_the_speech_with_padding():
+    audio = tone_bursts([(1.0, 1.5)], 3.0)
+
+    trimmed = trim_silence(audio, EnergyVad(), padding_ms=210)
+
+    assert np.shares_memory(trimmed, audio)
+    assert 0.7 * 16000 <= len(trimmed) <= 1.0 * 16000
+    assert trim_silence(np.zeros(16000, dtype=np.int16), EnergyVad()).size == 0
+
+
+def test_unknown_vad_backend_falls_back_to_webrtc(config):
+    pytest.importorskip('webrtcvad')
+    config.set_config_value('unknown', 'recording_options', 'vad_backend')
+
+    assert isinstance(create_vad(), WebRtcVad)
+    assert isinstance(create_vad('energy'), EnergyVad)
+
+
+def test_compaction_shortens_pauses_and_maps_times_back():
+    # 10 ms frames: speech at 1.00-1.20 s and 3.00-3.10 s of a 4 s recording
+    flags = np.zeros(400, dtype=bool)
+    flags[100:120] = flags[300:310] = True
+    audio = np.arange(64000, dtype=np.int64).astype(np.int16)
+
+    compacted, timestamp_map = compact_silence(audio, flags, 160, 16000, max_pause_ms=400, padding_ms=100)
+
+    # 100 ms padding, 200 ms speech, the 1.8 s pause shortened to 400 ms, 100 ms speech, 100 ms padding
+    assert len(compacted) == int(0.9 * 16000)
+    assert compacted[0] == audio[int(0.9 * 16000)]
+    assert timestamp_map.to_original(0.15) == pytest.approx(1.05)
+    assert timestamp_map.to_original(0.6) == pytest.approx(2.9)
+    assert timestamp_map.to_original(0.75) == pytest.approx(3.05)
+
+
+def test_compaction_keeps_recordings_without_detected_speech():
+    audio = np.ones(16000, dtype=np.int16)
+
+    assert compact_silence(audio, np.zeros(100, dtype=bool), 160, 16000, 400) == (audio, None)
+    compacted, timestamp_map = compact_silence(audio, np.ones(100, dtype=bool), 160, 16000, 400)
+    assert compacted is audio and timestamp_map is None
+
+
+def test_long_recordings_are_cut_in_the_pause_closest_to_a_full_chunk():
+    # 10 ms frames, 10 s chunks: pauses at 6-6.5 s, 9.5-10.3 s and 19-19.2 s of a 26 s recording
+    flags = np.ones(2600, dtype=bool)
+    flags[600:650] = flags[950:1030] = flags[1900:1920] = False
+
+    ranges, hard_cuts = split_at_pauses(flags, 160, 2600 * 160, 1000 * 160, overlap_samples=16000)
+
+    # Cut in the middle of the pause nearest 10 s, then in the only pause within reach, with at
+    # most half of each pause as overlap
+    assert ranges == [(0, 1030 * 160), (950 * 160, 1920 * 160), (1900 * 160, 2600 * 160)]
+    assert hard_cuts == [False, False]
+
+
+def test_recordings_without_pauses_are_cut_hard_with_overlap():
+    ranges, hard_cuts = split_at_pauses(np.ones(2600, dtype=bool), 160, 2600 * 160, 1000 * 160,
+                                        overlap_samples=16000)
+
+    assert ranges == [(0, 176000), (144000, 336000), (304000, 416000)]
+    assert hard_cuts == [True, True]